@@ -1 +1,3 @@
-from .atclient import AtClient
\ No newline at end of file
+from .atclient import AtClient
+from .asyncatclient import AsyncAtClient
+from .notificationprocessor import NotificationProcessor
\ No newline at end of file
@@ -0,0 +1,551 @@
+import asyncio
+import base64
+import json
+import ssl
+import traceback
+
+from .common.atsign import AtSign
+from .util.verbbuilder import *
+from .util.encryptionutil import EncryptionUtil
+from .util.keysutil import KeysUtil
+from .common.metadata import Metadata
+from .exception.atexception import *
+from .connections.address import Address
+from .connections.asyncatrootconnection import AsyncAtRootConnection
+from .connections.asyncatsecondaryconnection import AsyncAtSecondaryConnection
+from .connections.secondaryaddresscache import SecondaryAddressCache
+from .connections.atmonitorconnection import AtMonitorConnection
+from .connections.notification.atevents import AtEvent, AtEventType
+from .common.keys import Keys, SharedKey, PublicKey, SelfKey
+from .util.authutil import AuthUtil
+from .util.lrucache import LRUCache
+from .util.keyedlocks import AsyncKeyedLocks
+from .util.timeutil import TimeUtil
+
+_NOT_CACHED = object()
+
+
+class AsyncAtClient:
+    """
+    asyncio counterpart of AtClient.
+
+    All operations are coroutines sharing a single secondary connection, on which concurrent operations are
+    pipelined, so one event loop can serve many concurrent operations, and many atSigns, without a thread per
+    connection. Use it as an async context manager, or call connect() and close() explicitly.
+    """
+
+    def __init__(self, atsign:AtSign, root_address:Address=Address("root.atsign.org", 64), secondary_address:Address=None,
+                 verbose:bool=False, context:ssl.SSLContext=ssl.create_default_context(), shared_key_cache_size:int=1024,
+                 public_key_cache_ttl:float=3600.0, public_key_negative_cache_ttl:float=60.0, root_cache_path:str=None,
+                 root_cache_ttl:float=None):
+        """
+        Initialize the AsyncAtClient object. No connection is made until connect() is awaited.
+
+        Parameters
+        ----------
+        atsign : AtSign
+            The atSign to act as. Its keys are loaded by KeysUtil.load_keys.
+        root_address : Address, optional
+            The root server used to find the secondary server (default is root.atsign.org:64).
+        secondary_address : Address, optional
+            The secondary server, which skips the root lookup when given.
+        verbose : bool, optional
+            Indicates if verbose output is enabled (default is False).
+        context : ssl.SSLContext, optional
+            The SSL context for secure connections (default is ssl.create_default_context()).
+        shared_key_cache_size : int, optional
+            The number of atSigns whose shared encryption keys are kept decrypted in memory (default is 1024).
+        public_key_cache_ttl : float, optional
+            Seconds for which other atSigns' public encryption keys are cached (default is 3600).
+        public_key_negative_cache_ttl : float, optional
+            Seconds for which an atSign is remembered as having no public encryption key (default is 60).
+        root_cache_path : str, optional
+            JSON file the secondary addresses found by root lookups are saved to, so that later processes can skip the
+            lookups (default is to keep them in memory only). The cache is shared by all clients.
+        root_cache_ttl : float, optional
+            Seconds for which a secondary address found by a root lookup is used before it is looked up again (default
+            is 3600). The cache is shared by all clients.
+        """
+        self.atsign = atsign
+        self.keys = KeysUtil.load_keys(atsign)
+        self.verbose = verbose
+        self.root_address = root_address
+        self.secondary_address = secondary_address
+        self._secondary_address_given = secondary_address is not None
+        self.secondary_connection = None
+        self.authenticated = False
+        self._context = context
+        self.shared_key_cache = LRUCache(max_size=shared_key_cache_size)
+        # Other atSigns' public encryption keys, as (base64, parsed key) or None for atSigns that have none
+        self.public_key_cache = LRUCache(ttl=public_key_cache_ttl)
+        self.public_key_negative_cache_ttl = public_key_negative_cache_ttl
+        self._shared_key_locks = AsyncKeyedLocks()
+        self._sender_locks = AsyncKeyedLocks()
+        if secondary_address is None:
+            SecondaryAddressCache.get_instance(ttl=root_cache_ttl, path=root_cache_path)
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, tb):
+        await self.close()
+
+    async def _find_secondary(self, use_cache:bool=True) -> Address:
+        root_connection = AsyncAtRootConnection(self.root_address.host, self.root_address.port, self._context, self.verbose)
+        try:
+            return await root_connection.find_secondary(self.atsign, use_cache)
+        finally:
+            await root_connection.disconnect()
+
+    async def _connect_authenticated(self) -> AsyncAtSecondaryConnection:
+        if self._secondary_address_given:
+            connection = AsyncAtSecondaryConnection(self.secondary_address, self._context, verbose=self.verbose)
+            await connection.connect()
+        else:
+            self.secondary_address = await self._find_secondary()
+            connection = AsyncAtSecondaryConnection(self.secondary_address, self._context, verbose=self.verbose)
+            try:
+                await connection.connect()
+            except AtSecondaryConnectException:
+                # The address may have come from the cache and be stale, so look it up again before giving up
+                SecondaryAddressCache.get_instance().invalidate(self.atsign)
+                looked_up_address = await self._find_secondary(use_cache=False)
+                if str(looked_up_address) == str(self.secondary_address):
+                    raise
+                self.secondary_address = looked_up_address
+                connection = AsyncAtSecondaryConnection(self.secondary_address, self._context, verbose=self.verbose)
+                await connection.connect()
+        try:
+            await AuthUtil.authenticate_with_pkam_async(connection, self.atsign, self.keys)
+        except Exception:
+            await connection.disconnect()
+            raise
+        return connection
+
+    async def connect(self):
+        """
+        Look up the secondary server if needed, connect to it and authenticate with PKAM.
+        """
+        if self.secondary_connection is None or not self.secondary_connection.is_connected():
+            self.secondary_connection = await self._connect_authenticated()
+            self.authenticated = True
+
+    async def close(self):
+        """
+        Close the secondary connection.
+        """
+        if self.secondary_connection is not None:
+            await self.secondary_connection.disconnect()
+        self.authenticated = False
+
+    def is_authenticated(self):
+        return self.authenticated
+
+    async def _execute_command(self, command:str, raise_exception=True, read_the_response:bool=True):
+        if self.secondary_connection is None:
+            raise AtSecondaryConnectException("Not connected - await connect() first")
+        return await self.secondary_connection.execute_command(command, raise_exception, read_the_response=read_the_response)
+
+    async def get_at_keys(self, regex, fetch_metadata):
+        scan_command = ScanVerbBuilder().set_regex(regex).set_show_hidden(True).build()
+        try:
+            scan_raw_response = (await self._execute_command(scan_command, True)).get_raw_data_response()
+        except Exception as e:
+            raise AtSecondaryConnectException(f"Failed to execute : {scan_command} : {e}")
+
+        keys_list = []
+        if len(scan_raw_response) > 0:
+            keys_list = json.loads(scan_raw_response)
+
+        at_keys = [Keys.from_string(at_key_raw) for at_key_raw in keys_list]
+        if fetch_metadata:
+            # The lookups are pipelined on the one connection, a chunk at a time so that in-flight commands stay bounded
+            llookup_commands = ["llookup:meta:" + at_key_raw for at_key_raw in keys_list]
+            responses = []
+            for start in range(0, len(llookup_commands), 512):
+                responses += await asyncio.gather(*(self._execute_command(command) for command in llookup_commands[start:start + 512]), return_exceptions=True)
+            for at_key, llookup_command, response in zip(at_keys, llookup_commands, responses):
+                if isinstance(response, BaseException):
+                    raise AtSecondaryConnectException(f"Failed to execute : {llookup_command} : {response}")
+                llookup_meta_response = response.get_raw_data_response()
+                try:
+                    at_key.metadata = Metadata.squash(at_key.metadata, Metadata.from_json(llookup_meta_response))
+                except Exception as e:
+                    raise AtResponseHandlingException(f"Failed to parse JSON : {llookup_meta_response} : {e}")
+
+        return at_keys
+
+    async def get_public_encryption_key(self, shared_with):
+        entry = await self._get_public_encryption_key_entry(shared_with)
+        return None if entry is None else entry[0]
+
+    async def _get_public_encryption_key_entry(self, shared_with):
+        cached = self.public_key_cache.get(shared_with.to_string(), _NOT_CACHED)
+        if cached is not _NOT_CACHED:
+            return cached
+
+        command = "plookup:publickey" + shared_with.to_string()
+        try:
+            response = await self._execute_command(command, False)
+        except AtSecondaryNotFoundException as e: raise e
+        except AtSecondaryConnectException as e:
+            raise AtSecondaryConnectException(f"Failed to execute {command} - {e}")
+
+        if response.is_error():
+            ex = response.get_exception()
+            if isinstance(ex, AtKeyNotFoundException) or isinstance(ex, AtInternalServerException): 
+                self.public_key_cache.put(shared_with.to_string(), None, ttl=self.public_key_negative_cache_ttl)
+                return None
+            else:
+                raise ex
+
+        raw_key = response.get_raw_data_response()
+        try:
+            entry = (raw_key, EncryptionUtil.public_key_from_base64(raw_key))
+        except Exception as e:
+            raise AtEncryptionException(f"Failed to parse public key of {shared_with} - {e}")
+        self.public_key_cache.put(shared_with.to_string(), entry)
+        return entry
+
+    async def create_shared_encryption_key(self, shared_key: SharedKey):
+        their_public_encryption_key = await self._get_public_encryption_key_entry(shared_key.shared_with)
+        if their_public_encryption_key is None:
+            raise AtKeyNotFoundException(f" public key {shared_key.shared_with.to_string()} not found but service is running - maybe that AtSign has not yet been onboarded")
+
+        aes_key = ""
+        try:
+            aes_key = EncryptionUtil.generate_aes_key_base64()
+        except Exception as e:
+            raise AtEncryptionException(f"Failed to generate AES key for sharing with {shared_key.shared_with}")
+
+        step = ""
+        try:
+            step = "encrypt new shared key with their public key"
+            encrypted_for_other = EncryptionUtil.rsa_encrypt_to_base64(aes_key, their_public_encryption_key[1])
+
+            step = "encrypt new shared key with our public key"
+            encrypted_for_us = EncryptionUtil.rsa_encrypt_to_base64(aes_key, self.keys.get(KeysUtil.encryption_public_key_name))
+
+            step = "save encrypted shared key for us"
+            command1 = "update:" + "shared_key." + shared_key.shared_with.without_prefix + shared_key.shared_by.to_string()\
+                                    + " " + encrypted_for_us
+            await self._execute_command(command1, True)
+
+            step = "save encrypted shared key for them"
+            ttr = 24 * 60 * 60 * 1000
+            command2 = "update:ttr:" + str(ttr) + ":" + shared_key.shared_with.to_string() + ":shared_key" + shared_key.shared_by.to_string()\
+                                    + " " + encrypted_for_other
+            await self._execute_command(command2, True)
+        except Exception as e:
+            raise AtEncryptionException(f"Failed to {step} - {e}")
+
+        self.shared_key_cache.put(shared_key.shared_with.to_string(), aes_key)
+        return aes_key
+
+    async def get_encryption_key_shared_by_me(self, key: SharedKey):
+        cached = self.shared_key_cache.get(key.shared_with.to_string())
+        if cached is not None:
+            return cached
+
+        # Concurrent puts to the same atSign must not each create a different shared key
+        async with self._shared_key_locks.lock(key.shared_with.to_string()):
+            cached = self.shared_key_cache.get(key.shared_with.to_string())
+            if cached is not None:
+                return cached
+
+            to_lookup = "shared_key." + key.shared_with.without_prefix + self.atsign.to_string()
+
+            command = "llookup:" + to_lookup
+            try:
+                response = await self._execute_command(command, False)
+            except AtException as e:
+                raise AtSecondaryConnectException(f"Failed to execute {command} - {e}")
+
+            if response.is_error():
+                if isinstance(response.get_exception(), AtKeyNotFoundException):
+                    return await self.create_shared_encryption_key(key)
+                else:
+                    raise response.get_exception()
+
+            try:
+                shared_key_value = EncryptionUtil.rsa_decrypt_from_base64(response.get_raw_data_response(), self.keys[KeysUtil.encryption_private_key_name])
+            except Exception as e:
+                raise AtDecryptionException(f"Failed to decrypt {to_lookup} - {e}")
+
+            self.shared_key_cache.put(key.shared_with.to_string(), shared_key_value)
+            return shared_key_value
+
+    async def get_encryption_key_shared_by_other(self, shared_key: SharedKey):
+        shared_shared_key_name = shared_key.get_shared_shared_key_name()
+
+        shared_key_value = self.keys.get(shared_shared_key_name)
+        if shared_key_value is not None:
+            return shared_key_value
+
+        # Look up each sender's key once, however many tasks need it at the same time
+        async with self._sender_locks.lock(shared_key.shared_by.to_string()):
+            shared_key_value = self.keys.get(shared_shared_key_name)
+            if shared_key_value is not None:
+                return shared_key_value
+
+            lookup_command = "lookup:" + "shared_key" + str(shared_key.shared_by)
+            try:
+                raw_response = await self._execute_command(lookup_command, True)
+            except AtKeyNotFoundException as e: raise e
+            except AtException as e:
+                raise AtSecondaryConnectException(f"Failed to execute {lookup_command} - {e}")
+
+            try:
+                shared_shared_key_decrypted_value = EncryptionUtil.rsa_decrypt_from_base64(raw_response.get_raw_data_response(), self.keys[KeysUtil.encryption_private_key_name])
+            except Exception as e:
+                raise AtDecryptionException(f"Failed to decrypt the shared_key with our encryption private key - {e}")
+
+            self.keys[shared_shared_key_name] = shared_shared_key_decrypted_value
+
+            return shared_shared_key_decrypted_value
+
+    async def put(self, key, value):
+        if isinstance(key, SharedKey):
+            return await self._put_shared_key(key, value)
+        elif isinstance(key, SelfKey):
+            return await self._put_self_key(key, value)
+        elif isinstance(key, PublicKey):
+            return await self._put_public_key(key, value)
+        else:
+            raise NotImplementedError(f"No implementation found for key type: {type(key)}")
+
+    async def _put_self_key(self, key: SelfKey, value: str):
+        key.metadata.data_signature = EncryptionUtil.sign_sha256_rsa(value, self.keys[KeysUtil.encryption_private_key_name])
+
+        try:
+            cipher_text = EncryptionUtil.aes_encrypt_from_base64(value, self.keys[KeysUtil.self_encryption_key_name])
+        except Exception as e:
+            raise AtEncryptionException(f"Failed to encrypt value with self encryption key - {e}")
+
+        command = UpdateVerbBuilder().with_at_key(key, cipher_text).build()
+        try:
+            return (await self._execute_command(command)).get_raw_data_response()
+        except Exception as e:
+            raise AtSecondaryConnectException(f"Failed to execute {command} - {e}")
+
+    async def _put_public_key(self, key: PublicKey, value: str):
+        key.metadata.data_signature = EncryptionUtil.sign_sha256_rsa(value, self.keys[KeysUtil.encryption_private_key_name])
+
+        command = UpdateVerbBuilder().with_at_key(key, value).build()
+        try:
+            return (await self._execute_command(command)).get_raw_data_response()
+        except Exception as e:
+            raise AtSecondaryConnectException(f"Failed to execute {command} - {e}")
+
+    async def _put_shared_key(self, key: SharedKey, value: str):
+        if self.atsign != key.shared_by:
+            raise AtIllegalArgumentException(f"sharedBy is [{key.shared_by}] but should be this client's atSign [{self.atsign}]")
+
+        what = ""
+        try:
+            what = "fetch/create shared encryption key"
+            share_to_encryption_key = await self.get_encryption_key_shared_by_me(key)
+
+            what = "encrypt value with shared encryption key"
+            cipher_text = EncryptionUtil.aes_encrypt_from_base64(value, share_to_encryption_key)
+        except Exception as e:
+            raise AtEncryptionException(f"Failed to {what} - {e}")
+
+        command = f"update{key.metadata}:{key} {cipher_text}"
+        try:
+            return (await self._execute_command(command, True)).get_raw_data_response()
+        except Exception as e:
+            raise AtSecondaryConnectException(f"Failed to execute {command} - {e}")
+
+    async def get(self, key):
+        if isinstance(key, SharedKey):
+            return await self._get_shared_key(key)
+        elif isinstance(key, SelfKey):
+            return await self._get_self_key(key)
+        elif isinstance(key, PublicKey):
+            return await self._get_public_key(key)
+        else:
+            raise NotImplementedError(f"No implementation found for key type: {type(key)}")
+
+    async def get_lookup_response(self, command: str):
+        try:
+            response = await self._execute_command(command, True)
+        except (AtKeyNotFoundException, AtInternalServerException) as e: raise e
+        except Exception as e:
+            raise AtSecondaryConnectException(f"Failed to execute {command} - {e}")
+
+        try:
+            return json.loads(response.get_raw_data_response())
+        except Exception as e:
+            raise AtResponseHandlingException(f"Failed to parse JSON {response.get_raw_data_response()} - {e}")
+
+    async def _get_self_key(self, key: SelfKey):
+        command = LlookupVerbBuilder().with_at_key(key, LlookupVerbBuilder.Type.ALL).build()
+
+        fetched = await self.get_lookup_response(command)
+
+        encrypted_value = fetched["data"]
+        self_encryption_key = self.keys[KeysUtil.self_encryption_key_name]
+        try:
+            decrypted_value = EncryptionUtil.aes_decrypt_from_base64(encrypted_value, self_encryption_key)
+        except Exception as e:
+            raise AtDecryptionException(f"Failed to {command} - {e}")
+
+        key.metadata = Metadata.squash(Metadata.from_dict(fetched["metaData"]), key.metadata)
+
+        return decrypted_value
+
+    async def _get_public_key(self, key: PublicKey):
+        if self.atsign == key.shared_by:
+            command = LlookupVerbBuilder().with_at_key(key, LlookupVerbBuilder.Type.ALL).build()
+        else:
+            command = PlookupVerbBuilder().with_at_key(key, PlookupVerbBuilder.Type.ALL).build()
+
+        fetched = await self.get_lookup_response(command)
+
+        key.metadata = Metadata.squash(Metadata.from_dict(fetched["metaData"]), key.metadata)
+        key.metadata.is_cached = "cached:" in fetched["key"]
+
+        return fetched["data"]
+
+    async def _get_shared_key(self, key: SharedKey):
+        if key.shared_by == self.atsign:
+            return await self._get_shared_by_me_with_other(key)
+        else:
+            return await self._get_shared_by_other_with_me(key)
+
+    async def _get_shared_by_me_with_other(self, shared_key: SharedKey):
+        share_encryption_key = await self.get_encryption_key_shared_by_me(shared_key)
+
+        command = "llookup:" + str(shared_key)
+        try:
+            raw_response = await self._execute_command(command, True)
+        except (AtKeyNotFoundException, AtInternalServerException) as e: raise e
+        except AtSecondaryConnectException as e:
+            raise AtSecondaryConnectException(f"Failed to execute {command} - {e}")
+
+        try:
+            return EncryptionUtil.aes_decrypt_from_base64(raw_response.get_raw_data_response(), share_encryption_key)
+        except Exception as e:
+            raise AtDecryptionException(f"Failed to decrypt value with shared encryption key - {e}")
+
+    async def _get_shared_by_other_with_me(self, shared_key:SharedKey):
+        share_encryption_key = await self.get_encryption_key_shared_by_other(shared_key)
+
+        command = "lookup:" + shared_key.name
+        if shared_key.get_namespace() is not None and shared_key.get_namespace():
+            command += "." + shared_key.get_namespace()
+        command += str(shared_key.shared_by)
+        try:
+            raw_response = await self._execute_command(command, True)
+        except Exception as e:
+            raise AtSecondaryConnectException(f"Failed to execute {command} - {e}")
+
+        try:
+            return EncryptionUtil.aes_decrypt_from_base64(raw_response.get_raw_data_response(), share_encryption_key)
+        except Exception as e:
+            raise AtDecryptionException(f"Failed to decrypt value with shared encryption key - {e}")
+
+    async def delete(self, key):
+        if isinstance(key, SharedKey) or isinstance(key, SelfKey) or isinstance(key, PublicKey):
+            command = DeleteVerbBuilder().with_at_key(key).build()
+            try:
+                return (await self._execute_command(command)).get_raw_data_response()
+            except Exception as e:
+                raise AtSecondaryConnectException(f"Failed to execute {command} - {e}")
+        else:
+            raise NotImplementedError(f"No implementation found for key type: {type(key)}")
+
+    async def _decrypt_event(self, at_event:AtEvent):
+        """
+        Handle a monitor event the way AtClient.handle_event does, returning the DECRYPTED_UPDATE_NOTIFICATION event
+        for an update notification or None.
+        """
+        event_type = at_event.event_type
+        event_data = at_event.event_data
+        if event_type == AtEventType.SHARED_KEY_NOTIFICATION:
+            if event_data["value"] != None:
+                shared_shared_key_name = event_data["key"]
+                try:
+                    self.keys[shared_shared_key_name] = EncryptionUtil.rsa_decrypt_from_base64(event_data["value"], self.keys[KeysUtil.encryption_private_key_name])
+                except Exception as e:
+                    print(f"Caught exception {e} while decrypting received shared key {shared_shared_key_name}")
+        elif event_type == AtEventType.UPDATE_NOTIFICATION:
+            if event_data["value"] != None:
+                key = event_data["key"]
+                try:
+                    encryption_key_shared_by_other = await self.get_encryption_key_shared_by_other(SharedKey.from_string(key=key))
+                    iv_nonce = (event_data.get("metadata") or {}).get("ivNonce")
+                    decrypted_value = EncryptionUtil.aes_decrypt_from_base64(encrypted_text=event_data["value"].encode(), self_encryption_key=encryption_key_shared_by_other,
+                                                                             iv=base64.b64decode(iv_nonce) if iv_nonce else b'\x00' * 16)
+                    new_event_data = dict(event_data)
+                    new_event_data["decryptedValue"] = decrypted_value
+                    return AtEvent(AtEventType.DECRYPTED_UPDATE_NOTIFICATION, new_event_data)
+                except Exception as e:
+                    print(f"Caught exception {e} while decrypting received data with key name [{key}]")
+        return None
+
+    async def monitor(self, regex:str="", last_received_time:int=0, heartbeat_interval:float=30.0, decrypt:bool=True):
+        """
+        Iterate over the notifications received by this atSign, on a monitor connection of its own.
+
+        The connection is heartbeated, and reopened (resuming from the last notification received) if it closes or
+        heartbeats stop being acknowledged. Stop by breaking out of the loop.
+
+        Parameters
+        ----------
+        regex : str, optional
+            Only notifications for keys matching this regex are received (default is all).
+        last_received_time : int, optional
+            Only notifications received by the server after this epoch millis time are sent (default is all).
+        heartbeat_interval : float, optional
+            Seconds between heartbeats (default is 30).
+        decrypt : bool, optional
+            Follow each update notification that can be decrypted with a DECRYPTED_UPDATE_NOTIFICATION event (default is True).
+
+        Yields
+        ------
+        AtEvent
+            The events, except heartbeat acknowledgements.
+        """
+        while True:
+            connection = None
+            try:
+                connection = await self._connect_authenticated()
+                connection.send("monitor:" + str(last_received_time) + (" " + regex if regex else ""))
+                awaiting_ack = False
+                while True:
+                    try:
+                        line = await asyncio.wait_for(connection.read_line(), heartbeat_interval)
+                        if line is None:
+                            break
+                    except asyncio.TimeoutError:
+                        if awaiting_ack:
+                            print("Monitor heartbeats not being received")
+                            break
+                        connection.send("noop:0")
+                        awaiting_ack = True
+                        continue
+                    if self.verbose:
+                        print("\tRCVD (MONITOR): " + line.decode())
+
+                    at_event = AtMonitorConnection.parse_monitor_response(line, self.atsign)
+                    if at_event.event_type == AtEventType.MONITOR_HEARTBEAT_ACK:
+                        awaiting_ack = False
+                        continue
+                    if at_event.event_type != AtEventType.MONITOR_EXCEPTION:
+                        last_received_time = int(at_event.event_data.get("epochMillis", TimeUtil.current_time_millis()))
+                    yield at_event
+                    if decrypt:
+                        decrypted_event = await self._decrypt_event(at_event)
+                        if decrypted_event is not None:
+                            yield decrypted_event
+            except (AtSecondaryConnectException, OSError) as e:
+                print(f"Monitor connection failed : {e}")
+                traceback.print_exc()
+            finally:
+                if connection is not None:
+                    await connection.disconnect()
+            print("Monitor ending, restarting shortly")
+            await asyncio.sleep(1)
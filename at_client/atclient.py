@@ -1,10 +1,16 @@
 import base64
 import json
+import ssl
 from queue import Empty, Queue
+import threading
 import time
 import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 
 from at_client.connections.notification.atevents import AtEvent, AtEventType
+from at_client.connections.notification.ateventqueue import AtEventQueue
 
 
 from .common.atsign import AtSign
@@ -14,70 +20,358 @@ from .util.keysutil import KeysUtil
 from .common.metadata import Metadata
 from .exception.atexception import *
 from .connections.atrootconnection import AtRootConnection
+from .connections.secondaryaddresscache import SecondaryAddressCache
 from .connections.atsecondaryconnection import AtSecondaryConnection
 from .connections.atmonitorconnection import AtMonitorConnection
+from .connections.atconnectionpool import AtConnectionPool
+from .connections.monitorengine import MonitorEngine
+from .connections.notification.monitorcheckpoint import CheckpointStore, MonitorCheckpoint
 from .util.atconstants import *
 from .connections.address import Address
-from .common.keys import Keys, SharedKey, PrivateHiddenKey, PublicKey, SelfKey
+from .connections.response import Response
+from .common.keys import AtKeyList, Keys, SharedKey, PrivateHiddenKey, PublicKey, SelfKey
 from .util.authutil import AuthUtil
+from .util.lrucache import LRUCache
+from .util.keyedlocks import KeyedLocks
+from .util.localreplica import LocalReplica
+from .util.jsonstream import JsonArrayParser
+
+_NOT_CACHED = object()
 
 class AtClient(ABC):
-    def __init__(self, atsign:AtSign, root_address:Address=Address("root.atsign.org", 64), secondary_address:Address=None, queue:Queue=None, verbose:bool = False):
+    def __init__(self, atsign:AtSign, root_address:Address=Address("root.atsign.org", 64), secondary_address:Address=None, queue:Queue=None, verbose:bool = False,
+                 context:ssl.SSLContext=ssl.create_default_context(), max_connections:int=1, shared_key_cache_size:int=1024,
+                 public_key_cache_ttl:float=3600.0, public_key_negative_cache_ttl:float=60.0,
+                 value_cache_size:int=0, value_cache_max_bytes:int=64 * 1024 * 1024, value_cache_ttl:float=300.0,
+                 replica_path:str=None, lazy_metadata:bool=False, root_cache_path:str=None, root_cache_ttl:float=None):
         self.atsign = atsign
         self.queue = queue
         self.monitor_connection = None
+        self.monitor_session = None
+        self.monitor_checkpoint = None
+        self._monitor_engine = None
         self.keys = KeysUtil.load_keys(atsign)
         self.verbose = verbose
+        # Whether the metadata of fetched keys is decoded field by field when first used, rather than all at once
+        self.lazy_metadata = lazy_metadata
         if secondary_address is None:
+            # The cache of root lookups is shared by every client, so settings given here apply to all of them
+            SecondaryAddressCache.get_instance(ttl=root_cache_ttl, path=root_cache_path)
             self.root_connection = AtRootConnection.get_instance(host=root_address.host, 
                                                             port=root_address.port, 
                                                             verbose=verbose)
             secondary_address = self.root_connection.find_secondary(atsign)
+            try:
+                self.secondary_connection = AtSecondaryConnection(secondary_address, context, verbose=verbose)
+                self.secondary_connection.connect()
+            except OSError as e:
+                # The address may have come from the cache and be stale, so look it up again before giving up
+                self.root_connection.secondary_address_cache.invalidate(atsign)
+                looked_up_address = self.root_connection.find_secondary(atsign, use_cache=False)
+                if str(looked_up_address) == str(secondary_address):
+                    raise AtSecondaryConnectException(f"Failed to connect to secondary {secondary_address} of {atsign} - {e}")
+                secondary_address = looked_up_address
+                self.secondary_connection = AtSecondaryConnection(secondary_address, context, verbose=verbose)
+                self.secondary_connection.connect()
+        else:
+            self.secondary_connection = AtSecondaryConnection(secondary_address, context, verbose=verbose)
+            self.secondary_connection.connect()
         self.secondary_address = secondary_address
-        self.secondary_connection = AtSecondaryConnection(secondary_address, verbose=verbose)
-        self.secondary_connection.connect()
         AuthUtil.authenticate_with_pkam(self.secondary_connection, self.atsign, self.keys)
         self.authenticated = True
+        self._connection_lock = threading.RLock()
+        # Decrypted symmetric keys shared by this atSign, keyed by the atSign they are shared with
+        self.shared_key_cache = LRUCache(max_size=shared_key_cache_size)
+        # Other atSigns' public encryption keys, as (base64, parsed key) or None for atSigns that have none
+        self.public_key_cache = LRUCache(ttl=public_key_cache_ttl)
+        self.public_key_negative_cache_ttl = public_key_negative_cache_ttl
+        self._shared_key_locks = KeyedLocks()
+        self._sender_locks = KeyedLocks()
+        # Values read with get(), as (value, metadata), when enabled with value_cache_size. Kept consistent with the
+        # server by put, delete and the notifications passed to handle_event, and expired by the keys' ttl and ttr
+        self.value_cache = None
+        if value_cache_size > 0:
+            self.value_cache = LRUCache(max_size=value_cache_size, ttl=value_cache_ttl, max_bytes=value_cache_max_bytes,
+                                        sizeof=lambda entry: len(entry[0]) if isinstance(entry[0], str) else 0)
+        # The reads of the value cache's keys in flight, as [reads, invalidations since the first], so that a value read
+        # before its key was invalidated, e.g. by a notification of a newer value, is not cached
+        self._value_fetches = {}
+        self._value_fetches_lock = threading.Lock()
+        self.connection_pool = None
+        if max_connections > 1:
+            self.connection_pool = AtConnectionPool(self.atsign, self.keys, secondary_address, context, min_size=1, max_size=max_connections,
+                                                    connections=[self.secondary_connection], verbose=verbose)
+        # Local copy of this atSign's keystore, when enabled with replica_path, which answers scans and the lookups of
+        # keys it holds. It is brought up to date by sync(), which only fetches the changes since the previous sync
+        self.replica = None
+        self._sync_lock = threading.Lock()
+        if replica_path is not None:
+            self.replica = LocalReplica(replica_path, self.atsign.to_string())
+            self.sync()
+
+    def _execute_command(self, command:str, raise_exception=True, read_the_response:bool=True):
+        if self.connection_pool is not None:
+            with self.connection_pool.connection() as connection:
+                return connection.execute_command(command, raise_exception, read_the_response=read_the_response)
+        with self._connection_lock:
+            return self.secondary_connection.execute_command(command, raise_exception, read_the_response=read_the_response)
     
     def get_at_keys(self, regex, fetch_metadata):
-        scan_command = ScanVerbBuilder().set_regex(regex).set_show_hidden(True).build()
+        return list(self.iter_at_keys(regex, fetch_metadata))
+
+    def iter_at_keys(self, regex=None, fetch_metadata:bool=False, page_size:int=512):
+        """
+        Yield the keys matching regex, like get_at_keys, parsing the scan response as it is received rather than
+        reading it whole and building every AtKey up front.
+
+        When the client has a connection pool of more than one connection, keys are yielded while the response is
+        still being received, on a connection held until the generator is exhausted. Otherwise the connection is
+        needed for other commands in the meantime, so only the key names are collected while it is read.
+
+        Parameters
+        ----------
+        regex : str, optional
+            The regular expression the keys must match (default is all keys).
+        fetch_metadata : bool, optional
+            Fetch each key's metadata as well (default is False).
+        page_size : int, optional
+            The number of keys whose metadata is fetched per pipelined chunk (default is 512).
+        """
+        if self.replica is not None:
+            at_keys_raw = iter(self.replica.scan(regex))
+        else:
+            at_keys_raw = self._iter_scan(ScanVerbBuilder().set_regex(regex).set_show_hidden(True).build())
+        if fetch_metadata:
+            yield from self.iter_keys_metadata(at_keys_raw, chunk_size=page_size)
+        else:
+            for at_key_raw in at_keys_raw:
+                yield Keys.from_string(at_key_raw)
+
+    def get_at_key_list(self, regex=None) -> AtKeyList:
+        """
+        Return the keys matching regex as an AtKeyList, which holds the keys of a large scan in a fraction of the
+        memory a list of AtKeys would take, creating each AtKey only when it is accessed.
+
+        Parameters
+        ----------
+        regex : str, optional
+            The regular expression the keys must match (default is all keys).
+        """
+        if self.replica is not None:
+            return AtKeyList(self.replica.scan(regex))
+        return AtKeyList(self._iter_scan(ScanVerbBuilder().set_regex(regex).set_show_hidden(True).build()))
+
+    def _iter_scan(self, scan_command:str):
+        def parse(connection):
+            parser = JsonArrayParser()
+            pieces = connection.iter_execute_command(scan_command)
+            try:
+                for piece in pieces:
+                    yield from parser.feed(piece)
+                # An empty response means there are no keys
+                if parser.count or parser.finished:
+                    parser.close()
+            except Exception as e:
+                raise AtSecondaryConnectException(f"Failed to execute : {scan_command} : {e}")
+            finally:
+                # Reads the rest of the response if the keys were abandoned part way through
+                pieces.close()
+
+        if self.connection_pool is not None and self.connection_pool.max_size > 1:
+            with self.connection_pool.connection() as connection:
+                yield from parse(connection)
+            return
+        if self.connection_pool is not None:
+            with self.connection_pool.connection() as connection:
+                at_keys_raw = list(parse(connection))
+        else:
+            with self._connection_lock:
+                at_keys_raw = list(parse(self.secondary_connection))
+        yield from at_keys_raw
+
+    def sync(self, limit:int=1000) -> int:
+        """
+        Bring the local replica up to date, fetching the commit log entries added since its last sync from the server.
+
+        Parameters
+        ----------
+        limit : int, optional
+            The maximum number of entries fetched per sync command (default is 1000).
+
+        Returns
+        -------
+        int
+            The number of entries applied.
+        """
+        if self.replica is None:
+            raise AtIllegalArgumentException("This client has no local replica - create it with a replica_path")
+
+        stats_command = StatsVerbBuilder().add_stat_id(StatsVerbBuilder.LAST_COMMIT_ID).build()
+        stats_raw_response = self._execute_command(stats_command, True).get_raw_data_response()
         try:
-            scan_raw_response = self.secondary_connection.execute_command(scan_command, True).get_raw_data_response()
+            stats = {str(stat["id"]): stat["value"] for stat in json.loads(stats_raw_response)}
+            last_commit_id = stats.get(str(StatsVerbBuilder.LAST_COMMIT_ID))
+            last_commit_id = int(last_commit_id) if last_commit_id not in (None, "null") else -1
         except Exception as e:
-            raise AtSecondaryConnectException(f"Failed to execute : {scan_command} : {e}")
-        
-        keys_list = []
-        if len(scan_raw_response) > 0:
-            keys_list = json.loads(scan_raw_response)
+            raise AtResponseHandlingException(f"Failed to parse {stats_command} response {stats_raw_response} - {e}")
 
-        at_keys = []
-        for at_key_raw in keys_list:
-            at_key = Keys.from_string(at_key_raw)
-            if fetch_metadata:
-                llookup_command = "llookup:meta:" + at_key_raw
+        applied = 0
+        with self._sync_lock:
+            if last_commit_id < self.replica.last_commit_id:
+                # The server's commit log has been reset, so the replica's commit id means nothing any more
+                self.replica.clear()
+            while self.replica.last_commit_id < last_commit_id:
+                sync_command = SyncVerbBuilder().set_from_commit_id(self.replica.last_commit_id).set_limit(limit).build()
+                sync_raw_response = self._execute_command(sync_command, True).get_raw_data_response()
                 try:
-                    llookup_meta_response = self.secondary_connection.execute_command(llookup_command, read_the_response=True).get_raw_data_response()
+                    entries = json.loads(sync_raw_response) if sync_raw_response else []
                 except Exception as e:
-                    raise AtSecondaryConnectException(f"Failed to execute : {llookup_command} : {e}")
-                
-                try:
-                    at_key.metadata = Metadata.squash(at_key.metadata, Metadata.from_json(llookup_meta_response))
-                except Exception as e:
-                    raise AtResponseHandlingException(f"Failed to parse JSON : {llookup_meta_response} : {e}")
-            
+                    raise AtResponseHandlingException(f"Failed to parse {sync_command} response - {e}")
+                if not entries:
+                    break
+                self.replica.apply(entries)
+                applied += len(entries)
+        return applied
+
+    def _replica_response(self, command:str):
+        """
+        Return the response to a lookup command from the local replica, or None if the replica cannot answer it.
+        """
+        if self.replica is None:
+            return None
+        kind = ""
+        if command.startswith("llookup:"):
+            name = command[len("llookup:"):]
+            if name.startswith("all:") or name.startswith("meta:"):
+                kind, name = name.split(":", 1)
+        elif command.startswith("lookup:") and not command.startswith(("lookup:all:", "lookup:meta:")):
+            name = "cached:" + self.atsign.to_string() + ":" + command[len("lookup:"):]
+        elif command.startswith("plookup:"):
+            name = command[len("plookup:"):]
+            if name.startswith("all:"):
+                kind, name = name.split(":", 1)
+            name = "cached:public:" + name
+        else:
+            return None
+
+        entry = self.replica.get(name)
+        if entry is None or entry[1] is None:
+            return None
+        value, metadata = entry
+        if kind == "all":
+            return Response().set_raw_data_response(json.dumps({"key": name, "data": value, "metaData": metadata}))
+        if kind == "meta":
+            return Response().set_raw_data_response(json.dumps(metadata))
+        return Response().set_raw_data_response(value)
+
+    def _execute_lookups(self, commands:list) -> list:
+        """
+        Like _execute_commands, but answering the commands which the local replica can answer locally.
+        """
+        responses = [self._replica_response(command) for command in commands]
+        remote = [index for index, response in enumerate(responses) if response is None]
+        if remote:
+            for index, response in zip(remote, self._execute_commands([commands[index] for index in remote])):
+                responses[index] = response
+        return responses
+
+    def _replicate_update(self, key, commit_id:str, deleted:bool=False):
+        """
+        Record in the local replica that key has been updated or deleted by the commit with id commit_id, until the
+        next sync brings in the change. Returns commit_id.
+        """
+        if self.replica is not None:
+            name = DeleteVerbBuilder().with_at_key(key).build()[len("delete:"):]
+            try:
+                commit_id_value = int(commit_id)
+            except (TypeError, ValueError):
+                commit_id_value = None
+            if deleted:
+                self.replica.remove(name, commit_id_value)
+            else:
+                self.replica.mark_stale(name, commit_id_value)
+        return commit_id
+
+    def _execute_commands(self, commands:list) -> list:
+        if self.connection_pool is not None:
+            with self.connection_pool.connection() as connection:
+                return connection.execute_commands(commands)
+        with self._connection_lock:
+            return self.secondary_connection.execute_commands(commands)
+
+    def _iter_chunks(self, chunks, work):
+        """
+        Yield work(chunk) for each chunk, in order. When the client has a connection pool, work runs for one chunk per
+        connection at a time.
+        """
+        if self.connection_pool is None or self.connection_pool.max_size == 1:
+            for chunk in chunks:
+                yield work(chunk)
+            return
+
+        chunks = iter(chunks)
+        with ThreadPoolExecutor(max_workers=self.connection_pool.max_size) as executor:
+            in_flight = deque(executor.submit(work, chunk) for chunk in islice(chunks, self.connection_pool.max_size))
+            try:
+                while in_flight:
+                    result = in_flight.popleft().result()
+                    for chunk in islice(chunks, 1):
+                        in_flight.append(executor.submit(work, chunk))
+                    yield result
+            finally:
+                for future in in_flight:
+                    future.cancel()
+
+    @staticmethod
+    def _parse_llookup_meta(commands:list, responses:list, lazy:bool=False) -> list:
+        at_keys = []
+        for llookup_command, response in zip(commands, responses):
+            if response.is_error():
+                raise AtSecondaryConnectException(f"Failed to execute : {llookup_command} : {response.get_exception()}")
+            at_key = Keys.from_string(llookup_command[len("llookup:meta:"):])
+            llookup_meta_response = response.get_raw_data_response()
+            try:
+                at_key.metadata = Metadata.squash(at_key.metadata, Metadata.from_json(llookup_meta_response, lazy=lazy))
+            except Exception as e:
+                raise AtResponseHandlingException(f"Failed to parse JSON : {llookup_meta_response} : {e}")
             at_keys.append(at_key)
-        
         return at_keys
-    
+
+    def iter_keys_metadata(self, at_keys_raw, chunk_size:int=512):
+        """
+        Fetch the metadata of many keys, yielding an AtKey with its metadata for each key, in order.
+
+        The llookup:meta commands are pipelined a chunk at a time, and when the client has a connection pool the chunks
+        are spread over its connections. At most one chunk per connection is held in memory, and the connections are
+        not held between chunks, so the client can be used while iterating.
+
+        Parameters
+        ----------
+        at_keys_raw : iterable of str
+            The keys, as returned by scan.
+        chunk_size : int, optional
+            The number of keys looked up per chunk (default is 512).
+        """
+        commands = ("llookup:meta:" + at_key_raw for at_key_raw in at_keys_raw)
+        chunks = iter(lambda: list(islice(commands, chunk_size)), [])
+        for at_keys in self._iter_chunks(chunks, lambda chunk: self._parse_llookup_meta(chunk, self._execute_lookups(chunk), self.lazy_metadata)):
+            yield from at_keys
+
     def is_authenticated(self):
         return self.authenticated
     
     def get_public_encryption_key(self, shared_with):
-        raw_response = None
+        entry = self._get_public_encryption_key_entry(shared_with)
+        return None if entry is None else entry[0]
+
+    def _get_public_encryption_key_entry(self, shared_with):
+        cached = self.public_key_cache.get(shared_with.to_string(), _NOT_CACHED)
+        if cached is not _NOT_CACHED:
+            return cached
 
         command = "plookup:publickey" + shared_with.to_string()
         try:
-            response = self.secondary_connection.execute_command(command, False)
+            response = self._execute_command(command, False)
         except AtSecondaryNotFoundException as e: raise e
         except AtSecondaryConnectException as e:
             raise AtSecondaryConnectException(f"Failed to execute {command} - {e}")
@@ -85,15 +379,21 @@ class AtClient(ABC):
         if response.is_error():
             ex = response.get_exception()
             if isinstance(ex, AtKeyNotFoundException) or isinstance(ex, AtInternalServerException): 
+                self.public_key_cache.put(shared_with.to_string(), None, ttl=self.public_key_negative_cache_ttl)
                 return None
             else:
                 raise ex
-        else:
-            return response.get_raw_data_response()
 
-    
+        raw_key = response.get_raw_data_response()
+        try:
+            entry = (raw_key, EncryptionUtil.public_key_from_base64(raw_key))
+        except Exception as e:
+            raise AtEncryptionException(f"Failed to parse public key of {shared_with} - {e}")
+        self.public_key_cache.put(shared_with.to_string(), entry)
+        return entry
+
     def create_shared_encryption_key(self, shared_key: SharedKey):
-        their_public_encryption_key = self.get_public_encryption_key(shared_key.shared_with)
+        their_public_encryption_key = self._get_public_encryption_key_entry(shared_key.shared_with)
         if their_public_encryption_key is None:
             raise AtKeyNotFoundException(f" public key {shared_key.shared_with.to_string()} not found but service is running - maybe that AtSign has not yet been onboarded")
 
@@ -106,7 +406,7 @@ class AtClient(ABC):
         step = ""
         try:
             step = "encrypt new shared key with their public key"
-            encrypted_for_other = EncryptionUtil.rsa_encrypt_to_base64(aes_key, their_public_encryption_key)
+            encrypted_for_other = EncryptionUtil.rsa_encrypt_to_base64(aes_key, their_public_encryption_key[1])
 
             step = "encrypt new shared key with our public key"
             encrypted_for_us = EncryptionUtil.rsa_encrypt_to_base64(aes_key, self.keys.get(KeysUtil.encryption_public_key_name))
@@ -114,38 +414,53 @@ class AtClient(ABC):
             step = "save encrypted shared key for us"
             command1 = "update:" + "shared_key." + shared_key.shared_with.without_prefix + shared_key.shared_by.to_string()\
                                     + " " + encrypted_for_us
-            self.secondary_connection.execute_command(command1, True)
+            self._execute_command(command1, True)
 
             step = "save encrypted shared key for them"
             ttr = 24 * 60 * 60 * 1000
             command2 = "update:ttr:" + str(ttr) + ":" + shared_key.shared_with.to_string() + ":shared_key" + shared_key.shared_by.to_string()\
                                     + " " + encrypted_for_other
-            self.secondary_connection.execute_command(command2, True)
+            self._execute_command(command2, True)
         except Exception as e:
             raise AtEncryptionException(f"Failed to {step} - {e}")
 
+        self.shared_key_cache.put(shared_key.shared_with.to_string(), aes_key)
         return aes_key
     
     def get_encryption_key_shared_by_me(self, key: SharedKey):
-        response = None
-        to_lookup = "shared_key." + key.shared_with.without_prefix + self.atsign.to_string()
+        cached = self.shared_key_cache.get(key.shared_with.to_string())
+        if cached is not None:
+            return cached
 
-        command = "llookup:" + to_lookup
-        try:
-            response = self.secondary_connection.execute_command(command, False)
-        except AtException as e:
-            raise AtSecondaryConnectException(f"Failed to execute {command} - {e}")
+        # Only one thread looks up or creates each recipient's shared key at a time, so concurrent puts to the same atSign
+        # can't create different ones, while those to other atSigns go ahead
+        with self._shared_key_locks.lock(key.shared_with.to_string()):
+            cached = self.shared_key_cache.get(key.shared_with.to_string())
+            if cached is not None:
+                return cached
 
-        if response.is_error():
-            if isinstance(response.get_exception(), AtKeyNotFoundException):
-                return self.create_shared_encryption_key(key)
-            else:
-                raise response.get_exception()
+            response = None
+            to_lookup = "shared_key." + key.shared_with.without_prefix + self.atsign.to_string()
 
-        try:
-            return EncryptionUtil.rsa_decrypt_from_base64(response.get_raw_data_response(), self.keys[KeysUtil.encryption_private_key_name])
-        except Exception as e:
-            raise AtDecryptionException(f"Failed to decrypt {to_lookup} - e")
+            command = "llookup:" + to_lookup
+            try:
+                response = self._replica_response(command) or self._execute_command(command, False)
+            except AtException as e:
+                raise AtSecondaryConnectException(f"Failed to execute {command} - {e}")
+
+            if response.is_error():
+                if isinstance(response.get_exception(), AtKeyNotFoundException):
+                    return self.create_shared_encryption_key(key)
+                else:
+                    raise response.get_exception()
+
+            try:
+                shared_key_value = EncryptionUtil.rsa_decrypt_from_base64(response.get_raw_data_response(), self.keys[KeysUtil.encryption_private_key_name])
+            except Exception as e:
+                raise AtDecryptionException(f"Failed to decrypt {to_lookup} - {e}")
+
+            self.shared_key_cache.put(key.shared_with.to_string(), shared_key_value)
+            return shared_key_value
         
     def get_encryption_key_shared_by_other(self, shared_key: SharedKey):
         shared_shared_key_name = shared_key.get_shared_shared_key_name()
@@ -154,23 +469,29 @@ class AtClient(ABC):
         if shared_key_value is not None:
             return shared_key_value
 
-        lookup_command = "lookup:" + "shared_key" + str(shared_key.shared_by)
-        raw_response = None
-        try:
-            raw_response = self.secondary_connection.execute_command(lookup_command, True)
-        except AtKeyNotFoundException as e: raise e
-        except AtException as e:
-            raise AtSecondaryConnectException(f"Failed to execute {lookup_command} - {e}")
+        # Look up each sender's key once, however many threads need it at the same time
+        with self._sender_locks.lock(shared_key.shared_by.to_string()):
+            shared_key_value = self.keys.get(shared_shared_key_name)
+            if shared_key_value is not None:
+                return shared_key_value
 
-        shared_shared_key_decrypted_value = None
-        try:
-            shared_shared_key_decrypted_value = EncryptionUtil.rsa_decrypt_from_base64(raw_response.get_raw_data_response(), self.keys[KeysUtil.encryption_private_key_name])
-        except Exception as e:
-            raise AtDecryptionException(f"Failed to decrypt the shared_key with our encryption private key - {e}")
+            lookup_command = "lookup:" + "shared_key" + str(shared_key.shared_by)
+            raw_response = None
+            try:
+                raw_response = self._execute_command(lookup_command, True)
+            except AtKeyNotFoundException as e: raise e
+            except AtException as e:
+                raise AtSecondaryConnectException(f"Failed to execute {lookup_command} - {e}")
+
+            shared_shared_key_decrypted_value = None
+            try:
+                shared_shared_key_decrypted_value = EncryptionUtil.rsa_decrypt_from_base64(raw_response.get_raw_data_response(), self.keys[KeysUtil.encryption_private_key_name])
+            except Exception as e:
+                raise AtDecryptionException(f"Failed to decrypt the shared_key with our encryption private key - {e}")
 
-        self.keys[shared_shared_key_name] =  shared_shared_key_decrypted_value
+            self.keys[shared_shared_key_name] =  shared_shared_key_decrypted_value
 
-        return shared_shared_key_decrypted_value
+            return shared_shared_key_decrypted_value
 
 
     def put(self, key, value):
@@ -183,7 +504,23 @@ class AtClient(ABC):
         else:
             raise NotImplementedError(f"No implementation found for key type: {type(key)}")
 
-    def _put_self_key(self, key: SelfKey, value: str):
+    def _prepare_put(self, key, value) -> str:
+        if isinstance(key, SharedKey):
+            return self._prepare_shared_key_update(key, value)
+        elif isinstance(key, SelfKey):
+            return self._prepare_self_key_update(key, value)
+        elif isinstance(key, PublicKey):
+            return self._prepare_public_key_update(key, value)
+        else:
+            raise NotImplementedError(f"No implementation found for key type: {type(key)}")
+
+    def _execute_update(self, command:str):
+        try:
+            return self._execute_command(command, True).get_raw_data_response()
+        except Exception as e:
+            raise AtSecondaryConnectException(f"Failed to execute {command} - {e}")
+
+    def _prepare_self_key_update(self, key: SelfKey, value: str) -> str:
         key.metadata.data_signature = EncryptionUtil.sign_sha256_rsa(value, self.keys[KeysUtil.encryption_private_key_name])
 
         try:
@@ -191,23 +528,14 @@ class AtClient(ABC):
         except Exception as e:
             raise AtEncryptionException(f"Failed to encrypt value with self encryption key - {e}")
         
-        command = UpdateVerbBuilder().with_at_key(key, cipher_text).build()
-        try:
-            return self.secondary_connection.execute_command(command).get_raw_data_response()
-        except Exception as e:
-            raise AtSecondaryConnectException(f"Failed to execute {command} - {e}")
+        return UpdateVerbBuilder().with_at_key(key, cipher_text).build()
 
-    def _put_public_key(self, key: PublicKey, value: str):
+    def _prepare_public_key_update(self, key: PublicKey, value: str) -> str:
         key.metadata.data_signature = EncryptionUtil.sign_sha256_rsa(value, self.keys[KeysUtil.encryption_private_key_name])
 
-        command = UpdateVerbBuilder().with_at_key(key, value).build()
+        return UpdateVerbBuilder().with_at_key(key, value).build()
 
-        try:
-            return self.secondary_connection.execute_command(command).get_raw_data_response()
-        except Exception as e:
-            raise AtSecondaryConnectException(f"Failed to execute {command} - {e}")
-        
-    def _put_shared_key(self, key: SharedKey, value: str):
+    def _prepare_shared_key_update(self, key: SharedKey, value: str) -> str:
         if self.atsign != key.shared_by:
             raise AtIllegalArgumentException(f"sharedBy is [{key.shared_by}] but should be this client's atSign [{self.atsign}]")
 
@@ -222,29 +550,231 @@ class AtClient(ABC):
         except Exception as e:
             raise AtEncryptionException(f"Failed to {what} - {e}")
 
-        command = f"update{key.metadata}:{key} {cipher_text}"
+        return f"update{key.metadata}:{key} {cipher_text}"
+
+    def _put_self_key(self, key: SelfKey, value: str):
+        self._invalidate_cached_value(key)
+        return self._put_prepared(key, self._prepare_self_key_update(key, value))
+
+    def _put_public_key(self, key: PublicKey, value: str):
+        self._invalidate_cached_value(key)
+        return self._put_prepared(key, self._prepare_public_key_update(key, value))
+        
+    def _put_shared_key(self, key: SharedKey, value: str):
+        self._invalidate_cached_value(key)
+        return self._put_prepared(key, self._prepare_shared_key_update(key, value))
 
+    def _put_prepared(self, key, command:str):
         try:
-            return self.secondary_connection.execute_command(command, True).get_raw_data_response()
-        except Exception as e:
-            raise AtSecondaryConnectException(f"Failed to execute {command} - {e}")
+            return self._replicate_update(key, self._execute_update(command))
+        finally:
+            # A get() which started after the invalidation before the update, but read the value before the server
+            # applied it, must not cache the old value
+            self._invalidate_cached_value(key)
+
+    def put_many(self, items, chunk_size:int=512) -> list:
+        """
+        Put many keys, pipelining the update commands.
+
+        Shared encryption keys are resolved once per recipient before any value is encrypted. The updates are sent a
+        chunk at a time, and when the client has a connection pool the chunks are spread over its connections.
+
+        Parameters
+        ----------
+        items : iterable of (AtKey, str)
+            The keys and their values.
+        chunk_size : int, optional
+            The number of updates pipelined per chunk (default is 512).
+
+        Returns
+        -------
+        list
+            For each item, in order, the server's response as put() would return it, or the exception put() would have
+            raised for it.
+        """
+        items = list(items)
+        results = [None] * len(items)
+
+        # Resolve (or create) each recipient's shared key once, so one failure is reported for all of its items
+        shared_key_errors = {}
+        for key, _ in items:
+            if isinstance(key, SharedKey) and self.atsign == key.shared_by:
+                shared_with = key.shared_with.to_string()
+                if shared_with not in shared_key_errors:
+                    try:
+                        self.get_encryption_key_shared_by_me(key)
+                        shared_key_errors[shared_with] = None
+                    except Exception as e:
+                        shared_key_errors[shared_with] = AtEncryptionException(f"Failed to fetch/create shared encryption key - {e}")
+
+        def prepared_chunks():
+            # Prepared lazily, so that signing and encrypting the next chunk overlaps sending the previous ones
+            for start in range(0, len(items), chunk_size):
+                chunk = []
+                for index in range(start, min(start + chunk_size, len(items))):
+                    key, value = items[index]
+                    self._invalidate_cached_value(key)
+                    error = shared_key_errors.get(key.shared_with.to_string()) if isinstance(key, SharedKey) else None
+                    if error is not None:
+                        results[index] = error
+                        continue
+                    try:
+                        chunk.append((index, self._prepare_put(key, value)))
+                    except Exception as e:
+                        results[index] = e
+                if chunk:
+                    yield chunk
+
+        def execute(chunk):
+            try:
+                responses = self._execute_commands([command for _, command in chunk])
+            except Exception as e:
+                for index, command in chunk:
+                    results[index] = AtSecondaryConnectException(f"Failed to execute {command} - {e}")
+                return
+            finally:
+                # As in put(), values read while the updates were being sent must not be cached
+                for index, _ in chunk:
+                    self._invalidate_cached_value(items[index][0])
+            for (index, command), response in zip(chunk, responses):
+                if response.is_error():
+                    results[index] = AtSecondaryConnectException(f"Failed to execute {command} - {response.get_exception()}")
+                else:
+                    results[index] = self._replicate_update(items[index][0], response.get_raw_data_response())
+
+        for _ in self._iter_chunks(prepared_chunks(), execute):
+            pass
+        return results
     
     def get(self, key):
+        cached = self._get_cached_value(key)
+        if cached is not _NOT_CACHED:
+            return cached
+        fetch = self._start_fetch(key)
+        try:
+            value = self._lookup(*self._prepare_get(key))
+        except Exception:
+            self._abandon_fetch(fetch)
+            raise
+        self._cache_value(key, value, fetch)
+        return value
+
+    def _get_cached_value(self, key):
+        if self.value_cache is None:
+            return _NOT_CACHED
+        cached = self.value_cache.get(str(key), _NOT_CACHED)
+        if cached is _NOT_CACHED:
+            return _NOT_CACHED
+        value, metadata = cached
+        if metadata is not None:
+            key.metadata = Metadata.squash(metadata, key.metadata)
+        return value
+
+    def _start_fetch(self, key):
+        """
+        Register a read of key from the server, returning what to pass to _cache_value with the value read, or to
+        _abandon_fetch if there is none.
+        """
+        if self.value_cache is None:
+            return None
+        cache_key = str(key)
+        with self._value_fetches_lock:
+            fetch = self._value_fetches.setdefault(cache_key, [0, 0])
+            fetch[0] += 1
+            return cache_key, fetch[1]
+
+    def _end_fetch(self, fetch) -> bool:
+        # Called with _value_fetches_lock held; whether the key has not been invalidated since the read started
+        cache_key, invalidations = fetch
+        reads = self._value_fetches[cache_key]
+        reads[0] -= 1
+        if reads[0] == 0:
+            del self._value_fetches[cache_key]
+        return reads[1] == invalidations
+
+    def _abandon_fetch(self, fetch):
+        if fetch is not None:
+            with self._value_fetches_lock:
+                self._end_fetch(fetch)
+
+    def _cache_value(self, key, value, fetch=None):
+        """
+        Cache the value of key, unless it was read from the server (fetch, as returned by _start_fetch) and key has been
+        invalidated since.
+        """
+        if self.value_cache is None:
+            return
+        metadata = key.metadata
+        # The entry must not outlive the key (ttl), nor a cached key's refresh from its owner (ttr)
+        ttl = None
+        if metadata.ttl and metadata.ttl > 0:
+            ttl = metadata.ttl / 1000
+        if metadata.ttr and metadata.ttr > 0:
+            ttl = metadata.ttr / 1000 if ttl is None else min(ttl, metadata.ttr / 1000)
+        if metadata.expires_at is not None:
+            try:
+                remaining = metadata.expires_at.timestamp() - time.time()
+            except (AttributeError, OverflowError, ValueError):
+                remaining = None
+            if remaining is not None:
+                ttl = remaining if ttl is None else min(ttl, remaining)
+        if ttl is not None and self.value_cache.ttl is not None:
+            ttl = min(ttl, self.value_cache.ttl)
+        if fetch is None:
+            self._put_cached_value(str(key), value, metadata, ttl)
+            return
+        # Holding the lock, so that an invalidation either comes before the check or removes what was put
+        with self._value_fetches_lock:
+            if self._end_fetch(fetch):
+                self._put_cached_value(str(key), value, metadata, ttl)
+
+    def _put_cached_value(self, cache_key, value, metadata, ttl):
+        if ttl is not None and ttl <= 0:
+            self.value_cache.invalidate(cache_key)
+        else:
+            self.value_cache.put(cache_key, (value, metadata), ttl)
+
+    def _invalidate_cached_value(self, key):
+        if self.value_cache is not None:
+            cache_key = str(key)
+            with self._value_fetches_lock:
+                fetch = self._value_fetches.get(cache_key)
+                if fetch is not None:
+                    fetch[1] += 1
+            self.value_cache.invalidate(cache_key)
+
+    def _prepare_get(self, key):
+        """
+        Return the lookup command for key and a function which turns the server's Response to it into get()'s result.
+        """
         if isinstance(key, SharedKey):
-            return self._get_shared_key(key)
+            if key.shared_by == self.atsign:
+                return self._prepare_shared_by_me_with_other_get(key)
+            else:
+                return self._prepare_shared_by_other_with_me_get(key)
         elif isinstance(key, SelfKey):
-            return self._get_self_key(key)
+            return self._prepare_self_key_get(key)
         elif isinstance(key, PublicKey):
-            return self._get_public_key(key)
+            return self._prepare_public_key_get(key)
         else:
             raise NotImplementedError(f"No implementation found for key type: {type(key)}")
-        
-    def get_lookup_response(self, command: str):
+
+    def _lookup(self, command: str, finish):
         try:
-            response = self.secondary_connection.execute_command(command, True)
-        except (AtKeyNotFoundException, AtInternalServerException) as e: raise e
+            response = self._replica_response(command) or self._execute_command(command, False)
         except Exception as e:
             raise AtSecondaryConnectException(f"Failed to execute {command} - {e}")
+        return finish(response)
+        
+    def get_lookup_response(self, command: str):
+        return self._lookup(command, lambda response: self._parse_lookup_response(command, response))
+
+    @staticmethod
+    def _parse_lookup_response(command: str, response):
+        if response.is_error():
+            e = response.get_exception()
+            if isinstance(e, (AtKeyNotFoundException, AtInternalServerException)): raise e
+            raise AtSecondaryConnectException(f"Failed to execute {command} - {e}")
 
         fetched = None
         try:
@@ -254,25 +784,27 @@ class AtClient(ABC):
 
         return fetched
 
-        
-    def _get_self_key(self, key: SelfKey):
+    def _prepare_self_key_get(self, key: SelfKey):
         command = LlookupVerbBuilder().with_at_key(key, LlookupVerbBuilder.Type.ALL).build()
 
-        fetched = self.get_lookup_response(command)
+        def finish(response):
+            fetched = self._parse_lookup_response(command, response)
 
-        decrypted_value = None
-        encrypted_value = fetched["data"]
-        self_encryption_key = self.keys[KeysUtil.self_encryption_key_name]
-        try:
-            decrypted_value = EncryptionUtil.aes_decrypt_from_base64(encrypted_value, self_encryption_key)
-        except Exception as e:
-            raise AtDecryptionException(f"Failed to {command} - {e}")
+            decrypted_value = None
+            encrypted_value = fetched["data"]
+            self_encryption_key = self.keys[KeysUtil.self_encryption_key_name]
+            try:
+                decrypted_value = EncryptionUtil.aes_decrypt_from_base64(encrypted_value, self_encryption_key)
+            except Exception as e:
+                raise AtDecryptionException(f"Failed to {command} - {e}")
 
-        key.metadata = Metadata.squash(Metadata.from_dict(fetched["metaData"]), key.metadata)
+            key.metadata = Metadata.squash(Metadata.from_dict(fetched["metaData"], lazy=self.lazy_metadata), key.metadata)
 
-        return decrypted_value
+            return decrypted_value
+
+        return command, finish
     
-    def _get_public_key(self, key: PublicKey):
+    def _prepare_public_key_get(self, key: PublicKey):
         command = ""
         if self.atsign == key.shared_by:
             command = LlookupVerbBuilder().with_at_key(key, LlookupVerbBuilder.Type.ALL).build()
@@ -280,86 +812,206 @@ class AtClient(ABC):
             builder = PlookupVerbBuilder()
             command = builder.with_at_key(key, PlookupVerbBuilder.Type.ALL).build()
 
-        fetched = self.get_lookup_response(command)
+        def finish(response):
+            fetched = self._parse_lookup_response(command, response)
 
-        key.metadata = Metadata.squash(Metadata.from_dict(fetched["metaData"]), key.metadata)
-        key.metadata.is_cached = "cached:" in fetched["key"]
+            key.metadata = Metadata.squash(Metadata.from_dict(fetched["metaData"], lazy=self.lazy_metadata), key.metadata)
+            key.metadata.is_cached = "cached:" in fetched["key"]
 
-        return fetched["data"]
-    
-    def _get_shared_key(self, key: SharedKey):
-        if key.shared_by == self.atsign:
-            return self._get_shared_by_me_with_other(key)
-        else:
-            return self._get_shared_by_other_with_me(key)
+            return fetched["data"]
 
-    def _get_shared_by_me_with_other(self, shared_key: SharedKey):
+        return command, finish
+
+    def _prepare_shared_by_me_with_other_get(self, shared_key: SharedKey):
         share_encryption_key = self.get_encryption_key_shared_by_me(shared_key)
 
-        raw_response = None
         command = "llookup:" + str(shared_key)
-        try:
-            raw_response = self.secondary_connection.execute_command(command, True)
-        except (AtKeyNotFoundException, AtInternalServerException) as e: raise e
-        except AtSecondaryConnectException as e:
-            raise AtSecondaryConnectException(f"Failed to execute {command} - {e}")
 
-        try:
-            return EncryptionUtil.aes_decrypt_from_base64(raw_response.get_raw_data_response(), share_encryption_key)
-        except Exception as e:
-            raise AtDecryptionException(f"Failed to decrypt value with shared encryption key - {e}")
+        def finish(response):
+            if response.is_error():
+                raise response.get_exception()
 
-    def _get_shared_by_other_with_me(self, shared_key:SharedKey):
-        what = None
+            try:
+                return EncryptionUtil.aes_decrypt_from_base64(response.get_raw_data_response(), share_encryption_key)
+            except Exception as e:
+                raise AtDecryptionException(f"Failed to decrypt value with shared encryption key - {e}")
+
+        return command, finish
+
+    def _prepare_shared_by_other_with_me_get(self, shared_key:SharedKey):
         share_encryption_key = self.get_encryption_key_shared_by_other(shared_key)
 
-        raw_response = None
         command = "lookup:" + shared_key.name
         if shared_key.get_namespace() is not None and shared_key.get_namespace():
             command += "." + shared_key.get_namespace()
         command += str(shared_key.shared_by)
-        try:
-            raw_response = self.secondary_connection.execute_command(command, True)
-        except Exception as e:
-            raise AtSecondaryConnectException(f"Failed to execute {command} - {e}")
 
-        what = "decrypt value with shared encryption key"
-        try:
-            return EncryptionUtil.aes_decrypt_from_base64(raw_response.get_raw_data_response(), share_encryption_key)
-        except Exception as e:
-            raise AtDecryptionException(f"Failed to {what} - {e}")
+        def finish(response):
+            if response.is_error():
+                raise AtSecondaryConnectException(f"Failed to execute {command} - {response.get_exception()}")
+
+            try:
+                return EncryptionUtil.aes_decrypt_from_base64(response.get_raw_data_response(), share_encryption_key)
+            except Exception as e:
+                raise AtDecryptionException(f"Failed to decrypt value with shared encryption key - {e}")
+
+        return command, finish
+
+    def get_many(self, keys, chunk_size:int=512) -> list:
+        """
+        Get many keys, pipelining the lookups. See iter_get_many.
+
+        Returns
+        -------
+        list
+            For each key, in order, the value get() would return, or the exception get() would have raised for it.
+        """
+        return list(self.iter_get_many(keys, chunk_size))
+
+    def iter_get_many(self, keys, chunk_size:int=512):
+        """
+        Get many keys, pipelining the lookups and yielding the results in the same order as the keys, a chunk at a time
+        as the chunks complete.
+
+        The shared encryption key of each sender or recipient is fetched once, before any lookup is sent. Lookups are
+        pipelined a chunk at a time, and when the client has a connection pool the chunks are spread over its
+        connections and decrypted there.
+
+        Parameters
+        ----------
+        keys : iterable of AtKey
+            The keys to get. Their metadata is updated as get() would update it.
+        chunk_size : int, optional
+            The number of lookups pipelined per chunk (default is 512).
+
+        Yields
+        ------
+        object
+            For each key, the value get() would return, or the exception get() would have raised for it.
+        """
+        keys = list(keys)
+
+        # Fetch each shared key once up front, so one failure is reported for all the keys which need it
+        shared_key_errors = {}
+        for key in keys:
+            if isinstance(key, SharedKey):
+                owner = key.shared_with.to_string() if key.shared_by == self.atsign else key.shared_by.to_string()
+                if (key.shared_by == self.atsign, owner) not in shared_key_errors:
+                    try:
+                        if key.shared_by == self.atsign:
+                            self.get_encryption_key_shared_by_me(key)
+                        else:
+                            self.get_encryption_key_shared_by_other(key)
+                        error = None
+                    except Exception as e:
+                        error = e
+                    shared_key_errors[(key.shared_by == self.atsign, owner)] = error
+
+        def prepare(key):
+            cached = self._get_cached_value(key)
+            if cached is not _NOT_CACHED:
+                return None, lambda _: cached, None
+            if isinstance(key, SharedKey):
+                owner = key.shared_with.to_string() if key.shared_by == self.atsign else key.shared_by.to_string()
+                error = shared_key_errors[(key.shared_by == self.atsign, owner)]
+                if error is not None:
+                    return error
+            try:
+                command, finish = self._prepare_get(key)
+            except Exception as e:
+                return e
+            fetch = self._start_fetch(key)
+
+            def finish_and_cache(response):
+                try:
+                    value = finish(response)
+                except Exception:
+                    self._abandon_fetch(fetch)
+                    raise
+                self._cache_value(key, value, fetch)
+                return value
+
+            return command, finish_and_cache, fetch
+
+        def execute(chunk):
+            prepared = [prepare(key) for key in chunk]
+            lookups = [entry for entry in prepared if not isinstance(entry, Exception) and entry[0] is not None]
+            try:
+                responses = iter(self._execute_lookups([command for command, _, _ in lookups]) if lookups else [])
+            except Exception as e:
+                for _, _, fetch in lookups:
+                    self._abandon_fetch(fetch)
+                return [entry if isinstance(entry, Exception) else entry[1](None) if entry[0] is None
+                        else AtSecondaryConnectException(f"Failed to execute {entry[0]} - {e}") for entry in prepared]
+
+            results = []
+            for entry in prepared:
+                if isinstance(entry, Exception):
+                    results.append(entry)
+                    continue
+                try:
+                    results.append(entry[1](next(responses) if entry[0] is not None else None))
+                except Exception as e:
+                    results.append(e)
+            return results
+
+        chunks = (keys[start:start + chunk_size] for start in range(0, len(keys), chunk_size))
+        for results in self._iter_chunks(chunks, execute):
+            yield from results
 
     def delete(self, key):
         if isinstance(key, SharedKey) or isinstance(key, SelfKey) or isinstance(key, PublicKey):
             command = DeleteVerbBuilder().with_at_key(key).build()
+            self._invalidate_cached_value(key)
             try:
-                return self.secondary_connection.execute_command(command).get_raw_data_response()
+                commit_id = self._execute_command(command).get_raw_data_response()
             except Exception as e:
                 raise AtSecondaryConnectException(f"Failed to execute {command} - {e}")
+            finally:
+                # As in put(), a value read while the delete was being sent must not be cached
+                self._invalidate_cached_value(key)
+            return self._replicate_update(key, commit_id, deleted=True)
         else:
             raise NotImplementedError(f"No implementation found for key type: {type(key)}")
     
     def __del__(self):
-        if self.secondary_connection:
+        if getattr(self, "replica", None):
+            self.replica.close()
+        if getattr(self, "connection_pool", None):
+            self.connection_pool.close()
+        if getattr(self, "secondary_connection", None) and self.secondary_connection.is_connected():
             self.secondary_connection.disconnect()
 
-    def start_monitor(self, regex=""):
+    def start_monitor(self, regex="", engine:MonitorEngine=None, checkpoint_store:CheckpointStore=None):
         if self.queue != None:
-            global should_be_running_lock
+            if checkpoint_store is not None and self.monitor_checkpoint is None:
+                # Resume from the last notification acknowledged with ack(), by this process or a previous one
+                self.monitor_checkpoint = MonitorCheckpoint(checkpoint_store, self.atsign.to_string())
+            if self.monitor_checkpoint is not None and isinstance(self.queue, AtEventQueue) and self.queue.on_discard is None:
+                # Events the queue drops or coalesces are never consumed, so they would hold the checkpoint back
+                self.queue.on_discard = self.ack
+            if engine is not None:
+                # The engine runs the monitor connection on its own thread, together with those of other clients
+                if self.monitor_session is None:
+                    self.monitor_session = engine.add(self.atsign, self.keys, self.secondary_address, self.queue, regex,
+                                                      checkpoint=self.monitor_checkpoint)
+                    self._monitor_engine = engine
+                return
             what = ""
             try:
                 if self.monitor_connection == None:
                     what = "construct an AtMonitorConnection"
-                    self.monitor_connection = AtMonitorConnection(queue=self.queue, atsign=self.atsign, address=self.secondary_address, verbose=True)
+                    self.monitor_connection = AtMonitorConnection(queue=self.queue, atsign=self.atsign, address=self.secondary_address, verbose=True,
+                                                                  checkpoint=self.monitor_checkpoint)
                     self.monitor_connection.connect()
                     AuthUtil.authenticate_with_pkam(self.monitor_connection, self.atsign, self.keys)
-                should_be_running_lock.acquire(blocking=1)
+                self.monitor_connection.should_be_running_lock.acquire(blocking=1)
                 if not self.monitor_connection.running:
-                    should_be_running_lock.release()
+                    self.monitor_connection.should_be_running_lock.release()
                     what = "call monitor_connection.start_monitor()"
                     self.monitor_connection.start_monitor(regex)
                 else:
-                    should_be_running_lock.release()
+                    self.monitor_connection.should_be_running_lock.release()
             except Exception as e:
                 print("SEVERE: failed to " + what + " : " + str(e))
                 traceback.print_exc()
@@ -368,24 +1020,44 @@ class AtClient(ABC):
         
     def stop_monitor(self):
         if self.queue != None:
-            global should_be_running_lock
+            if self.monitor_checkpoint is not None:
+                self.monitor_checkpoint.commit()
+            if self.monitor_session is not None:
+                self._monitor_engine.remove(self.monitor_session)
+                self.monitor_session = None
+                return
             what = ""
             try:
                 if self.monitor_connection == None:
                     return
-                should_be_running_lock.acquire(blocking=1)
+                self.monitor_connection.should_be_running_lock.acquire(blocking=1)
                 if not self.monitor_connection.running:
-                    should_be_running_lock.release()
+                    self.monitor_connection.should_be_running_lock.release()
                     what = "call monitor_connection.stop_monitor()"
                     self.monitor_connection.stop_monitor()
                 else:
-                    should_be_running_lock.release()
+                    self.monitor_connection.should_be_running_lock.release()
             except Exception as e:
                 print("SEVERE: failed to " + what + " : " + str(e))
                 traceback.print_exc()
         else:
             raise Exception("You must assign a Queue object to the queue paremeter of AtClient class")
 
+    def ack(self, at_event:AtEvent):
+        """
+        Acknowledge that a monitor event has been processed, so that the monitor checkpoint can advance past it.
+
+        An update notification passed to handle_event is acknowledged through the decrypted event made from it, not
+        itself, or the checkpoint could advance past it before the decrypted event has been processed. Nothing is done
+        unless the monitor was started with a checkpoint store.
+        """
+        if self.monitor_checkpoint is not None:
+            self.monitor_checkpoint.ack(at_event)
+
+    @staticmethod
+    def _notification_cache_key(key:str) -> str:
+        return key[len("cached:"):] if key.startswith("cached:") else key
+
     def handle_event(self, queue, at_event):
         if self.queue != None:
             try:
@@ -401,20 +1073,28 @@ class AtClient(ABC):
                             self.keys[shared_shared_key_name] = shared_key_decrypted_value
                         except Exception as e:
                             print(str(time.time()) + ": caught exception " + str(e) + " while decrypting received shared key " + shared_shared_key_name)
+                            return False
                 elif event_type == AtEventType.UPDATE_NOTIFICATION:
+                    self._invalidate_cached_value(self._notification_cache_key(event_data["key"]))
                     if event_data["value"] != None:
                         key = event_data["key"]
                         encrypted_value = event_data["value"]
-                        ivNonce = event_data["metadata"]["ivNonce"]
+                        # Values put without an ivNonce, as put() does, are encrypted with the default IV
+                        ivNonce = (event_data.get("metadata") or {}).get("ivNonce")
                         try:
-                            encryption_key_shared_by_other = self.get_encryption_key_shared_by_other(SharedKey.from_string(key=key))
-                            decrypted_value = EncryptionUtil.aes_decrypt_from_base64(encrypted_text=encrypted_value.encode(), self_encryption_key=encryption_key_shared_by_other, iv=base64.b64decode(ivNonce))
+                            shared_key = SharedKey.from_string(key=key)
+                            encryption_key_shared_by_other = self.get_encryption_key_shared_by_other(shared_key)
+                            decrypted_value = EncryptionUtil.aes_decrypt_from_base64(encrypted_text=encrypted_value.encode(), self_encryption_key=encryption_key_shared_by_other, iv=base64.b64decode(ivNonce) if ivNonce else b'\x00' * 16)
                             new_event_data = dict(event_data)
                             new_event_data["decryptedValue"] = decrypted_value
                             new_at_event = AtEvent(AtEventType.DECRYPTED_UPDATE_NOTIFICATION, new_event_data)
                             queue.put(new_at_event)
                         except Exception as e:
                             print(str(time.time()) + ": caught exception " + str(e) + " while decrypting received data with key name [" + key + "]")
+                            return False
+                elif event_type == AtEventType.DELETE_NOTIFICATION:
+                    self._invalidate_cached_value(self._notification_cache_key(event_data["key"]))
+                return True
             except Empty:
                 pass
         else:
@@ -1,19 +1,42 @@
+import sys
+from array import array
+from collections.abc import Sequence
+
 from .atsign import AtSign
 from .metadata import Metadata
 from ..exception import AtException
 from ..util.keystringutil import KeyStringUtil, KeyType
 
 class Keys:
+    # Key strings already parsed, and the AtSigns they are shared by and with, so that scanning the same keys again
+    # skips the parsing and every key of an atSign refers to the same AtSign. Plain dicts are the cheapest to look up;
+    # they are emptied when full, which bounds them without the cost of tracking which entries are least used.
+    MAX_PARSED_KEYS = 65536
+    MAX_ATSIGNS = 4096
+    _parsed = {}
+    _atsigns = {}
+
+    @staticmethod
+    def _atsign(atsign:str) -> AtSign:
+        at_sign = Keys._atsigns.get(atsign)
+        if at_sign is None:
+            if len(Keys._atsigns) >= Keys.MAX_ATSIGNS:
+                Keys._atsigns.clear()
+            at_sign = Keys._atsigns[atsign] = AtSign(atsign)
+        return at_sign
+
     @staticmethod
     def from_string(full_at_key_name: str):
-        key_string_util = KeyStringUtil(full_at_key_name)
-        key_type = key_string_util.get_key_type()
-        key_name = key_string_util.get_key_name()
-        shared_by = AtSign(key_string_util.get_shared_by())
-        shared_with = AtSign(key_string_util.get_shared_with()) if key_string_util.get_shared_with() else None
-        namespace = key_string_util.get_namespace()
-        is_cached = key_string_util.is_cached()
-        is_hidden = key_string_util.is_hidden()
+        parsed = Keys._parsed.get(full_at_key_name)
+        if parsed is None:
+            key_type, key_name, shared_by, shared_with, is_cached, is_hidden = KeyStringUtil.parse(full_at_key_name)
+            # Key names recur across atSigns, so share one copy of each
+            parsed = (key_type, sys.intern(key_name), Keys._atsign(shared_by), Keys._atsign(shared_with) if shared_with else None,
+                      is_cached, is_hidden)
+            if len(Keys._parsed) >= Keys.MAX_PARSED_KEYS:
+                Keys._parsed.clear()
+            Keys._parsed[full_at_key_name] = parsed
+        key_type, key_name, shared_by, shared_with, is_cached, is_hidden = parsed
 
         at_key = None
         if key_type == KeyType.PUBLIC_KEY:
@@ -27,29 +50,129 @@ class Keys:
         else:
             raise AtException(f"Could not find KeyType for Key {full_at_key_name}")
 
-        at_key.set_namespace(namespace)
-        at_key.metadata.is_cached = is_cached
-        if not at_key.metadata.is_hidden:
-            at_key.metadata.is_hidden = is_hidden  # If KeyBuilders constructor did not already evaluate is_hidden, then do it here
+        if is_cached or is_hidden:
+            at_key._metadata = Keys._metadata_fields(type(at_key), is_cached, is_hidden)
 
         return at_key
 
+    _metadata_field_sets = {}
+
+    @staticmethod
+    def _metadata_fields(key_class, is_cached:bool, is_hidden:bool) -> dict:
+        # The metadata fields of a parsed key, shared by every key of the same class and flags
+        metadata_fields = Keys._metadata_field_sets.get((key_class, is_cached, is_hidden))
+        if metadata_fields is None:
+            metadata_fields = dict(key_class.METADATA_FIELDS)
+            metadata_fields["is_cached"] = is_cached
+            # If the key class did not already make it hidden, then the key string decides
+            metadata_fields["is_hidden"] = metadata_fields.get("is_hidden", False) or is_hidden
+            Keys._metadata_field_sets[(key_class, is_cached, is_hidden)] = metadata_fields
+        return metadata_fields
+
+
+class AtKeyList(Sequence):
+    """
+    Compact, read-only sequence of keys for large scan results. The key strings are stored back to back in a single
+    buffer, with their offsets in an array, and an AtKey is only created for an element when it is accessed.
+    """
+
+    __slots__ = ("_data", "_offsets")
+
+    def __init__(self, key_strings=()):
+        """
+        Initialize the AtKeyList object.
+
+        Parameters
+        ----------
+        key_strings : iterable of str, optional
+            The keys, as returned by scan (default is none).
+        """
+        self._data = bytearray()
+        self._offsets = array("Q", [0])
+        for key_string in key_strings:
+            self.append(key_string)
+
+    def append(self, key_string:str):
+        """
+        Add a key, as returned by scan, to the end of the list.
+        """
+        self._data += key_string.encode()
+        self._offsets.append(len(self._data))
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def key_string(self, index:int) -> str:
+        """
+        Return the key at index as a string, without creating an AtKey for it.
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("AtKeyList index out of range")
+        return self._data[self._offsets[index]:self._offsets[index + 1]].decode()
+
+    def key_strings(self):
+        """
+        Iterate over the keys as strings, without creating AtKeys for them.
+        """
+        for index in range(len(self)):
+            yield self._data[self._offsets[index]:self._offsets[index + 1]].decode()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return AtKeyList(self.key_string(position) for position in range(*index.indices(len(self))))
+        return Keys.from_string(self.key_string(index))
+
+    def __iter__(self):
+        for key_string in self.key_strings():
+            yield Keys.from_string(key_string)
+
+    def __contains__(self, key):
+        # AtKeys are only equal to themselves, so compare key strings
+        key = str(key)
+        return any(key == key_string for key_string in self.key_strings())
 
 
 class AtKey:
+    __slots__ = ("name", "shared_with", "shared_by", "namespace", "_metadata")
+
+    # The metadata fields set by each class of key, over the Metadata defaults
+    METADATA_FIELDS = {}
+
     def __init__(self, name, shared_by):
         self.name = name
         self.shared_with = None
         self.shared_by = shared_by
         self.namespace = None
-        self.metadata = Metadata()
+        # Until the metadata is first used, the fields to create it with, shared with other keys; many keys, such as
+        # those of a scan, never need theirs
+        self._metadata = self.METADATA_FIELDS
+
+    @property
+    def metadata(self) -> Metadata:
+        metadata = self._metadata
+        if type(metadata) is dict:
+            metadata = self._metadata = Metadata(**metadata)
+        return metadata
+
+    @metadata.setter
+    def metadata(self, metadata:Metadata):
+        self._metadata = metadata
+
+    def _peek_metadata(self, name:str):
+        # A metadata field's value, without creating the metadata for it
+        metadata = self._metadata
+        if type(metadata) is dict:
+            return metadata.get(name, Metadata.__dataclass_fields__[name].default)
+        return getattr(metadata, name)
 
     def __repr__(self):
         return str(self)
 
     def __str__(self):
         s = ""
-        if self.metadata.is_public:
+        if self._peek_metadata("is_public"):
             s += "public:"
         elif self.shared_with:
             s += str(self.shared_with) + ":"
@@ -86,11 +209,11 @@ class AtKey:
 
 
 class PublicKey(AtKey):
+    __slots__ = ()
+    METADATA_FIELDS = {"is_public": True, "is_encrypted": False, "is_hidden": False}
+
     def __init__(self, name, shared_by: AtSign):
         super().__init__(name, shared_by=shared_by)
-        self.metadata.is_public = True
-        self.metadata.is_encrypted = False
-        self.metadata.is_hidden = False
 
     def cache(self, ttr, ccd):
         self.metadata.ttr = ttr
@@ -100,23 +223,23 @@ class PublicKey(AtKey):
 
 
 class SelfKey(AtKey):
+    __slots__ = ()
+    METADATA_FIELDS = {"is_public": False, "is_encrypted": True, "is_hidden": False}
+
     def __init__(self, name, shared_by: AtSign, shared_with: AtSign = None):
         super().__init__(name, shared_by=shared_by)
         self.shared_with = shared_with
-        self.metadata.is_public = False
-        self.metadata.is_encrypted = True
-        self.metadata.is_hidden = False
 
 
 class SharedKey(AtKey):
+    __slots__ = ()
+    METADATA_FIELDS = {"is_public": False, "is_encrypted": True, "is_hidden": False}
+
     def __init__(self, name, shared_by: AtSign, shared_with: AtSign):
         super().__init__(name, shared_by=shared_by)
         if not shared_with:
             raise AtException("SharedKey: shared_with may not be null")
         self.shared_with = shared_with
-        self.metadata.is_public = False
-        self.metadata.is_encrypted = True
-        self.metadata.is_hidden = False
 
     def cache(self, ttr, ccd):
         self.metadata.ttr = ttr
@@ -147,5 +270,7 @@ class SharedKey(AtKey):
 
 
 class PrivateHiddenKey(AtKey):
+    __slots__ = ()
+
     def __init__(self, name, shared_by: AtSign):
         super().__init__(name, shared_by=shared_by)
\ No newline at end of file
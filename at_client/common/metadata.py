@@ -1,9 +1,23 @@
 import json
 import datetime
 from dateutil.parser import parse
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 
 
+def _slotted(cls):
+    """
+    Recreate a dataclass with __slots__ in place of a per-instance __dict__, as dataclass(slots=True) does from Python
+    3.10 on. Instances only take room for their fields, which matters for the metadata of many keys.
+    """
+    field_names = tuple(field.name for field in fields(cls))
+    slots = field_names + tuple(cls.__dict__.get("__slots__", ()))
+    namespace = {name: value for name, value in cls.__dict__.items()
+                 if name not in slots and name not in ("__slots__", "__dict__", "__weakref__")}
+    namespace["__slots__"] = slots
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+@_slotted
 @dataclass
 class Metadata:
     ttl: int = 0
@@ -31,72 +45,87 @@ class Metadata:
     pub_key_cs: str = None
     encoding: str = None
     
+    # Only the fields of lazily decoded metadata, which are decoded when first used, are in __slots__ without being set
+    __slots__ = ("_raw",)
+
+    @staticmethod
     def parse_datetime(datetime_str):
-        if datetime_str is not None:
-            return parse(datetime_str)
-        return None
+        if datetime_str is None:
+            return None
+        if isinstance(datetime_str, str):
+            # The atServer's timestamps are ISO 8601, which fromisoformat parses many times faster than dateutil; it
+            # only accepts a "Z" suffix from Python 3.11 on
+            try:
+                return datetime.datetime.fromisoformat(datetime_str[:-1] + "+00:00" if datetime_str.endswith("Z") else datetime_str)
+            except ValueError:
+                pass
+        return parse(datetime_str)
 
     @staticmethod
-    def from_json(json_str):
-        data = json.loads(json_str)
-        metadata = Metadata()
-        metadata.ttl = data.get('ttl')
-        metadata.ttb = data.get('ttb')
-        metadata.ttr = data.get('ttr')
-        metadata.ccd = data.get('ccd')
-        metadata.created_by = data.get('createdBy')
-        metadata.updated_by = data.get('updatedBy')
-        metadata.available_at = Metadata.parse_datetime(data.get('availableAt'))
-        metadata.expires_at = Metadata.parse_datetime(data.get('expiresAt'))
-        metadata.refresh_at = Metadata.parse_datetime(data.get('refreshAt'))
-        metadata.created_at = Metadata.parse_datetime(data.get('createdAt'))
-        metadata.updated_at = Metadata.parse_datetime(data.get('updatedAt'))
-        metadata.status = data.get('status')
-        metadata.version = data.get('version')
-        metadata.data_signature = data.get('dataSignature')
-        metadata.shared_key_status = data.get('sharedKeyStatus')
-        metadata.is_public = data.get('isPublic', False)
-        metadata.is_encrypted = data.get('isEncrypted', True)
-        metadata.is_hidden = data.get('isHidden', False)
-        metadata.namespace_aware = data.get('namespaceAware', True)
-        metadata.is_binary = data.get('isBinary', False)
-        metadata.is_cached = data.get('isCached', False)
-        metadata.shared_key_enc = data.get('sharedKeyEnc')
-        metadata.pub_key_cs = data.get('pubKeyCS')
-        metadata.encoding = data.get('encoding')
-        
-        return metadata
-    
+    def from_json(json_str, lazy:bool=False):
+        """
+        Create the metadata returned by llookup:meta.
+
+        Parameters
+        ----------
+        json_str : str
+            The metadata, as JSON.
+        lazy : bool, optional
+            Keep the values as they were received and only decode each field when it is first used, rather than
+            parsing every timestamp up front (default is False). A malformed timestamp then raises when it is used.
+        """
+        return Metadata._from_data(json.loads(json_str), _JSON_DEFAULTS, lazy)
+
     @staticmethod
-    def from_dict(data_dict):
-        metadata = Metadata()
-        metadata.ttl = data_dict.get('ttl', 0)
-        metadata.ttb = data_dict.get('ttb', 0)
-        metadata.ttr = data_dict.get('ttr', 0)
-        metadata.ccd = data_dict.get('ccd', False)
-        metadata.created_by = data_dict.get('createdBy')
-        metadata.updated_by = data_dict.get('updatedBy')
-        metadata.available_at = Metadata.parse_datetime(data_dict.get('availableAt'))
-        metadata.expires_at = Metadata.parse_datetime(data_dict.get('expiresAt'))
-        metadata.refresh_at = Metadata.parse_datetime(data_dict.get('refreshAt'))
-        metadata.created_at = Metadata.parse_datetime(data_dict.get('createdAt'))
-        metadata.updated_at = Metadata.parse_datetime(data_dict.get('updatedAt'))
-        metadata.status = data_dict.get('status')
-        metadata.version = data_dict.get('version', 0)
-        metadata.data_signature = data_dict.get('dataSignature')
-        metadata.shared_key_status = data_dict.get('sharedKeyStatus')
-        metadata.is_public = data_dict.get('isPublic', False)
-        metadata.is_encrypted = data_dict.get('isEncrypted', True)
-        metadata.is_hidden = data_dict.get('isHidden', False)
-        metadata.namespace_aware = data_dict.get('namespaceAware', True)
-        metadata.is_binary = data_dict.get('isBinary', False)
-        metadata.is_cached = data_dict.get('isCached', False)
-        metadata.shared_key_enc = data_dict.get('sharedKeyEnc')
-        metadata.pub_key_cs = data_dict.get('pubKeyCS')
-        metadata.encoding = data_dict.get('encoding')
-        
+    def from_dict(data_dict, lazy:bool=False):
+        """
+        Create the metadata returned by lookup:all, llookup:all or plookup:all.
+
+        Parameters
+        ----------
+        data_dict : dict
+            The "metaData" of the response.
+        lazy : bool, optional
+            Keep the values as they were received and only decode each field when it is first used (default is False).
+        """
+        return Metadata._from_data(data_dict, _DEFAULTS, lazy)
+
+    @staticmethod
+    def _from_data(data:dict, defaults:dict, lazy:bool):
+        raw = {name: data.get(json_name, defaults[name]) for name, json_name in _JSON_NAMES.items()}
+        if lazy:
+            return Metadata._lazy(raw, {})
+        for name in _TIMESTAMPS:
+            raw[name] = Metadata.parse_datetime(raw[name])
+        return Metadata(**raw)
+
+    @staticmethod
+    def _lazy(raw:dict, decoded:dict):
+        # Metadata whose fields in raw are decoded when first used, whose fields in decoded are set, and whose other
+        # fields have their default values
+        metadata = object.__new__(Metadata)
+        metadata._raw = raw
+        for name, value in decoded.items():
+            setattr(metadata, name, value)
         return metadata
 
+    def __getattr__(self, name):
+        # Only called for the fields of lazily decoded metadata which have not been used or set yet
+        if name not in _DEFAULTS:
+            raise AttributeError(f"'Metadata' object has no attribute '{name}'")
+        value = object.__getattribute__(self, "_raw").get(name, _DEFAULTS[name])
+        if name in _TIMESTAMPS:
+            value = Metadata.parse_datetime(value)
+        setattr(self, name, value)
+        return value
+
+    def _peek(self, name:str):
+        # (True, value) for a field which has been decoded or set, or (False, value as received) for one which has not;
+        # either way the value is None if and only if the decoded value is
+        try:
+            return True, object.__getattribute__(self, name)
+        except AttributeError:
+            return False, object.__getattribute__(self, "_raw").get(name, _DEFAULTS[name])
 
     def __str__(self):
         s = ""
@@ -129,27 +158,35 @@ class Metadata:
 
     @staticmethod
     def squash(first_metadata, second_metadata):
-        metadata = Metadata()
-        metadata.ttl = first_metadata.ttl if first_metadata.ttl is not None else second_metadata.ttl
-        metadata.ttb = first_metadata.ttb if first_metadata.ttb is not None else second_metadata.ttb
-        metadata.ttr = first_metadata.ttr if first_metadata.ttr is not None else second_metadata.ttr
-        metadata.ccd = first_metadata.ccd if first_metadata.ccd is not None else second_metadata.ccd
-        metadata.available_at = first_metadata.available_at if first_metadata.available_at is not None else second_metadata.available_at
-        metadata.expires_at = first_metadata.expires_at if first_metadata.expires_at is not None else second_metadata.expires_at
-        metadata.refresh_at = first_metadata.refresh_at if first_metadata.refresh_at is not None else second_metadata.refresh_at
-        metadata.created_at = first_metadata.created_at if first_metadata.created_at is not None else second_metadata.created_at
-        metadata.updated_at = first_metadata.updated_at if first_metadata.updated_at is not None else second_metadata.updated_at
-        metadata.data_signature = first_metadata.data_signature if first_metadata.data_signature is not None else second_metadata.data_signature
-        metadata.shared_key_status = first_metadata.shared_key_status if first_metadata.shared_key_status is not None else second_metadata.shared_key_status
-        metadata.shared_key_enc = first_metadata.shared_key_enc if first_metadata.shared_key_enc is not None else second_metadata.shared_key_enc
-        metadata.is_public = first_metadata.is_public if first_metadata.is_public is not None else second_metadata.is_public
-        metadata.is_encrypted = first_metadata.is_encrypted if first_metadata.is_encrypted is not None else second_metadata.is_encrypted
-        metadata.is_hidden = first_metadata.is_hidden if first_metadata.is_hidden is not None else second_metadata.is_hidden
-        metadata.namespace_aware = first_metadata.namespace_aware if first_metadata.namespace_aware is not None else second_metadata.namespace_aware
-        metadata.is_binary = first_metadata.is_binary if first_metadata.is_binary is not None else second_metadata.is_binary
-        metadata.is_cached = first_metadata.is_cached if first_metadata.is_cached is not None else second_metadata.is_cached
-        metadata.shared_key_enc = first_metadata.shared_key_enc if first_metadata.shared_key_enc is not None else second_metadata.shared_key_enc
-        metadata.pub_key_cs = first_metadata.pub_key_cs if first_metadata.pub_key_cs is not None else second_metadata.pub_key_cs
-        metadata.encoding = first_metadata.encoding if first_metadata.encoding is not None else second_metadata.encoding
-        
-        return metadata
+        """
+        Return metadata with the fields of first_metadata which are not None, and those of second_metadata otherwise.
+        Fields of lazily decoded metadata which have not been used yet stay undecoded.
+        """
+        decoded = {}
+        raw = {}
+        for name in _SQUASHED_FIELDS:
+            for metadata in (first_metadata, second_metadata):
+                is_decoded, value = metadata._peek(name)
+                if value is not None or metadata is second_metadata:
+                    (decoded if is_decoded else raw)[name] = value
+                    break
+        if raw:
+            return Metadata._lazy(raw, decoded)
+        return Metadata(**decoded)
+
+
+_DEFAULTS = {field.name: field.default for field in fields(Metadata)}
+# llookup:meta responses leave these fields as None when the server does not return them
+_JSON_DEFAULTS = dict(_DEFAULTS, ttl=None, ttb=None, ttr=None, ccd=None, version=None)
+_JSON_NAMES = {"ttl": "ttl", "ttb": "ttb", "ttr": "ttr", "ccd": "ccd", "created_by": "createdBy", "updated_by": "updatedBy",
+               "available_at": "availableAt", "expires_at": "expiresAt", "refresh_at": "refreshAt",
+               "created_at": "createdAt", "updated_at": "updatedAt", "status": "status", "version": "version",
+               "data_signature": "dataSignature", "shared_key_status": "sharedKeyStatus", "is_public": "isPublic",
+               "is_encrypted": "isEncrypted", "is_hidden": "isHidden", "namespace_aware": "namespaceAware",
+               "is_binary": "isBinary", "is_cached": "isCached", "shared_key_enc": "sharedKeyEnc",
+               "pub_key_cs": "pubKeyCS", "encoding": "encoding"}
+_TIMESTAMPS = ("available_at", "expires_at", "refresh_at", "created_at", "updated_at")
+# The fields squash() takes from either metadata; the others have their default values
+_SQUASHED_FIELDS = ("ttl", "ttb", "ttr", "ccd", "available_at", "expires_at", "refresh_at", "created_at", "updated_at",
+                    "data_signature", "shared_key_status", "shared_key_enc", "is_public", "is_encrypted", "is_hidden",
+                    "namespace_aware", "is_binary", "is_cached", "pub_key_cs", "encoding")
@@ -2,7 +2,16 @@ from .address import Address
 from .atconnection import AtConnection
 from .atrootconnection import AtRootConnection
 from .atsecondaryconnection import AtSecondaryConnection
+from .secondaryaddresscache import SecondaryAddressCache
+from .atconnectionpool import AtConnectionPool
+from .asyncatconnection import AsyncAtConnection
+from .asyncatrootconnection import AsyncAtRootConnection
+from .asyncatsecondaryconnection import AsyncAtSecondaryConnection
 from .response import Response
 from .atmonitorconnection import AtMonitorConnection
+from .monitorengine import MonitorEngine, MonitorSession
 from .notification.atevents import AtEventType
+from .notification.ateventqueue import AtEventQueue, OverflowPolicy
+from .notification.monitorcheckpoint import CheckpointStore, FileCheckpointStore, MemoryCheckpointStore, MonitorCheckpoint
+from .notification.subscriptionrouter import SubscriptionRouter, Subscription
 from .notification.atnotification import AtNotification
@@ -0,0 +1,275 @@
+import asyncio
+import socket
+import ssl
+from abc import ABC, abstractmethod
+from collections import deque
+
+from ..exception.atexception import AtSecondaryConnectException
+from ..util.socketutil import LF, MAX_PROMPT_LENGTH, PROMPT
+from .response import Response
+
+# Stand in for a future in the queue of commands awaiting a response, when their response is not awaited: the
+# response to a command written with send() goes to read_line(), and that to a command executed without reading the
+# response is discarded
+_UNSOLICITED = object()
+_DISCARDED = object()
+# The most a line is read in one piece; longer lines, such as large scan responses, are read in several
+_READ_LIMIT = 2 ** 20
+
+
+class AsyncAtConnection(ABC):
+    """
+    Abstract base class for connecting to and communicating with an atprotocol server using asyncio streams.
+
+    Any number of coroutines may call execute_command concurrently on the same connection: each command is written as
+    soon as it is issued and a single reader task hands the responses back in the order the commands were sent, so
+    concurrent commands are pipelined rather than serialised. Commands written with send() or executed without reading
+    the response take their place in that order too, so that their responses are not mistaken for those of others.
+    """
+
+    def __init__(self, host:str, port:int, context:ssl.SSLContext, verbose:bool=False):
+        """
+        Initialize the AsyncAtConnection object.
+
+        Parameters:
+        - host (str): The host name or IP address of the server.
+        - port (int): The port number of the server.
+        - context (ssl.SSLContext): The SSL context for secure connections.
+        - verbose (bool, optional): Indicates if verbose output is enabled (default is False).
+        """
+        self._host = host
+        self._port = port
+        self._context = context
+        self._verbose = verbose
+        self._reader = None
+        self._writer = None
+        self._reader_task = None
+        self._pending = deque()
+        self._unsolicited = None
+        self._connected = False
+
+    def __str__(self):
+        """
+        Return a string representation of the AsyncAtConnection object.
+
+        Returns:
+        - str: A string representation of the AsyncAtConnection object in the format "host:port".
+        """
+        return f"{self._host}:{self._port}"
+
+    def is_connected(self):
+        """
+        Check if the connection is established.
+
+        Returns:
+        - bool: True if the connection is established, False otherwise.
+        """
+        return self._connected
+
+    async def connect(self):
+        """
+        Establish a connection to the server and start reading responses from it.
+        """
+        if self._connected:
+            return
+        try:
+            self._reader, self._writer = await asyncio.open_connection(
+                self._host, self._port, ssl=self._context, server_hostname=self._host, limit=_READ_LIMIT
+            )
+            sock = self._writer.get_extra_info("socket")
+            if sock is not None:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            await self._reader.readuntil(PROMPT)
+        except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as e:
+            raise AtSecondaryConnectException(f"Failed to connect to {self} - {e}")
+        self._connected = True
+        self._unsolicited = asyncio.Queue()
+        self._reader_task = asyncio.get_running_loop().create_task(self._read_responses())
+
+    async def disconnect(self):
+        """
+        Close the connection. Commands still waiting for a response fail with AtSecondaryConnectException.
+        """
+        self._connected = False
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._reader_task = None
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (OSError, ssl.SSLError):
+                pass
+            self._writer = None
+        self._fail_pending(AtSecondaryConnectException(f"Connection to {self} closed"))
+
+    @abstractmethod
+    def parse_raw_response(self, raw_response:str) -> Response:
+        """
+        Parse the raw response from the server.
+
+        Parameters:
+        - raw_response (str): The raw response received from the server.
+        """
+        pass
+
+    @staticmethod
+    def strip_prompts(line:bytes) -> bytes:
+        """
+        Remove the prompts ("@" or "@<atsign>@") which the server sends after each response from the start of a line.
+
+        Parameters:
+        - line (bytes): A line read from the server.
+
+        Returns:
+        - bytes: The line without leading prompts.
+        """
+        while line.startswith(PROMPT):
+            closing = line.find(PROMPT, 1, MAX_PROMPT_LENGTH)
+            if closing > 1:
+                segment = line[1:closing]
+                if b":" not in segment and LF not in segment and b" " not in segment:
+                    line = line[closing + 1:]
+                    continue
+            line = line[1:]
+        return line
+
+    def send(self, command:str):
+        """
+        Write a command without waiting for its response. The response is delivered by lines() instead.
+
+        Parameters:
+        - command (str): The command to be sent.
+        """
+        if not self._connected:
+            raise AtSecondaryConnectException(f"Not connected to {self}")
+        self._write(command, _UNSOLICITED)
+
+    def _write(self, command:str, waiter):
+        if not command.endswith("\n"):
+            command += "\n"
+        # Queue the waiter and write the command in the same step, so that responses are matched in sending order
+        self._pending.append(waiter)
+        self._writer.write(command.encode())
+        if self._verbose:
+            print(f"\tSENT: {repr(command.strip())}")
+
+    async def execute_command(self, command:str, raise_exception=True, read_the_response:bool=True) -> Response:
+        """
+        Execute a command and retrieve the response from the server.
+
+        Parameters:
+        - command (str): The command to be executed.
+        - raise_exception (bool, optional): Raise the exception of an error response rather than returning it (default is True).
+        - read_the_response (bool, optional): Indicates if the response should be read from the server (default is True).
+
+        Returns:
+        - Response: The response from the server.
+        """
+        if not self._connected:
+            raise AtSecondaryConnectException(f"Not connected to {self}")
+        if not read_the_response:
+            self._write(command, _DISCARDED)
+            await self._drain()
+            return ""
+
+        future = asyncio.get_running_loop().create_future()
+        self._write(command, future)
+        await self._drain()
+
+        raw_response = await future
+        if self._verbose:
+            print(f"\tRCVD: {repr(raw_response)}")
+        response = self.parse_raw_response(raw_response)
+        if response.is_error() and raise_exception:
+            raise response.get_exception()
+        return response
+
+    async def read_line(self) -> bytes:
+        """
+        Wait for the next line received from the server which is not a response to execute_command, such as a
+        notification on a monitor connection or the response to a command written with send(). Cancelling the wait,
+        e.g. with asyncio.wait_for, loses no lines.
+
+        Returns:
+        - bytes: The line without leading prompts, or None once the connection has closed.
+        """
+        if self._unsolicited is None:
+            return None
+        line = await self._unsolicited.get()
+        if line is None:
+            # Leave the marker for any other reader
+            self._unsolicited.put_nowait(None)
+        return line
+
+    async def lines(self):
+        """
+        Iterate over the lines returned by read_line() until the connection closes.
+
+        Yields:
+        - bytes: Each line, without leading prompts.
+        """
+        while True:
+            line = await self.read_line()
+            if line is None:
+                return
+            yield line
+
+    async def _drain(self):
+        try:
+            await self._writer.drain()
+        except (OSError, ssl.SSLError) as e:
+            self._connected = False
+            raise AtSecondaryConnectException(f"Failed to write to {self} - {e}")
+
+    async def _read_responses(self):
+        error = None
+        try:
+            while True:
+                line = await self._read_line()
+                if not line:
+                    break
+                line = self.strip_prompts(line)
+                if not line.strip():
+                    continue
+                waiter = self._pending.popleft() if self._pending else _UNSOLICITED
+                if waiter is _UNSOLICITED:
+                    if self._verbose:
+                        print(f"\tRCVD: {repr(line)}")
+                    self._unsolicited.put_nowait(line)
+                elif waiter is not _DISCARDED and not waiter.done():
+                    waiter.set_result(line.decode())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = e
+        finally:
+            self._connected = False
+            self._fail_pending(AtSecondaryConnectException(f"Connection to {self} closed" + (f" - {error}" if error else "")))
+
+    async def _read_line(self) -> bytes:
+        # StreamReader.readline fails on lines longer than its limit, so those are read a limit's worth at a time
+        pieces = []
+        while True:
+            try:
+                pieces.append(await self._reader.readuntil(LF))
+                break
+            except asyncio.LimitOverrunError as e:
+                pieces.append(await self._reader.readexactly(e.consumed))
+            except asyncio.IncompleteReadError as e:
+                # The connection closed, possibly part way through a line
+                pieces.append(e.partial)
+                break
+        return b"".join(pieces)
+
+    def _fail_pending(self, exception:Exception):
+        while self._pending:
+            future = self._pending.popleft()
+            if future is not _UNSOLICITED and future is not _DISCARDED and not future.done():
+                future.set_exception(exception)
+        if self._unsolicited is not None:
+            self._unsolicited.put_nowait(None)
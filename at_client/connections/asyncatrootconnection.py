@@ -0,0 +1,96 @@
+import ssl
+from ..common import AtSign
+from ..exception.atexception import *
+from .asyncatconnection import AsyncAtConnection
+from .atrootconnection import AtRootConnection
+from .address import Address
+from .secondaryaddresscache import SecondaryAddressCache
+
+
+class AsyncAtRootConnection(AsyncAtConnection):
+    """
+    Subclass of AsyncAtConnection representing an asyncio connection to the root server in the atprotocol.
+
+    Unlike AtRootConnection this is not a singleton, since a connection belongs to the event loop it was opened on.
+    """
+
+    def __init__(self, host:str='root.atsign.org', port:int=64, context:ssl.SSLContext=ssl.create_default_context(), verbose:bool=False,
+                 secondary_address_cache:SecondaryAddressCache=None):
+        """
+        Initialize the AsyncAtRootConnection object.
+
+        Parameters
+        ----------
+        host : str, optional
+            The host name or IP address of the root server (default is 'root.atsign.org').
+        port : int, optional
+            The port number of the root server (default is 64).
+        context : ssl.SSLContext, optional
+            The SSL context for secure connections (default is ssl.create_default_context()).
+        verbose : bool, optional
+            Indicates if verbose output is enabled (default is False).
+        secondary_address_cache : SecondaryAddressCache, optional
+            The cache of root lookups (default is SecondaryAddressCache.get_instance()).
+        """
+        super().__init__(host, port, context, verbose)
+        self.secondary_address_cache = secondary_address_cache or SecondaryAddressCache.get_instance()
+
+    async def connect(self):
+        """
+        Establish a connection to the root server.
+        """
+        await super().connect()
+        if self._verbose:
+            print("Root Connection Successful")
+
+    @staticmethod
+    def parse_raw_response(raw_response:str):
+        """
+        Parse the raw response from the root server, as AtRootConnection does.
+        """
+        return AtRootConnection.parse_raw_response(raw_response)
+
+    async def find_secondary(self, atsign:AtSign, use_cache:bool=True):
+        """
+        Find the secondary server for the given atsign on the root server.
+
+        Parameters
+        ----------
+        atsign : AtSign
+            The atsign to lookup.
+        use_cache : bool, optional
+            Return the address from secondary_address_cache if it is there (default is True). The address looked up
+            is cached either way.
+
+        Returns
+        -------
+        Address
+            The secondary server for the given atsign.
+
+        Raises
+        ------
+        AtException
+            If the root lookup returns null or a malformed response is received.
+        """
+        if use_cache:
+            address = self.secondary_address_cache.get(atsign)
+            if address is not None:
+                return address
+
+        if not self.is_connected():
+            try:
+                await self.connect()
+            except Exception as e:
+                raise AtException(f"Root Connection failed - {e}")
+
+        response = (await self.execute_command(atsign.without_prefix, False)).get_raw_data_response()
+
+        if response == "null":
+            raise AtSecondaryNotFoundException(f"Root lookup returned null for {atsign}")
+        else:
+            try:
+                address = Address.from_string(response)
+            except ValueError as e:
+                raise AtException(f"Received malformed response {response} from lookup of {atsign} on root server")
+            self.secondary_address_cache.put(atsign, address)
+            return address
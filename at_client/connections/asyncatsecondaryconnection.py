@@ -0,0 +1,40 @@
+import ssl
+from .asyncatconnection import AsyncAtConnection
+from .atsecondaryconnection import AtSecondaryConnection
+from .address import Address
+
+
+class AsyncAtSecondaryConnection(AsyncAtConnection):
+    """
+    Subclass of AsyncAtConnection representing an asyncio connection to the secondary server in the atprotocol.
+    """
+
+    def __init__(self, address: Address, context:ssl.SSLContext=ssl.create_default_context(), verbose:bool=False):
+        """
+        Initialize the AsyncAtSecondaryConnection object.
+
+        Parameters
+        ----------
+        address : Address
+            The address of the secondary server.
+        context : ssl.SSLContext, optional
+            The SSL context for secure connections (default is ssl.create_default_context()).
+        verbose : bool, optional
+            Indicates if verbose output is enabled (default is False).
+        """
+        super().__init__(address.host, address.port, context, verbose)
+
+    async def connect(self):
+        """
+        Establish a connection to the secondary server.
+        """
+        await super().connect()
+        if self._verbose:
+            print("Secondary Connection Successful")
+
+    @staticmethod
+    def parse_raw_response(raw_response:str):
+        """
+        Parse the raw response from the secondary server, as AtSecondaryConnection does.
+        """
+        return AtSecondaryConnection.parse_raw_response(raw_response)
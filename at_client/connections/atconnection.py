@@ -3,6 +3,8 @@ import socket
 import ssl
 from abc import ABC, abstractmethod
 import traceback
+from collections import deque
+from itertools import islice
 
 from ..util.socketutil import SocketUtil
 
@@ -55,18 +57,12 @@ class AtConnection(ABC):
 
     def read(self):
         """
-        Read data from the socket.
+        Read one response from the socket.
 
         Returns:
-        - str: The data read from the socket.
+        - str: The response read from the socket, without the trailing prompt.
         """
-        response = b''
-        while True:
-            chunk = self._secure_root_socket.read()  # Receive data in chunks of 1024 bytes
-            response += chunk
-            if chunk == b'@' or b'\n' in chunk:
-                break
-        return response.decode()
+        return self._stream_reader.read_response().decode()
 
     def is_connected(self):
         """
@@ -84,6 +80,8 @@ class AtConnection(ABC):
         if not self._connected:
             self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self._socket.settimeout(None) 
+            # Pipelined batches are written back to back, so don't let Nagle hold them for the previous batch's ACK
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             self._socket.connect(self._addr_info)
             self._secure_root_socket = self._context.wrap_socket(
                 self._socket, server_hostname=self._host, do_handshake_on_connect=True
@@ -92,7 +90,7 @@ class AtConnection(ABC):
             self._stream_reader = SocketUtil(self._secure_root_socket)
             
             self._connected = True
-            self.read()
+            self._stream_reader.read_prompt()
 
     def disconnect(self):
         """
@@ -102,12 +100,12 @@ class AtConnection(ABC):
         self._connected = False
 
     @abstractmethod
-    def parse_raw_response(self, raw_response:str) -> Response:
+    def parse_raw_response(self, raw_response) -> Response:
         """
         Parse the raw response from the server.
 
         Parameters:
-        - raw_response (str): The raw response received from the server.
+        - raw_response (bytes or str): The raw response received from the server.
         """
         pass
 
@@ -132,9 +130,10 @@ class AtConnection(ABC):
                 print(f"\tSENT: {repr(command.strip())}")
 
             if read_the_response:
-                raw_response = self.read()
+                # Parsed as received, so that only the part of the response that is needed is decoded
+                raw_response = self._stream_reader.read_response()
                 if self._verbose:
-                    print(f"\tRCVD: {repr(raw_response)}")
+                    print(f"\tRCVD: {repr(raw_response.decode(errors='replace'))}")
 
                 response = self.parse_raw_response(raw_response)
                 if response.is_error():
@@ -156,3 +155,134 @@ class AtConnection(ABC):
             else:
                 self._connected = False
                 raise AtSecondaryConnectException(str(first))
+
+    def iter_execute_command(self, command:str):
+        """
+        Execute a command whose response may be too large to read in one go, yielding the response data in pieces as
+        they are received. The connection must not be used for anything else until the generator is exhausted.
+
+        Parameters:
+        - command (str): The command to be executed.
+
+        Yields:
+        - bytes: The pieces of the response data, without the "data:" prefix.
+        """
+        if not command.endswith("\n"):
+            command += "\n"
+        pieces = None
+        try:
+            self.write(command)
+            if self._verbose:
+                print(f"\tSENT: {repr(command.strip())}")
+            pieces = self._stream_reader.iter_response()
+            head = b""
+            for piece in pieces:
+                head += piece
+                if len(head) >= len("error:") or head.endswith(b"\n"):
+                    break
+            if not head.startswith(b"data:"):
+                # An error, or something unexpected: read the whole response and handle it as execute_command would
+                raw_response = head + b"".join(pieces)
+                if self._verbose:
+                    print(f"\tRCVD: {repr(raw_response.decode(errors='replace'))}")
+                if raw_response == b"":
+                    raise AtSecondaryConnectException("Connection closed by server")
+                response = self.parse_raw_response(raw_response)
+                if response.is_error():
+                    raise response.get_exception()
+                yield response.get_raw_data_response().encode()
+                return
+            if self._verbose:
+                print(f"\tRCVD: {repr(head.decode(errors='replace'))}... (streamed)")
+            yield head[len("data:"):]
+            for piece in pieces:
+                yield piece
+        except GeneratorExit:
+            # Abandoned part way through; read the rest of the response so the connection stays in step
+            if pieces is not None:
+                for _ in pieces:
+                    pass
+            raise
+        except (OSError, AtSecondaryConnectException) as e:
+            self._connected = False
+            raise AtSecondaryConnectException(str(e))
+
+    def execute_commands(self, commands, raise_exception=False, max_in_flight:int=64) -> list:
+        """
+        Execute several commands pipelined and retrieve their responses, in the same order as the commands.
+
+        Parameters:
+        - commands (iterable of str): The commands to be executed.
+        - raise_exception (bool, optional): Raise the exception of the first error response once all responses have been read (default is False).
+        - max_in_flight (int, optional): The maximum number of commands sent ahead of their responses (default is 64).
+
+        Returns:
+        - list of Response: One response per command. Error responses are returned rather than raised unless raise_exception is set.
+        """
+        responses = list(self.iter_execute_commands(commands, max_in_flight=max_in_flight))
+        if raise_exception:
+            for response in responses:
+                if response.is_error():
+                    raise response.get_exception()
+        return responses
+
+    def iter_execute_commands(self, commands, max_in_flight:int=64):
+        """
+        Execute several commands pipelined, yielding each response as soon as it has been read.
+
+        Commands are written in batches of half of max_in_flight, so that the next batch is already on the wire while
+        the responses to the previous one are being read, and each batch costs a single write. The connection must
+        not be used for anything else until the generator is exhausted.
+
+        Parameters:
+        - commands (iterable of str): The commands to be executed. They are consumed lazily.
+        - max_in_flight (int, optional): The maximum number of commands sent ahead of their responses (default is 64).
+
+        Yields:
+        - Response: The response to each command, in the same order as the commands.
+        """
+        commands = iter(commands)
+        batch_size = max(1, max_in_flight // 2)
+        in_flight = deque()
+        received = 0
+        outstanding = 0
+
+        def send_batch():
+            nonlocal outstanding
+            batch = []
+            for command in islice(commands, batch_size):
+                batch.append(command if command.endswith("\n") else command + "\n")
+            if batch:
+                self.write("".join(batch))
+                in_flight.append(len(batch))
+                outstanding += len(batch)
+                if self._verbose:
+                    for command in batch:
+                        print(f"\tSENT: {repr(command.strip())}")
+
+        def read_response():
+            nonlocal outstanding, received
+            raw_response = self._stream_reader.read_response()
+            if self._verbose:
+                print(f"\tRCVD: {repr(raw_response.decode(errors='replace'))}")
+            if raw_response == b"":
+                raise AtSecondaryConnectException("Connection closed by server")
+            outstanding -= 1
+            received += 1
+            return raw_response
+
+        try:
+            send_batch()
+            send_batch()
+            while in_flight:
+                for _ in range(in_flight.popleft()):
+                    yield self.parse_raw_response(read_response())
+                send_batch()
+        except GeneratorExit:
+            # Abandoned part way through; read what was already sent so the connection stays in step
+            while outstanding:
+                read_response()
+            raise
+        except (OSError, AtSecondaryConnectException) as e:
+            self._connected = False
+            raise AtSecondaryConnectException(f"Pipeline failed after {received} responses - {e}")
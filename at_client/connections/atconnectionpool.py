@@ -0,0 +1,206 @@
+import ssl
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from ..common.atsign import AtSign
+from ..exception.atexception import AtException, AtSecondaryConnectException, AtTimeoutException
+from ..util.authutil import AuthUtil
+from .address import Address
+from .atsecondaryconnection import AtSecondaryConnection
+
+
+class AtConnectionPool:
+    """
+    Thread-safe pool of PKAM authenticated connections to the secondary server of one atSign.
+    """
+
+    def __init__(self, atsign:AtSign, keys:dict, address:Address, context:ssl.SSLContext=ssl.create_default_context(),
+                 min_size:int=1, max_size:int=4, eager:bool=False, health_check_interval:float=30.0,
+                 connections:list=None, verbose:bool=False):
+        """
+        Initialize the AtConnectionPool object.
+
+        Parameters
+        ----------
+        atsign : AtSign
+            The atSign the connections authenticate as.
+        keys : dict
+            The atSign's keys, as loaded by KeysUtil.load_keys.
+        address : Address
+            The address of the atSign's secondary server.
+        context : ssl.SSLContext, optional
+            The SSL context for secure connections (default is ssl.create_default_context()).
+        min_size : int, optional
+            The number of connections the pool keeps open once they have been created (default is 1).
+        max_size : int, optional
+            The maximum number of connections, idle or checked out (default is 4).
+        eager : bool, optional
+            Open and authenticate min_size connections now rather than on first checkout (default is False).
+        health_check_interval : float, optional
+            Connections idle for longer than this many seconds are checked with a noop before being handed out (default is 30).
+        connections : list, optional
+            Already authenticated connections to start the pool with.
+        verbose : bool, optional
+            Indicates if verbose output is enabled (default is False).
+        """
+        if max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min_size {min_size}, max_size {max_size}")
+        self.atsign = atsign
+        self.keys = keys
+        self.address = address
+        self.min_size = min_size
+        self.max_size = max_size
+        self.health_check_interval = health_check_interval
+        self._context = context
+        self._verbose = verbose
+        self._condition = threading.Condition()
+        self._idle = deque()
+        self._size = 0
+        self._closed = False
+        self.created = 0
+        self.evicted = 0
+
+        for connection in connections or []:
+            self._idle.append((connection, time.monotonic()))
+            self._size += 1
+        if eager:
+            while self._size < self.min_size:
+                self._size += 1
+                self._idle.append((self._create(), time.monotonic()))
+
+    @property
+    def size(self):
+        """
+        The number of open connections, idle or checked out.
+        """
+        return self._size
+
+    @property
+    def idle(self):
+        """
+        The number of connections waiting in the pool.
+        """
+        return len(self._idle)
+
+    def _create(self) -> AtSecondaryConnection:
+        try:
+            connection = AtSecondaryConnection(self.address, self._context, verbose=self._verbose)
+            connection.connect()
+            AuthUtil.authenticate_with_pkam(connection, self.atsign, self.keys)
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        self.created += 1
+        return connection
+
+    def _is_healthy(self, connection:AtSecondaryConnection, idle_since:float) -> bool:
+        if not connection.is_connected():
+            return False
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            return connection.execute_command("noop:0").get_raw_data_response() == "ok"
+        except Exception:
+            return False
+
+    def _evict(self, connection:AtSecondaryConnection):
+        try:
+            connection.disconnect()
+        except Exception:
+            pass
+        with self._condition:
+            self._size -= 1
+            self.evicted += 1
+            self._condition.notify()
+
+    def checkout(self, timeout:float=None) -> AtSecondaryConnection:
+        """
+        Take a connection out of the pool, opening a new one if none is idle and the pool is not full.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            How many seconds to wait for a connection when the pool is full (default is to wait forever).
+
+        Returns
+        -------
+        AtSecondaryConnection
+            An authenticated connection, which must be given back with checkin().
+
+        Raises
+        ------
+        AtTimeoutException
+            If no connection became available within timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise AtException("Connection pool is closed")
+                    if self._idle:
+                        connection, idle_since = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        connection = idle_since = None
+                        break
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise AtTimeoutException(f"No connection to {self.address} available after {timeout} seconds")
+                    self._condition.wait(remaining)
+
+            if connection is None:
+                return self._create()
+            if self._is_healthy(connection, idle_since):
+                return connection
+            self._evict(connection)
+
+    def checkin(self, connection:AtSecondaryConnection, broken:bool=False):
+        """
+        Give a connection back to the pool.
+
+        Parameters
+        ----------
+        connection : AtSecondaryConnection
+            A connection previously returned by checkout().
+        broken : bool, optional
+            The connection failed while it was checked out and should be closed rather than reused (default is False).
+        """
+        if broken or self._closed or not connection.is_connected():
+            self._evict(connection)
+            return
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self, timeout:float=None):
+        """
+        Check a connection out for the duration of a with block. Connections that fail with a connection error are evicted.
+        """
+        connection = self.checkout(timeout)
+        broken = False
+        try:
+            yield connection
+        except (AtSecondaryConnectException, OSError):
+            broken = True
+            raise
+        finally:
+            self.checkin(connection, broken)
+
+    def close(self):
+        """
+        Close idle connections, and connections checked out now as they are checked in.
+        """
+        with self._condition:
+            self._closed = True
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            self._condition.notify_all()
+        for connection in idle:
+            self._evict(connection)
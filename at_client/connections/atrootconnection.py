@@ -4,6 +4,7 @@ from ..exception.atexception import *
 from .atconnection import AtConnection
 from .response import Response
 from .address import Address
+from .secondaryaddresscache import SecondaryAddressCache
 
 
 class AtRootConnection(AtConnection):
@@ -58,6 +59,7 @@ class AtRootConnection(AtConnection):
         else:
             AtRootConnection.__instance = self
             super().__init__(host, port, context, verbose)
+            self.secondary_address_cache = SecondaryAddressCache.get_instance()
 
     def connect(self):
         """
@@ -67,13 +69,14 @@ class AtRootConnection(AtConnection):
         if self._verbose:
             print("Root Connection Successful")
 
-    def parse_raw_response(self, raw_response:str):
+    @staticmethod
+    def parse_raw_response(raw_response):
         """
         Parse the raw response from the root server.
 
         Parameters
         ----------
-        raw_response : str
+        raw_response : bytes or str
             The raw response received from the root server.
 
         Returns
@@ -82,19 +85,24 @@ class AtRootConnection(AtConnection):
             The parsed response from the root server.
         """
         # Responses from root are either 'null' or <host:port>
+        if not isinstance(raw_response, str):
+            raw_response = bytes(raw_response).decode()
         if raw_response.endswith("@"):
             raw_response = raw_response[:-1]
 
         return Response().set_raw_data_response(raw_response.strip())
 
-    def find_secondary(self, atsign:AtSign):
+    def find_secondary(self, atsign:AtSign, use_cache:bool=True):
         """
         Find the secondary server for the given atsign on the root server.
 
         Parameters
         ----------
-        atsign : str
+        atsign : AtSign
             The atsign to lookup.
+        use_cache : bool, optional
+            Return the address from secondary_address_cache if it is there (default is True). The address looked up
+            is cached either way.
 
         Returns
         -------
@@ -106,6 +114,11 @@ class AtRootConnection(AtConnection):
         AtException
             If the root lookup returns null or a malformed response is received.
         """
+        if use_cache:
+            address = self.secondary_address_cache.get(atsign)
+            if address is not None:
+                return address
+
         if not self.is_connected():
             try:
                 self.connect()
@@ -119,6 +132,8 @@ class AtRootConnection(AtConnection):
             raise AtSecondaryNotFoundException(f"Root lookup returned null for {atsign}")
         else:
             try:
-                return Address.from_string(response)
+                address = Address.from_string(response)
             except ValueError as e:
                 raise AtException(f"Received malformed response {response} from lookup of {atsign} on root server")
+            self.secondary_address_cache.put(atsign, address)
+            return address
@@ -1,8 +1,14 @@
+import re
 import ssl
 from .atconnection import AtConnection
 from .address import Address
 from .response import Response
 
+_PREFIX = re.compile(rb"\s*(data:|error:|notification)")
+_NEWLINE = re.compile(rb"\n")
+_WHITESPACE = frozenset(b" \t\n\r\x0b\x0c")
+_PROMPT = ord("@")
+
 
 class AtSecondaryConnection(AtConnection):
     """
@@ -34,26 +40,50 @@ class AtSecondaryConnection(AtConnection):
         if self._verbose:
             print("Secondary Connection Successful")
 
-    def parse_raw_response(self, raw_response:str):
+    @staticmethod
+    def parse_raw_response(raw_response):
         """
         Parse the raw response from the secondary server.
 
+        The response is classified by its prefix and only the part the Response holds is decoded, straight from the
+        bytes received, so a large response is copied once rather than once per step of parsing it.
+
         Parameters
         ----------
-        raw_response : str
+        raw_response : bytes, bytearray, memoryview or str
             The raw response received from the secondary server.
 
         Returns
         -------
-        str
+        Response
             The parsed response from the secondary server.
         """
-        if raw_response.endswith("@"):
-            raw_response = raw_response[:-1]
-        raw_response = raw_response.strip()
+        if isinstance(raw_response, str):
+            raw_response = raw_response.encode()
+        view = memoryview(raw_response)
+        end = len(view)
+        if end and view[end - 1] == _PROMPT:
+            end -= 1
+        while end and view[end - 1] in _WHITESPACE:
+            end -= 1
+        match = _PREFIX.match(view, 0, end)
+        if match is None:
+            return AtSecondaryConnection._parse_unprefixed(str(view[:end], "utf-8").lstrip())
+        start = match.end()
+        prefix = match.group(1)
+        if prefix == b"data:":
+            # Only the first line is data
+            newline = _NEWLINE.search(view, start, end)
+            return Response().set_raw_data_response(str(view[start:newline.start() if newline else end], "utf-8"))
+        elif prefix == b"error:":
+            return Response().set_raw_error_response(str(view[start:end], "utf-8"))
+        else:
+            return Response().set_raw_data_response(str(view[start:end], "utf-8"))
 
+    @staticmethod
+    def _parse_unprefixed(raw_response:str):
+        # A response which does not start with "data:", "error:" or "notification", searched for them instead
         data_index = raw_response.find("data:")
-    
         error_index = raw_response.find("error:")
         notification_index = raw_response.find("notification")
         if data_index > -1:
@@ -0,0 +1,485 @@
+import errno
+import queue
+import selectors
+import socket
+import ssl
+import threading
+import traceback
+from collections import deque
+
+from ..common.atsign import AtSign
+from ..util.encryptionutil import EncryptionUtil
+from ..util.keysutil import KeysUtil
+from ..util.lrucache import LRUCache
+from ..util.timerwheel import TimerWheel
+from ..util.timeutil import TimeUtil
+from ..util.verbbuilder import FromVerbBuilder, PKAMVerbBuilder
+from .notification.monitorcheckpoint import MonitorCheckpoint
+from .address import Address
+from .asyncatconnection import AsyncAtConnection
+from .atmonitorconnection import AtMonitorConnection
+from .notification.atevents import AtEventType
+
+
+class MonitorSession:
+    """
+    The state of one atSign's monitor connection in a MonitorEngine. Only the engine's thread changes it.
+    """
+
+    DISCONNECTED = "disconnected"
+    CONNECTING = "connecting"
+    HANDSHAKING = "handshaking"
+    AUTHENTICATING = "authenticating"
+    MONITORING = "monitoring"
+    STOPPED = "stopped"
+
+    def __init__(self, atsign:AtSign, keys:dict, address:Address, queue:queue.Queue, regex:str="", last_received_time:int=0,
+                 recent_ids_size:int=10000, checkpoint:MonitorCheckpoint=None):
+        """
+        Initialize the MonitorSession object.
+
+        Parameters
+        ----------
+        atsign : AtSign
+            The atSign to monitor.
+        keys : dict
+            The atSign's keys, as loaded by KeysUtil.load_keys, used to authenticate with PKAM.
+        address : Address
+            The address of the atSign's secondary server.
+        queue : queue.Queue
+            The queue the AtEvents received are put on.
+        regex : str, optional
+            Only notifications for keys matching regex are received (default is all of them).
+        last_received_time : int, optional
+            Only notifications received by the server after this time, in milliseconds since the epoch, are received
+            (default is 0).
+        recent_ids_size : int, optional
+            The number of notification ids remembered to drop notifications sent again after a restart (default is
+            10000).
+        checkpoint : MonitorCheckpoint, optional
+            Told about each notification delivered; monitoring resumes from its last received time if that is later
+            than last_received_time, and its recent ids are remembered (default is None).
+        """
+        self.atsign = atsign
+        self.keys = keys
+        self.address = address
+        self.queue = queue
+        self.regex = regex
+        self.last_received_time = last_received_time
+        self.state = MonitorSession.DISCONNECTED
+        self.restarts = 0
+        self.recent_ids = LRUCache(max_size=recent_ids_size)
+        self.duplicates = 0
+        self.checkpoint = checkpoint
+        if checkpoint is not None:
+            self.last_received_time = max(last_received_time, checkpoint.last_received_time)
+            for notification_id in checkpoint.recent_ids:
+                self.recent_ids.put(notification_id, True)
+        self._failures = 0
+        self._generation = 0
+        self._socket = None
+        self._in_buffer = bytearray()
+        self._out_buffer = bytearray()
+        self._last_heartbeat_sent_time = 0
+        self._last_heartbeat_ack_time = 0
+        # Events waiting for room in a full queue, during which the connection is not read from
+        self._pending = deque()
+        self._paused = False
+
+    def __str__(self):
+        return f"{self.atsign} monitor ({self.state})"
+
+
+class MonitorEngine:
+    """
+    Runs the monitor connections of many atSigns on one thread.
+
+    Each atSign's monitor socket is non-blocking and multiplexed with a selector; connecting, the TLS handshake, PKAM
+    authentication and reading notifications are all driven from the engine's thread. Heartbeats, connection timeouts
+    and reconnection back-off are scheduled on a timer wheel, so the engine's cost does not grow with the number of
+    idle connections. Each connection is restarted on its own when it fails or stops acknowledging heartbeats.
+
+    Sessions are added and removed from any thread; everything else happens on the engine's thread.
+    """
+
+    def __init__(self, context:ssl.SSLContext=None, heartbeat_interval:float=30.0, connect_timeout:float=30.0,
+                 max_backoff:float=60.0, verbose:bool=False):
+        """
+        Initialize the MonitorEngine object.
+
+        Parameters
+        ----------
+        context : ssl.SSLContext, optional
+            The SSL context for the connections (default is ssl.create_default_context()).
+        heartbeat_interval : float, optional
+            Seconds between heartbeats; a connection which has not acknowledged the previous heartbeat when the next
+            is due is restarted (default is 30).
+        connect_timeout : float, optional
+            Seconds allowed to connect, authenticate and start monitoring (default is 30).
+        max_backoff : float, optional
+            The maximum number of seconds to wait before reconnecting after consecutive failures (default is 60).
+        verbose : bool, optional
+            Indicates if verbose output is enabled (default is False).
+        """
+        self._context = context if context is not None else ssl.create_default_context()
+        self.heartbeat_interval = heartbeat_interval
+        self.connect_timeout = connect_timeout
+        self.max_backoff = max_backoff
+        self._verbose = verbose
+        self._selector = selectors.DefaultSelector()
+        self._timers = TimerWheel(tick=min(0.5, heartbeat_interval / 4))
+        self._sessions = {}
+        self._commands = deque()
+        self._wakeup_reader, self._wakeup_writer = socket.socketpair()
+        self._wakeup_reader.setblocking(False)
+        self._wakeup_writer.setblocking(False)
+        self._selector.register(self._wakeup_reader, selectors.EVENT_READ, None)
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        """
+        Start the engine's thread.
+        """
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="MonitorEngine", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout:float=None):
+        """
+        Close every connection and stop the engine's thread.
+        """
+        if self._thread is None:
+            return
+        self._call(self._stop_all)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def close(self):
+        """
+        Stop the engine if it was started, and release its selector and wakeup sockets. The engine can't be used again.
+        """
+        if self._thread is not None:
+            self.stop()
+        else:
+            self._release()
+
+    def add(self, atsign:AtSign, keys:dict, address:Address, queue:queue.Queue, regex:str="", last_received_time:int=0,
+            recent_ids_size:int=10000, checkpoint:MonitorCheckpoint=None) -> MonitorSession:
+        """
+        Start monitoring atsign. See MonitorSession for the parameters.
+
+        Returns
+        -------
+        MonitorSession
+            The session, whose state and last_received_time can be inspected.
+        """
+        session = MonitorSession(atsign, keys, address, queue, regex, last_received_time, recent_ids_size, checkpoint)
+        self._call(lambda: self._add(session))
+        return session
+
+    def remove(self, session:MonitorSession):
+        """
+        Stop monitoring the session's atSign and close its connection.
+        """
+        self._call(lambda: self._remove(session))
+
+    def sessions(self) -> list:
+        """
+        Return the sessions being monitored.
+        """
+        return list(self._sessions.values())
+
+    def _call(self, command):
+        # deque.append is atomic, and the wakeup socket gets the engine's thread out of select()
+        self._commands.append(command)
+        try:
+            self._wakeup_writer.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass
+
+    def _run(self):
+        while self._running:
+            timeout = self._timers.timeout()
+            try:
+                ready = self._selector.select(timeout)
+            except OSError as e:
+                print(f"Monitor engine select failed - {e}")
+                ready = []
+            for key, events in ready:
+                if key.data is None:
+                    self._run_commands()
+                elif key.fileobj is key.data._socket:
+                    # Otherwise the session was closed or reconnected by a command or another session's events
+                    self._handle_io(key.data, events)
+            self._timers.advance()
+        self._release()
+
+    def _release(self):
+        self._selector.close()
+        self._wakeup_reader.close()
+        self._wakeup_writer.close()
+
+    def _run_commands(self):
+        try:
+            while self._wakeup_reader.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+        while self._commands:
+            command = self._commands.popleft()
+            try:
+                command()
+            except Exception:
+                traceback.print_exc()
+
+    def _add(self, session:MonitorSession):
+        self._sessions[id(session)] = session
+        self._connect(session)
+
+    def _remove(self, session:MonitorSession):
+        self._sessions.pop(id(session), None)
+        self._close(session)
+        session.state = MonitorSession.STOPPED
+
+    def _stop_all(self):
+        for session in list(self._sessions.values()):
+            self._remove(session)
+        self._running = False
+
+    def _schedule(self, session:MonitorSession, delay:float, callback):
+        # Timers left over from an earlier connection of the session do nothing
+        generation = session._generation
+        self._timers.schedule(delay, lambda: callback(session) if session._generation == generation else None)
+
+    def _connect(self, session:MonitorSession):
+        session._generation += 1
+        session.state = MonitorSession.CONNECTING
+        session._in_buffer.clear()
+        session._out_buffer.clear()
+        session._paused = False
+        if session._pending:
+            # Events received before the connection was lost are still waiting for room in the queue, and the timer
+            # which was to deliver them was cancelled when it was closed
+            self._schedule(session, self._timers.tick, self._resume)
+        try:
+            family, type, proto, _, sockaddr = socket.getaddrinfo(session.address.host, session.address.port, type=socket.SOCK_STREAM)[0]
+            session._socket = socket.socket(family, type, proto)
+            session._socket.setblocking(False)
+            session._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            result = session._socket.connect_ex(sockaddr)
+            if result not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+                raise OSError(result, errno.errorcode.get(result, str(result)))
+            self._selector.register(session._socket, selectors.EVENT_WRITE, session)
+        except OSError as e:
+            self._fail(session, f"failed to connect to {session.address} - {e}")
+            return
+        self._schedule(session, self.connect_timeout, self._check_connected)
+
+    def _check_connected(self, session:MonitorSession):
+        if session.state != MonitorSession.MONITORING:
+            self._fail(session, f"timed out connecting to {session.address}")
+
+    def _close(self, session:MonitorSession):
+        session._generation += 1
+        if session._socket is not None:
+            try:
+                self._selector.unregister(session._socket)
+            except (KeyError, ValueError):
+                pass
+            try:
+                session._socket.close()
+            except OSError:
+                pass
+            session._socket = None
+        session.state = MonitorSession.DISCONNECTED
+
+    def _fail(self, session:MonitorSession, reason:str):
+        if session.state == MonitorSession.STOPPED:
+            return
+        print(f"Monitor for {session.atsign} {reason}")
+        self._close(session)
+        if id(session) not in self._sessions:
+            return
+        session._failures += 1
+        session.restarts += 1
+        delay = min(self.max_backoff, 2 ** (session._failures - 1))
+        self._schedule(session, delay, self._connect)
+
+    def _watch(self, session:MonitorSession, events:int):
+        if session._paused:
+            events &= ~selectors.EVENT_READ
+        registered = session._socket in self._selector.get_map()
+        if events == 0:
+            if registered:
+                self._selector.unregister(session._socket)
+        elif registered:
+            self._selector.modify(session._socket, events, session)
+        else:
+            self._selector.register(session._socket, events, session)
+
+    def _handle_io(self, session:MonitorSession, events:int):
+        try:
+            if session.state == MonitorSession.CONNECTING:
+                error = session._socket.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if error != 0:
+                    raise OSError(error, errno.errorcode.get(error, str(error)))
+                self._selector.unregister(session._socket)
+                session._socket = self._context.wrap_socket(session._socket, server_hostname=session.address.host,
+                                                            do_handshake_on_connect=False)
+                self._selector.register(session._socket, selectors.EVENT_READ, session)
+                session.state = MonitorSession.HANDSHAKING
+                self._handshake(session)
+            elif session.state == MonitorSession.HANDSHAKING:
+                self._handshake(session)
+            else:
+                if events & selectors.EVENT_WRITE:
+                    self._flush(session)
+                if events & selectors.EVENT_READ:
+                    self._receive(session)
+        except (OSError, ssl.SSLError) as e:
+            self._fail(session, f"connection to {session.address} failed - {e}")
+
+    def _handshake(self, session:MonitorSession):
+        try:
+            session._socket.do_handshake()
+        except ssl.SSLWantReadError:
+            self._watch(session, selectors.EVENT_READ)
+            return
+        except ssl.SSLWantWriteError:
+            self._watch(session, selectors.EVENT_WRITE)
+            return
+        self._watch(session, selectors.EVENT_READ)
+        session.state = MonitorSession.AUTHENTICATING
+        self._send(session, FromVerbBuilder().set_shared_by(session.atsign.to_string()).build())
+
+    def _send(self, session:MonitorSession, command:str):
+        if self._verbose:
+            print(f"\tSENT (MONITOR {session.atsign}): {repr(command)}")
+        session._out_buffer += command.encode() + b"\n"
+        self._flush(session)
+
+    def _flush(self, session:MonitorSession):
+        while session._out_buffer:
+            try:
+                sent = session._socket.send(session._out_buffer)
+            except (ssl.SSLWantWriteError, ssl.SSLWantReadError, BlockingIOError):
+                self._watch(session, selectors.EVENT_READ | selectors.EVENT_WRITE)
+                return
+            del session._out_buffer[:sent]
+        self._watch(session, selectors.EVENT_READ)
+
+    def _receive(self, session:MonitorSession):
+        while True:
+            try:
+                data = session._socket.recv(65536)
+            except (ssl.SSLWantReadError, ssl.SSLWantWriteError, BlockingIOError):
+                break
+            if not data:
+                raise OSError("connection closed by server")
+            session._in_buffer += data
+        self._process_lines(session)
+
+    def _process_lines(self, session:MonitorSession):
+        while session._socket is not None and not session._paused:
+            end = session._in_buffer.find(b"\n")
+            if end < 0:
+                break
+            line = AsyncAtConnection.strip_prompts(bytes(session._in_buffer[:end]))
+            del session._in_buffer[:end + 1]
+            if line.strip():
+                self._handle_line(session, line.rstrip(b"\r"))
+
+    def _handle_line(self, session:MonitorSession, line:bytes):
+        if self._verbose:
+            print(f"\tRCVD (MONITOR {session.atsign}): {line.decode(errors='replace')}")
+        if session.state == MonitorSession.AUTHENTICATING:
+            self._authenticate(session, line.decode())
+            return
+        if session.state != MonitorSession.MONITORING:
+            return
+
+        at_event = AtMonitorConnection.parse_monitor_response(line, session.atsign)
+        if at_event.event_type == AtEventType.MONITOR_HEARTBEAT_ACK:
+            session._last_heartbeat_ack_time = TimeUtil.current_time_millis()
+        elif at_event.event_type != AtEventType.MONITOR_EXCEPTION:
+            if "epochMillis" in at_event.event_data:
+                session.last_received_time = int(at_event.event_data.get("epochMillis"))
+            else:
+                session.last_received_time = TimeUtil.current_time_millis()
+        if AtMonitorConnection.is_duplicate(session.recent_ids, at_event):
+            session.duplicates += 1
+            return
+        if session.checkpoint is not None:
+            session.checkpoint.delivered(at_event)
+        self._deliver(session, at_event)
+
+    def _deliver(self, session:MonitorSession, at_event):
+        if not session._pending:
+            try:
+                session.queue.put(at_event, block=False)
+                return
+            except queue.Full:
+                pass
+        # Rather than block the engine's thread, stop reading from this connection until its consumer catches up
+        session._pending.append(at_event)
+        if not session._paused:
+            session._paused = True
+            self._watch(session, selectors.EVENT_WRITE if session._out_buffer else 0)
+            self._schedule(session, self._timers.tick, self._resume)
+
+    def _resume(self, session:MonitorSession):
+        while session._pending:
+            try:
+                session.queue.put(session._pending[0], block=False)
+            except queue.Full:
+                self._schedule(session, self._timers.tick, self._resume)
+                return
+            session._pending.popleft()
+        if not session._paused:
+            # Reading was not stopped for these events, which were left over from an earlier connection
+            return
+        session._paused = False
+        # Acknowledgements of heartbeats sent while paused have not been read yet
+        session._last_heartbeat_ack_time = TimeUtil.current_time_millis()
+        try:
+            self._watch(session, selectors.EVENT_READ | (selectors.EVENT_WRITE if session._out_buffer else 0))
+            self._process_lines(session)
+        except (OSError, ssl.SSLError) as e:
+            self._fail(session, f"connection to {session.address} failed - {e}")
+
+    def _authenticate(self, session:MonitorSession, response:str):
+        if response.startswith("data:success"):
+            session.state = MonitorSession.MONITORING
+            session._failures = 0
+            session._last_heartbeat_sent_time = session._last_heartbeat_ack_time = TimeUtil.current_time_millis()
+            self._send(session, f"monitor:{session.last_received_time} {session.regex}".rstrip())
+            self._schedule(session, self.heartbeat_interval, self._heartbeat)
+        elif response.startswith("data:"):
+            try:
+                signature = EncryptionUtil.sign_sha256_rsa(response[len("data:"):], session.keys[KeysUtil.pkam_private_key_name])
+            except Exception as e:
+                self._fail(session, f"failed to create PKAM signature - {e}")
+                return
+            self._send(session, PKAMVerbBuilder().set_digest(signature).build())
+        else:
+            self._fail(session, f"failed to authenticate - {response}")
+
+    def _heartbeat(self, session:MonitorSession):
+        if session.state != MonitorSession.MONITORING:
+            return
+        if session._paused:
+            self._schedule(session, self.heartbeat_interval, self._heartbeat)
+            return
+        if session._last_heartbeat_ack_time < session._last_heartbeat_sent_time:
+            self._fail(session, "heartbeats not being acknowledged")
+            return
+        try:
+            self._send(session, "noop:0")
+        except (OSError, ssl.SSLError) as e:
+            self._fail(session, f"failed to send heartbeat - {e}")
+            return
+        session._last_heartbeat_sent_time = TimeUtil.current_time_millis()
+        self._schedule(session, self.heartbeat_interval, self._heartbeat)
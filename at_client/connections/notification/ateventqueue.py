@@ -0,0 +1,144 @@
+import queue
+from enum import Enum
+
+from .atevents import AtEvent, AtEventType
+
+
+class OverflowPolicy(Enum):
+    BLOCK = 0
+    DROP_OLDEST = 1
+    DROP_HEARTBEATS = 2
+    COALESCE = 3
+
+    def __str__(self):
+        return self.name
+
+
+class AtEventQueue(queue.Queue):
+    """
+    Bounded queue of AtEvents with an explicit policy for when the consumer falls behind, to pass as the queue of an
+    AtClient or a MonitorEngine session.
+
+    - BLOCK: put() waits for room, so the monitor stops reading from the server until the consumer catches up. A
+      MonitorEngine stops reading from just that connection rather than blocking its thread.
+    - DROP_OLDEST: the oldest queued event is dropped to make room.
+    - DROP_HEARTBEATS: the oldest queued heartbeat acknowledgement is dropped to make room, or the oldest event if
+      there are none.
+    - COALESCE: an update or delete notification replaces the queued notification for the same key, if there is one,
+      and heartbeat and stats events replace queued events of the same type; when there is still no room, events are
+      dropped as with DROP_HEARTBEATS.
+
+    The dropped and coalesced counters record how many events were lost or merged, and on_discard is called with each
+    event dropped or replaced by a newer one.
+    """
+
+    COALESCED_EVENT_TYPES = (AtEventType.UPDATE_NOTIFICATION, AtEventType.DELETE_NOTIFICATION,
+                             AtEventType.MONITOR_HEARTBEAT_ACK, AtEventType.STATS_NOTIFICATION)
+
+    def __init__(self, maxsize:int=10000, policy:OverflowPolicy=OverflowPolicy.BLOCK, on_discard=None):
+        """
+        Initialize the AtEventQueue object.
+
+        Parameters
+        ----------
+        maxsize : int, optional
+            The maximum number of queued events, or 0 for no limit (default is 10000).
+        policy : OverflowPolicy, optional
+            What to do with events when the queue is full (default is OverflowPolicy.BLOCK).
+        on_discard : callable, optional
+            Called with each event which is dropped, or replaced by a newer one, so it will never be consumed; e.g. an
+            AtClient's ack, so that its monitor checkpoint can advance past it. AtClient.start_monitor sets it to ack
+            when the monitor has a checkpoint (default is None).
+        """
+        super().__init__(maxsize)
+        self.policy = policy
+        self.on_discard = on_discard
+        self.dropped = 0
+        self.coalesced = 0
+        self._heartbeats = 0
+        self._coalescable = {}
+
+    def put(self, item:AtEvent, block=True, timeout=None):
+        if self.policy == OverflowPolicy.BLOCK:
+            return super().put(item, block, timeout)
+        with self.not_full:
+            discarded = self._coalesce(item) if self.policy == OverflowPolicy.COALESCE else None
+            if discarded is not None:
+                self.coalesced += 1
+            else:
+                if 0 < self.maxsize <= self._qsize():
+                    discarded = self._drop()
+                self._put(item)
+                self.unfinished_tasks += 1
+                self.not_empty.notify()
+        # Called without holding the queue's lock, as it may do I/O, e.g. saving a checkpoint
+        if discarded is not None and self.on_discard is not None:
+            self.on_discard(discarded)
+
+    def _coalesce(self, item:AtEvent) -> AtEvent:
+        # The event replaced by item, or None if there is none
+        coalesce_key = self._coalesce_key(item)
+        queued = self._coalescable.get(coalesce_key) if coalesce_key is not None else None
+        if queued is None:
+            return None
+        replaced = AtEvent(queued.event_type, queued.event_data)
+        # The queued event takes on the new event's contents, so it keeps its place in the queue
+        queued.event_type = item.event_type
+        queued.event_data = item.event_data
+        return replaced
+
+    @staticmethod
+    def _coalesce_key(item:AtEvent):
+        if item.event_type not in AtEventQueue.COALESCED_EVENT_TYPES:
+            return None
+        if item.event_type in (AtEventType.UPDATE_NOTIFICATION, AtEventType.DELETE_NOTIFICATION):
+            return "key", (item.event_data or {}).get("key")
+        return "type", item.event_type
+
+    def _drop(self) -> AtEvent:
+        dropped = None
+        if self.policy != OverflowPolicy.DROP_OLDEST and self._heartbeats > 0:
+            for item in self.queue:
+                if item.event_type == AtEventType.MONITOR_HEARTBEAT_ACK:
+                    self.queue.remove(item)
+                    dropped = item
+                    break
+        else:
+            dropped = self.queue.popleft()
+        self._forget(dropped)
+        self.dropped += 1
+        self.unfinished_tasks -= 1
+        if self.unfinished_tasks == 0:
+            self.all_tasks_done.notify_all()
+        return dropped
+
+    def _forget(self, item:AtEvent):
+        if item.event_type == AtEventType.MONITOR_HEARTBEAT_ACK:
+            self._heartbeats -= 1
+        if self.policy == OverflowPolicy.COALESCE:
+            # Coalescing never changes an event's coalesce key, so it is still the one it was queued with
+            coalesce_key = self._coalesce_key(item)
+            if coalesce_key is not None and self._coalescable.get(coalesce_key) is item:
+                del self._coalescable[coalesce_key]
+
+    def _put(self, item:AtEvent):
+        super()._put(item)
+        if item.event_type == AtEventType.MONITOR_HEARTBEAT_ACK:
+            self._heartbeats += 1
+        if self.policy == OverflowPolicy.COALESCE:
+            coalesce_key = self._coalesce_key(item)
+            if coalesce_key is not None:
+                self._coalescable[coalesce_key] = item
+
+    def _get(self) -> AtEvent:
+        item = super()._get()
+        self._forget(item)
+        return item
+
+    def stats(self) -> dict:
+        """
+        Return the number of queued events, the queue's maximum size and policy, and the dropped and coalesced counters.
+        """
+        with self.mutex:
+            return {"size": self._qsize(), "maxsize": self.maxsize, "policy": str(self.policy),
+                    "dropped": self.dropped, "coalesced": self.coalesced}
@@ -0,0 +1,190 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from .atevents import AtEvent
+
+
+class CheckpointStore(ABC):
+    """
+    Where MonitorCheckpoints are persisted, one per atSign.
+    """
+
+    @abstractmethod
+    def load(self, atsign:str) -> dict:
+        """
+        Return the checkpoint last saved for atsign, or None if there is none.
+        """
+        raise NotImplementedError("Subclasses must implement the load() method")
+
+    @abstractmethod
+    def save(self, atsign:str, checkpoint:dict):
+        """
+        Persist checkpoint for atsign, replacing the previous one.
+        """
+        raise NotImplementedError("Subclasses must implement the save() method")
+
+
+class FileCheckpointStore(CheckpointStore):
+    """
+    Stores each atSign's checkpoint as a JSON file in a directory, replacing it atomically so that a crash while
+    saving leaves the previous checkpoint intact.
+    """
+
+    def __init__(self, directory:str=os.path.expanduser("~/.atsign/monitor/")):
+        """
+        Initialize the FileCheckpointStore object.
+
+        Parameters
+        ----------
+        directory : str, optional
+            The directory holding the checkpoint files, created if needed (default is ~/.atsign/monitor/).
+        """
+        self.directory = directory
+
+    def _path(self, atsign:str) -> str:
+        return os.path.join(self.directory, f"{atsign}_monitor.json")
+
+    def load(self, atsign:str) -> dict:
+        try:
+            with open(self._path(atsign)) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def save(self, atsign:str, checkpoint:dict):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=f".{atsign}_monitor.")
+        try:
+            with os.fdopen(fd, "w") as file:
+                json.dump(checkpoint, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self._path(atsign))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+class MemoryCheckpointStore(CheckpointStore):
+    """
+    Keeps checkpoints in memory, for tests and for processes which only need to survive monitor restarts.
+    """
+
+    def __init__(self):
+        self._checkpoints = {}
+
+    def load(self, atsign:str) -> dict:
+        checkpoint = self._checkpoints.get(atsign)
+        return dict(checkpoint) if checkpoint is not None else None
+
+    def save(self, atsign:str, checkpoint:dict):
+        self._checkpoints[atsign] = dict(checkpoint)
+
+
+class MonitorCheckpoint:
+    """
+    Durable record of how far the notifications of an atSign's monitor have been processed, so that a new process
+    resumes monitoring where the last one left off instead of receiving every notification again or missing some.
+
+    The monitor reports each notification it delivers with delivered(), and the consumer reports each one it has
+    finished with with ack(). The checkpoint only advances past a notification once it and every notification
+    delivered before it have been acknowledged, so notifications still being processed when a process dies are
+    received again by the next one; the ids of the recently acknowledged notifications are recorded too, so that those
+    which are received again are dropped.
+    """
+
+    def __init__(self, store:CheckpointStore, atsign:str, recent_ids_size:int=1000, commit_interval:float=0.0):
+        """
+        Initialize the MonitorCheckpoint object from the checkpoint last saved in store.
+
+        Parameters
+        ----------
+        store : CheckpointStore
+            Where the checkpoint is loaded from and saved to.
+        atsign : str
+            The atSign being monitored.
+        recent_ids_size : int, optional
+            The number of acknowledged notification ids recorded (default is 1000).
+        commit_interval : float, optional
+            The minimum number of seconds between saves; acknowledgements made meanwhile are saved by the next one or
+            by commit() (default is 0, to save on every acknowledgement).
+        """
+        self.store = store
+        self.atsign = atsign
+        self.recent_ids_size = recent_ids_size
+        self.commit_interval = commit_interval
+        saved = store.load(atsign) or {}
+        # The last committed state, which a new monitor resumes from
+        self.last_received_time = int(saved.get("lastReceivedTime", 0))
+        self.recent_ids = list(saved.get("recentIds", []))
+        self._acked_ids = OrderedDict((notification_id, True) for notification_id in self.recent_ids)
+        self._acked_time = self.last_received_time
+        # Ids of the notifications delivered but not acknowledged yet, with their epochMillis
+        self._pending = {}
+        self._dirty = False
+        self._last_commit = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _id_and_time(at_event:AtEvent):
+        event_data = at_event.event_data if isinstance(at_event.event_data, dict) else {}
+        notification_id = event_data.get("id")
+        epoch_millis = event_data.get("epochMillis")
+        if notification_id is None or str(notification_id) == "-1" or epoch_millis is None:
+            return None, None
+        return str(notification_id), int(epoch_millis)
+
+    def delivered(self, at_event:AtEvent):
+        """
+        Record that at_event has been put on the consumer's queue. Events which are not notifications are ignored.
+        """
+        notification_id, epoch_millis = self._id_and_time(at_event)
+        if notification_id is not None:
+            with self._lock:
+                self._pending[notification_id] = epoch_millis
+
+    def ack(self, at_event:AtEvent):
+        """
+        Record that the consumer has finished with at_event, or with a decrypted event made from it, and save the
+        checkpoint if it has advanced and commit_interval has elapsed.
+        """
+        notification_id, epoch_millis = self._id_and_time(at_event)
+        if notification_id is None:
+            return
+        with self._lock:
+            if self._pending.pop(notification_id, None) is None:
+                return
+            self._acked_ids[notification_id] = True
+            self._acked_ids.move_to_end(notification_id)
+            while len(self._acked_ids) > self.recent_ids_size:
+                self._acked_ids.popitem(last=False)
+            self._acked_time = max(self._acked_time, epoch_millis)
+            self._dirty = True
+            if time.monotonic() - self._last_commit < self.commit_interval:
+                return
+        self.commit()
+
+    def commit(self):
+        """
+        Save the checkpoint now, if anything has been acknowledged since it was last saved.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            if self._pending:
+                # Notifications with the same epochMillis as the oldest unacknowledged one must be received again
+                last_received_time = min(self._acked_time, min(self._pending.values()) - 1)
+            else:
+                last_received_time = self._acked_time
+            self.last_received_time = max(self.last_received_time, last_received_time)
+            self.recent_ids = list(self._acked_ids)
+            checkpoint = {"lastReceivedTime": self.last_received_time, "recentIds": self.recent_ids}
+            self._dirty = False
+            self._last_commit = time.monotonic()
+            # Saved while holding the lock, so that an older checkpoint can never replace a newer one
+            self.store.save(self.atsign, checkpoint)
@@ -0,0 +1,239 @@
+import re
+import threading
+import traceback
+
+from ...common.atsign import AtSign
+from .atevents import AtEvent, AtEventType
+
+# Characters which end the literal prefix of a regular expression
+_REGEX_SPECIAL = frozenset(".^$*+?{}[]\\|()")
+
+
+class Subscription:
+    """
+    A handler registered with a SubscriptionRouter, and the events it is called for.
+    """
+
+    __slots__ = ("handler", "key", "namespace", "sender", "event_types", "_key_regex", "_sequence")
+
+    def __init__(self, handler, key:str, namespace:str, sender:str, event_types:frozenset, sequence:int):
+        self.handler = handler
+        self.key = key
+        self.namespace = namespace
+        self.sender = sender
+        self.event_types = event_types
+        self._key_regex = re.compile(key) if key is not None else None
+        self._sequence = sequence
+
+    def matches(self, event_type:AtEventType, key:str, namespaces:set, sender:str) -> bool:
+        return ((self.event_types is None or event_type in self.event_types)
+                and (self.sender is None or self.sender == sender)
+                and (self.namespace is None or self.namespace in namespaces)
+                and (self._key_regex is None or (key is not None and self._key_regex.search(key) is not None)))
+
+
+class _Index:
+    # Immutable snapshot of the subscriptions, each filed under the most selective of its criteria that can be looked
+    # up directly, so that an event is only checked against the subscriptions which could match it
+
+    def __init__(self, subscriptions):
+        self.by_prefix = {}
+        self.by_namespace = {}
+        self.by_sender = {}
+        self.by_event_type = {}
+        self.others = []
+        for subscription in subscriptions:
+            prefix = SubscriptionRouter.literal_prefix(subscription.key) if subscription.key is not None else ""
+            if prefix:
+                self.by_prefix.setdefault(prefix, []).append(subscription)
+            elif subscription.namespace is not None:
+                self.by_namespace.setdefault(subscription.namespace, []).append(subscription)
+            elif subscription.sender is not None:
+                self.by_sender.setdefault(subscription.sender, []).append(subscription)
+            elif subscription.event_types is not None:
+                for event_type in subscription.event_types:
+                    self.by_event_type.setdefault(event_type, []).append(subscription)
+            else:
+                self.others.append(subscription)
+        self.prefix_lengths = sorted({len(prefix) for prefix in self.by_prefix})
+        # One pass of a combined expression rules out every unanchored key pattern at once for most keys
+        self.others_regex = None
+        patterns = [subscription.key for subscription in self.others]
+        if patterns and None not in patterns:
+            try:
+                self.others_regex = re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+            except re.error:
+                # e.g. patterns with global inline flags, which are only allowed at the start of an expression
+                pass
+
+    def candidates(self, event_type:AtEventType, key:str, namespaces:set, sender:str) -> list:
+        candidates = []
+        if key is not None:
+            for length in self.prefix_lengths:
+                if length > len(key):
+                    break
+                candidates.extend(self.by_prefix.get(key[:length], ()))
+        for namespace in namespaces:
+            candidates.extend(self.by_namespace.get(namespace, ()))
+        if sender is not None:
+            candidates.extend(self.by_sender.get(sender, ()))
+        candidates.extend(self.by_event_type.get(event_type, ()))
+        if self.others and (self.others_regex is None or (key is not None and self.others_regex.search(key) is not None)):
+            candidates.extend(self.others)
+        return candidates
+
+
+class SubscriptionRouter:
+    """
+    Calls the handlers subscribed to monitor events by key pattern, namespace, sender atSign and event type.
+
+    Subscriptions are indexed by the literal prefix of their key pattern, their namespace, their sender or their event
+    types, so dispatching an event costs about the same however many subscriptions there are, and only those which
+    could match it are checked.
+
+    The router has a put() method, so it can take the place of a queue: as the output queue of a
+    NotificationProcessor, for example, decrypted notifications are dispatched on its workers, and the processor
+    acknowledges each one with AtClient.ack once its handlers have returned. Used as any other queue, with nothing to
+    acknowledge events for it, handlers must call AtClient.ack themselves when the client has a monitor checkpoint.
+    """
+
+    def __init__(self):
+        self._subscriptions = {}
+        self._sequence = 0
+        self._index = _Index([])
+        self._lock = threading.Lock()
+        self.dispatched = 0
+        self.unmatched = 0
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def subscribe(self, handler, key:str=None, namespace:str=None, sender=None, event_types=None) -> Subscription:
+        """
+        Call handler(at_event) for the events matching all the criteria given.
+
+        Parameters
+        ----------
+        handler : callable
+            Called with each matching AtEvent.
+        key : str, optional
+            Regular expression searched for in the event's key, like the regex of start_monitor; begin it with "^" and
+            a literal prefix (e.g. "^@bob:location") for the subscription to be indexed by that prefix.
+        namespace : str, optional
+            The namespace of the event's key, e.g. "myapp" for "@bob:location.myapp@alice".
+        sender : str or AtSign, optional
+            The atSign the notification is from.
+        event_types : AtEventType or iterable of AtEventType, optional
+            The types of event.
+
+        Returns
+        -------
+        Subscription
+            The subscription, which can be passed to unsubscribe().
+        """
+        if isinstance(sender, AtSign):
+            sender = sender.to_string()
+        if sender is not None and not sender.startswith("@"):
+            sender = "@" + sender
+        if isinstance(event_types, AtEventType):
+            event_types = (event_types,)
+        with self._lock:
+            self._sequence += 1
+            subscription = Subscription(handler, key, namespace.lower().lstrip(".") if namespace is not None else None,
+                                        sender.lower() if sender is not None else None,
+                                        frozenset(event_types) if event_types is not None else None, self._sequence)
+            self._subscriptions[subscription._sequence] = subscription
+            self._index = _Index(self._subscriptions.values())
+        return subscription
+
+    def unsubscribe(self, subscription:Subscription):
+        """
+        Stop calling the handler of subscription.
+        """
+        with self._lock:
+            if self._subscriptions.pop(subscription._sequence, None) is not None:
+                self._index = _Index(self._subscriptions.values())
+
+    @staticmethod
+    def literal_prefix(pattern:str) -> str:
+        """
+        Return the literal text every string searched by pattern must start with to match, or "" if pattern is not
+        anchored to the start or starts with something other than literal text.
+        """
+        if "|" in pattern:
+            # An alternative may not be anchored
+            return ""
+        if pattern.startswith("^"):
+            start = 1
+        elif pattern.startswith("\\A"):
+            start = 2
+        else:
+            return ""
+        end = start
+        while end < len(pattern) and pattern[end] not in _REGEX_SPECIAL:
+            end += 1
+        if end < len(pattern) and pattern[end] in "*?{":
+            # The quantifier makes the last character optional
+            end -= 1
+        return pattern[start:max(start, end)]
+
+    @staticmethod
+    def _parse(at_event:AtEvent):
+        event_data = at_event.event_data if isinstance(at_event.event_data, dict) else {}
+        key = event_data.get("key")
+        sender = event_data.get("from")
+        namespaces = set()
+        if key is not None:
+            key = str(key)
+            name, _, shared_by = key.rpartition("@")
+            if sender is None and name:
+                sender = "@" + shared_by
+            # A key's namespace is what follows a dot in its name, and the name itself may contain dots
+            name = name.rsplit(":", 1)[-1].lower()
+            index = name.find(".")
+            while index >= 0:
+                namespaces.add(name[index + 1:])
+                index = name.find(".", index + 1)
+        if sender is not None:
+            sender = str(sender).lower()
+            if not sender.startswith("@"):
+                sender = "@" + sender
+        return key, namespaces, sender
+
+    def match(self, at_event:AtEvent) -> list:
+        """
+        Return the subscriptions matching at_event, in the order they were made.
+        """
+        key, namespaces, sender = self._parse(at_event)
+        candidates = self._index.candidates(at_event.event_type, key, namespaces, sender)
+        matched = {subscription._sequence: subscription for subscription in candidates
+                   if subscription.matches(at_event.event_type, key, namespaces, sender)}
+        return [matched[sequence] for sequence in sorted(matched)]
+
+    def dispatch(self, at_event:AtEvent) -> int:
+        """
+        Call the handlers of the subscriptions matching at_event. A handler raising an exception does not stop the
+        others being called.
+
+        Returns
+        -------
+        int
+            The number of handlers called.
+        """
+        subscriptions = self.match(at_event)
+        for subscription in subscriptions:
+            try:
+                subscription.handler(at_event)
+            except Exception:
+                traceback.print_exc()
+        with self._lock:
+            self.dispatched += 1
+            if not subscriptions:
+                self.unmatched += 1
+        return len(subscriptions)
+
+    def put(self, at_event:AtEvent, block=True, timeout=None):
+        """
+        Dispatch at_event, so that the router can be used in place of a queue.
+        """
+        self.dispatch(at_event)
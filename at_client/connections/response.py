@@ -26,8 +26,7 @@ class Response:
         self.raw_data_response = None
 
         error_code_segment = self.raw_error_response[:self.raw_error_response.index(":")].strip()
-        separated_by_hyphen = error_code_segment.split("-")
-        self.error_code = separated_by_hyphen[0].strip()
+        self.error_code = error_code_segment.partition("-")[0].strip()
 
         self.error_text = self.raw_error_response.replace(f"{error_code_segment}:", "").strip()
         return self
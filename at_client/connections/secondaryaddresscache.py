@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+import time
+
+from ..common.atsign import AtSign
+from .address import Address
+
+
+class SecondaryAddressCache:
+    """
+    Cache of the secondary server addresses returned by root lookups, keyed by atSign, optionally persisted to a JSON
+    file so that short-lived processes can skip the root lookup.
+    """
+
+    __instance = None
+
+    @staticmethod
+    def get_instance(ttl:float=None, path:str=None):
+        """
+        Get the cache shared by root connections, creating it on first use. Settings which are given are applied to it
+        with configure(), whether it has just been created or not.
+
+        Parameters
+        ----------
+        ttl : float, optional
+            Seconds for which an address is used before it is looked up again (default is to keep the current setting,
+            or 3600 when the cache is created).
+        path : str, optional
+            JSON file the cache is loaded from and saved to (default is to keep the current setting, or to keep the
+            cache in memory only when it is created).
+
+        Returns
+        -------
+        SecondaryAddressCache
+            The shared instance.
+        """
+        if SecondaryAddressCache.__instance is None:
+            SecondaryAddressCache.__instance = SecondaryAddressCache(3600.0 if ttl is None else ttl, path)
+        else:
+            SecondaryAddressCache.__instance.configure(ttl, path)
+        return SecondaryAddressCache.__instance
+
+    def __init__(self, ttl:float=3600.0, path:str=None):
+        """
+        Initialize the SecondaryAddressCache object.
+
+        Parameters
+        ----------
+        ttl : float, optional
+            Seconds for which an address is used before it is looked up again (default is 3600).
+        path : str, optional
+            JSON file the cache is loaded from and saved to (default is to keep it in memory only).
+        """
+        self.ttl = ttl
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if path is not None:
+            self._load()
+
+    def configure(self, ttl:float=None, path:str=None):
+        """
+        Change the cache's settings. Those which are not given are kept.
+
+        Parameters
+        ----------
+        ttl : float, optional
+            Seconds for which an address is used before it is looked up again, from the next time it is cached.
+        path : str, optional
+            JSON file the cache is loaded from and saved to. The addresses it holds are added to those cached already,
+            and the result saved to it.
+        """
+        with self._lock:
+            if ttl is not None:
+                self.ttl = ttl
+            if path is not None and path != self.path:
+                entries = self._entries
+                self.path = path
+                self._load()
+                self._entries.update(entries)
+                self._save()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+            self._entries = {atsign: (entry["address"], float(entry["expiresAt"])) for atsign, entry in entries.items()}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            # A missing or corrupt cache file just means starting with an empty cache
+            self._entries = {}
+
+    def _save(self):
+        if self.path is None:
+            return
+        entries = {atsign: {"address": address, "expiresAt": expires_at} for atsign, (address, expires_at) in self._entries.items()}
+        directory = os.path.dirname(self.path)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(temp_path, "w") as f:
+                json.dump(entries, f)
+            os.replace(temp_path, self.path)
+        except OSError:
+            # Like a cache file which can't be loaded, one which can't be saved just means lookups the next process
+            # could have skipped, so the entries stay in memory only
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def get(self, atsign:AtSign) -> Address:
+        """
+        Return the cached secondary address of atsign, or None if it is not cached or has expired.
+        """
+        with self._lock:
+            entry = self._entries.get(atsign.to_string())
+            if entry is None or entry[1] <= time.time():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return Address.from_string(entry[0])
+
+    def put(self, atsign:AtSign, address:Address):
+        """
+        Cache the secondary address of atsign for the cache's ttl.
+        """
+        with self._lock:
+            now = time.time()
+            self._entries = {key: entry for key, entry in self._entries.items() if entry[1] > now}
+            self._entries[atsign.to_string()] = (str(address), now + self.ttl)
+            self._save()
+
+    def invalidate(self, atsign:AtSign):
+        """
+        Forget the cached secondary address of atsign, e.g. because connecting to it failed.
+        """
+        with self._lock:
+            if self._entries.pop(atsign.to_string(), None) is not None:
+                self._save()
+
+    def clear(self):
+        """
+        Forget all cached addresses.
+        """
+        with self._lock:
+            self._entries = {}
+            self._save()
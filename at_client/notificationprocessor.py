@@ -0,0 +1,207 @@
+import queue
+import threading
+import time
+import traceback
+import zlib
+from collections import OrderedDict
+
+from .connections.notification.atevents import AtEvent, AtEventType
+from .connections.notification.subscriptionrouter import SubscriptionRouter
+
+
+class NotificationProcessor:
+    """
+    Pool of worker threads which handle monitor events for an AtClient, so that decrypting one sender's notifications
+    does not hold up everyone else's.
+
+    Events passed to submit() are handled by AtClient.handle_event on a worker, which puts the decrypted update
+    notifications on the output queue. Each sender's shared key is looked up once, however many workers need it.
+    With per-key ordering (the default), events for the same key are always handled by the same worker, in the
+    order they were submitted; with ordering="sender" the same holds per sender, and with ordering=None any idle
+    worker takes the next event.
+
+    Events which put nothing on the output queue - shared key and delete notifications, update notifications without a
+    value, and notifications which could not be decrypted - are acknowledged with AtClient.ack once handled, and so are coalesced notifications, since
+    their consumer never sees them.
+
+    When the output queue is a SubscriptionRouter, decrypted update notifications are dispatched to its handlers as
+    they are put on it, so they are acknowledged too, once their handlers have returned; handlers need not call ack.
+
+    With a coalescing window, an update or delete notification is held for that long before being handled, and any
+    further notifications for the same key received meanwhile replace it, so only the latest is decrypted.
+    """
+
+    HANDLED_EVENT_TYPES = (AtEventType.SHARED_KEY_NOTIFICATION, AtEventType.UPDATE_NOTIFICATION, AtEventType.DELETE_NOTIFICATION)
+
+    def __init__(self, atclient, workers:int=4, ordering:str="key", output_queue:queue.Queue=None, coalesce_window:float=0.0):
+        """
+        Initialize the NotificationProcessor object and start its workers.
+
+        Parameters
+        ----------
+        atclient : AtClient
+            The client whose handle_event is called for each event.
+        workers : int, optional
+            The number of worker threads (default is 4).
+        ordering : str, optional
+            "key" to handle each key's events in order, "sender" to handle each sender's events in order, or None for
+            no ordering (default is "key").
+        output_queue : queue.Queue, optional
+            The queue decrypted update notifications are put on (default is the client's queue).
+        coalesce_window : float, optional
+            Seconds for which update and delete notifications are held to be coalesced with later ones for the same
+            key (default is 0, not to hold them).
+        """
+        if workers < 1:
+            raise ValueError(f"Invalid number of workers: {workers}")
+        if ordering not in ("key", "sender", None):
+            raise ValueError(f"Invalid ordering: {ordering}")
+        self.atclient = atclient
+        self.ordering = ordering
+        self.output_queue = output_queue if output_queue is not None else atclient.queue
+        # A router has dispatched the decrypted event by the time handle_event returns, and there's no consumer to ack it
+        self._acks_outputs = isinstance(self.output_queue, SubscriptionRouter)
+        # One queue per worker when events must stay in order, otherwise one queue shared by all of them
+        self._queues = [queue.Queue() for _ in range(workers if ordering is not None else 1)]
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.processed = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.coalesce_window = coalesce_window
+        # Notifications being held, by key, as (deadline, event); in deadline order since the window is fixed
+        self._held = OrderedDict()
+        self._held_condition = threading.Condition()
+        self._stopping = False
+        self._flusher = None
+        if coalesce_window > 0:
+            self._flusher = threading.Thread(target=self._flush_held, name="NotificationProcessor-flusher", daemon=True)
+            self._flusher.start()
+        self._started_at = time.monotonic()
+        self._workers = [threading.Thread(target=self._work, args=(self._queues[index % len(self._queues)],),
+                                          name=f"NotificationProcessor-{index}", daemon=True) for index in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, at_event:AtEvent) -> bool:
+        """
+        Queue an event to be handled by a worker.
+
+        Returns
+        -------
+        bool
+            True if the event was queued, False if it is of a type the workers have nothing to do for.
+        """
+        if at_event.event_type not in self.HANDLED_EVENT_TYPES:
+            return False
+        with self._lock:
+            self.submitted += 1
+        if self._flusher is not None and at_event.event_type != AtEventType.SHARED_KEY_NOTIFICATION:
+            key = at_event.event_data.get("key")
+            with self._held_condition:
+                held = self._held.get(key)
+                if held is not None:
+                    self._held[key] = (held[0], at_event)
+                    with self._lock:
+                        self.coalesced += 1
+                else:
+                    self._held[key] = (time.monotonic() + self.coalesce_window, at_event)
+                    self._held_condition.notify_all()
+            if held is not None:
+                self.atclient.ack(held[1])
+            return True
+        self._dispatch(at_event)
+        return True
+
+    def _dispatch(self, at_event:AtEvent):
+        if len(self._queues) == 1:
+            events = self._queues[0]
+        else:
+            if self.ordering == "sender":
+                partition = str(at_event.event_data.get("from"))
+            else:
+                partition = str(at_event.event_data.get("key"))
+            events = self._queues[zlib.crc32(partition.encode()) % len(self._queues)]
+        events.put(at_event)
+
+    def _flush_held(self):
+        with self._held_condition:
+            while True:
+                now = time.monotonic()
+                while self._held and (self._stopping or next(iter(self._held.values()))[0] <= now):
+                    # Dispatched while holding the condition, so that join() never sees an event in neither place
+                    self._dispatch(self._held.popitem(last=False)[1][1])
+                self._held_condition.notify_all()
+                if self._stopping:
+                    return
+                timeout = next(iter(self._held.values()))[0] - now if self._held else None
+                self._held_condition.wait(timeout)
+
+    @staticmethod
+    def _outputs(at_event:AtEvent) -> bool:
+        # Whether handle_event puts a decrypted event on the output queue for at_event, which is acknowledged instead
+        return (at_event.event_type == AtEventType.UPDATE_NOTIFICATION
+                and (at_event.event_data or {}).get("value") is not None)
+
+    def _work(self, events:queue.Queue):
+        while True:
+            at_event = events.get()
+            try:
+                if at_event is None:
+                    return
+                try:
+                    handled = self.atclient.handle_event(self.output_queue, at_event) is not False
+                except Exception:
+                    traceback.print_exc()
+                    handled = False
+                if not handled or self._acks_outputs or not self._outputs(at_event):
+                    self.atclient.ack(at_event)
+                with self._lock:
+                    self.processed += 1
+                    if not handled:
+                        self.failed += 1
+            finally:
+                events.task_done()
+
+    def backlog(self) -> int:
+        """
+        Return the number of submitted events not handled yet.
+        """
+        with self._lock:
+            return self.submitted - self.coalesced - self.processed
+
+    def stats(self) -> dict:
+        """
+        Return the number of workers, the events submitted, coalesced, processed and failed so far, the backlog, and
+        the throughput in events per second since the processor started.
+        """
+        with self._lock:
+            elapsed = time.monotonic() - self._started_at
+            return {"workers": len(self._workers), "submitted": self.submitted, "coalesced": self.coalesced,
+                    "processed": self.processed, "failed": self.failed,
+                    "backlog": self.submitted - self.coalesced - self.processed,
+                    "throughput": self.processed / elapsed if elapsed > 0 else 0.0}
+
+    def join(self):
+        """
+        Wait until every submitted event has been handled.
+        """
+        with self._held_condition:
+            while self._held:
+                self._held_condition.wait()
+        for events in self._queues:
+            events.join()
+
+    def stop(self):
+        """
+        Handle the events already submitted, then stop the workers.
+        """
+        if self._flusher is not None:
+            with self._held_condition:
+                self._stopping = True
+                self._held_condition.notify_all()
+            self._flusher.join()
+        for index in range(len(self._workers)):
+            self._queues[index % len(self._queues)].put(None)
+        for worker in self._workers:
+            worker.join()
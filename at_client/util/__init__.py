@@ -6,4 +6,9 @@ from .onboardingutil import OnboardingUtil
 from .registerutil import *
 from .atconstants import *
 from .timeutil import TimeUtil
-from .syncdecorator import synchronized
\ No newline at end of file
+from .syncdecorator import synchronized
+from .lrucache import LRUCache
+from .keyedlocks import AsyncKeyedLocks, KeyedLocks
+from .localreplica import LocalReplica
+from .timerwheel import TimerWheel
+from .jsonstream import JsonArrayParser
\ No newline at end of file
@@ -44,6 +44,22 @@ class AuthUtil:
         if not str(pkam_response).startswith("data:success"):
             raise AtUnauthenticatedException(f"PKAM command failed: {pkam_response}")
 
+    @staticmethod
+    async def authenticate_with_pkam_async(connection, atsign, keys):
+        command = FromVerbBuilder().set_shared_by(atsign).build()
+        from_response = (await connection.execute_command(command)).get_raw_data_response()
+
+        try:
+            signature = EncryptionUtil.sign_sha256_rsa(from_response, keys[KeysUtil.pkam_private_key_name])
+        except:
+            raise Exception("Failed to create SHA256 signature")
+
+        command = PKAMVerbBuilder().set_digest(signature).build()
+        pkam_response = await connection.execute_command(command)
+
+        if not str(pkam_response).startswith("data:success"):
+            raise AtUnauthenticatedException(f"PKAM command failed: {pkam_response}")
+
     @staticmethod
     def _get_cram_digest(cram_secret, challenge):
         digest_input = cram_secret + challenge
@@ -1,5 +1,6 @@
 import base64
 import os
+from functools import lru_cache
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives import padding, serialization
 from cryptography.hazmat.backends import default_backend
@@ -80,10 +81,31 @@ class EncryptionUtil:
 
     @staticmethod
     def private_key_from_base64(s):
-        key_bytes = base64.b64decode(s.encode('utf-8'))
-        return load_der_private_key(key_bytes, password=None)
+        if isinstance(s, rsa.RSAPrivateKey):
+            return s
+        return EncryptionUtil._load_private_key(s)
     
     @staticmethod
     def public_key_from_base64(s):
+        if isinstance(s, rsa.RSAPublicKey):
+            return s
+        return EncryptionUtil._load_public_key(s)
+
+    # Parsing (and for private keys, validating) a DER key costs far more than the RSA operation it is used for,
+    # and the same few keys are used over and over, so parsed keys are cached by their base64 string
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _load_private_key(s):
+        key_bytes = base64.b64decode(s.encode('utf-8'))
+        return load_der_private_key(key_bytes, password=None)
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _load_public_key(s):
         key_bytes = base64.b64decode(s.encode('utf-8'))
         return load_der_public_key(key_bytes)
+
+    @staticmethod
+    def clear_key_cache():
+        EncryptionUtil._load_private_key.cache_clear()
+        EncryptionUtil._load_public_key.cache_clear()
@@ -0,0 +1,102 @@
+import codecs
+import json
+import re
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class JsonArrayParser:
+    """
+    Incremental parser for a JSON array received in pieces, such as a scan response read from the socket as it
+    arrives: each element is returned as soon as it has been received in full, so the array never needs to be held in
+    memory as a whole.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._text = ""
+        # What is expected next: "[", a value or "]", a value, "," or "]", or nothing once the array has ended
+        self._expect = "["
+        self.count = 0
+
+    @property
+    def finished(self) -> bool:
+        """
+        Whether the closing "]" of the array has been received.
+        """
+        return self._expect is None
+
+    def feed(self, data:bytes) -> list:
+        """
+        Parse the next piece of the array.
+
+        Parameters
+        ----------
+        data : bytes
+            The bytes received, which need not end on an element or even a character boundary.
+
+        Returns
+        -------
+        list
+            The elements completed by data, in order.
+        """
+        text = self._text + self._decoder.decode(data)
+        position = 0
+        items = []
+        # Once the fast path below has failed, the elements left in text are parsed one by one, as it would most likely
+        # fail again after each of them, parsing the rest of text every time
+        fast = True
+        while True:
+            position = _WHITESPACE.match(text, position).end()
+            if position == len(text):
+                break
+            if self._expect is None:
+                raise ValueError(f"Unexpected data after the end of the JSON array: {text[position:position + 32]!r}")
+            character = text[position]
+            if self._expect == "[":
+                if character != "[":
+                    raise ValueError(f"Expected a JSON array, got {text[position:position + 32]!r}")
+                self._expect = "value or ]"
+                position += 1
+            elif character == "]" and self._expect in ("value or ]", ", or ]"):
+                self._expect = None
+                position += 1
+            elif self._expect == ", or ]":
+                if character != ",":
+                    raise ValueError(f"Expected ',' or ']' in JSON array, got {text[position:position + 32]!r}")
+                self._expect = "value"
+                position += 1
+            else:
+                # Fast path: everything up to the last comma is a run of whole elements, unless that comma is inside a
+                # string or a nested array or object, in which case the run is not valid JSON on its own
+                cut = text.rfind(",", position) if fast else -1
+                if cut > position:
+                    try:
+                        items.extend(json.loads("[" + text[position:cut] + "]"))
+                        self._expect = "value"
+                        position = cut + 1
+                        continue
+                    except json.JSONDecodeError:
+                        fast = False
+                try:
+                    item, end = self._json.raw_decode(text, position)
+                except json.JSONDecodeError:
+                    # Most likely the element has not been received in full yet; if not, close() reports it
+                    break
+                if not isinstance(item, (str, list, dict)) and (end == len(text) or text[end] not in " \t\n\r,]"):
+                    # A number may continue in the next piece, e.g. "3" followed by ".5"
+                    break
+                items.append(item)
+                self._expect = ", or ]"
+                position = end
+        self._text = text[position:]
+        self.count += len(items)
+        return items
+
+    def close(self):
+        """
+        Check that the whole array has been received.
+        """
+        if not self.finished or self._text.strip():
+            raise ValueError(f"Incomplete JSON array after {self.count} elements: {self._text[:32]!r}")
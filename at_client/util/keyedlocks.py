@@ -0,0 +1,69 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager, contextmanager
+
+
+class KeyedLocks:
+    """
+    A lock per key, e.g. per atSign, which only exists while a thread holds or waits for it, so that however many keys
+    are used there are never more locks than threads using them. Unlike a bounded cache of locks, a lock can't be
+    evicted while it is held, which would let a second thread in.
+    """
+
+    def __init__(self):
+        # For each key in use, [lock, number of threads holding or waiting for it]
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._locks)
+
+    @contextmanager
+    def lock(self, key):
+        """
+        Hold the lock of key for the duration of the with statement.
+        """
+        with self._lock:
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = self._locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+
+class AsyncKeyedLocks:
+    """
+    The asyncio counterpart of KeyedLocks: an asyncio.Lock per key, which only exists while a task holds or waits for
+    it. Its locks must all be used from the same event loop.
+    """
+
+    def __init__(self):
+        # For each key in use, [lock, number of tasks holding or waiting for it]
+        self._locks = {}
+
+    def __len__(self):
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def lock(self, key):
+        """
+        Hold the lock of key for the duration of the async with statement.
+        """
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
@@ -1,3 +1,12 @@
+import re
+
+from ..exception import AtException
+
+
+# The usual shapes of key string, which parse() handles with a single match: [cached:](public:|private:|privatekey:|@with:)name@by
+_KEY_PATTERN = re.compile(r"(cached:)?(?:(public|private|privatekey):|@([^:@]*):)?([^:@]*)@([^:@]*)")
+
+
 class KeyType:
     PUBLIC_KEY = "PUBLIC_KEY"
     SHARED_KEY = "SHARED_KEY"
@@ -88,3 +97,74 @@ class KeyStringUtil:
             self._shared_with = "@" + self._shared_with
         if not self._is_hidden:
             self._is_hidden = self._key_name.startswith("_")
+
+    @staticmethod
+    def parse(full_key_name:str) -> tuple:
+        """
+        Parse a key string in a single pass over it, with the same results as evaluating it with a KeyStringUtil.
+
+        Parameters
+        ----------
+        full_key_name : str
+            The key string, e.g. "@bob:location.app@alice".
+
+        Returns
+        -------
+        tuple
+            (key type, key name, shared by, shared with, is cached, is hidden), where shared by and shared with
+            include the "@" and shared with is None if the key is not shared with anyone.
+        """
+        match = _KEY_PATTERN.fullmatch(full_key_name)
+        if match is not None:
+            cached, prefix, shared_with, key_name, shared_by = match.groups()
+            if shared_with is not None:
+                key_type = KeyType.SELF_KEY if shared_with == shared_by else KeyType.SHARED_KEY
+                return key_type, key_name, "@" + shared_by, "@" + shared_with, cached is not None, key_name.startswith("_")
+            if prefix == "public":
+                return KeyType.PUBLIC_KEY, key_name, "@" + shared_by, None, cached is not None, key_name.startswith("_")
+            if cached is None:
+                if prefix is not None:
+                    return KeyType.PRIVATE_HIDDEN_KEY, key_name, "@" + shared_by, None, False, True
+                key_type = KeyType.PRIVATE_HIDDEN_KEY if key_name.startswith("_") else KeyType.SELF_KEY
+                return key_type, key_name, "@" + shared_by, None, False, key_name.startswith("_")
+        return KeyStringUtil._parse(full_key_name)
+
+    @staticmethod
+    def _parse(full_key_name:str) -> tuple:
+        key_type = None
+        shared_with = None
+        is_cached = False
+        is_hidden = False
+        first_colon = full_key_name.find(":")
+        if first_colon >= 0:
+            first = full_key_name[:first_colon]
+            second_colon = full_key_name.find(":", first_colon + 1)
+            second = full_key_name[first_colon + 1:second_colon] if second_colon >= 0 else full_key_name[first_colon + 1:]
+            if first == "public" or (first == "cached" and second == "public"):
+                key_type = KeyType.PUBLIC_KEY
+            elif first == "private" or first == "privatekey":
+                key_type = KeyType.PRIVATE_HIDDEN_KEY
+                is_hidden = True
+            if first.startswith("@"):
+                shared_with = first[1:]
+            elif second.startswith("@"):
+                shared_with = second[1:]
+            if shared_with is not None and key_type is None:
+                key_type = KeyType.SHARED_KEY
+            is_cached = first == "cached"
+            last = full_key_name[full_key_name.rfind(":") + 1:] if second_colon >= 0 else full_key_name[first_colon + 1:]
+        else:
+            key_type = KeyType.PRIVATE_HIDDEN_KEY if full_key_name.startswith("_") else KeyType.SELF_KEY
+            last = full_key_name
+
+        at = last.find("@")
+        if at < 0:
+            raise AtException(f"Key {full_key_name} has no shared by atSign")
+        key_name = last[:at]
+        end = last.find("@", at + 1)
+        shared_by = last[at + 1:end] if end >= 0 else last[at + 1:]
+        if first_colon >= 0 and shared_by == shared_with:
+            key_type = KeyType.SELF_KEY
+
+        return (key_type, key_name, "@" + shared_by, "@" + shared_with if shared_with is not None else None, is_cached,
+                is_hidden or key_name.startswith("_"))
@@ -0,0 +1,190 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+
+from ..common.metadata import Metadata
+
+
+class LocalReplica:
+    """
+    Local copy of an atSign's keystore in an SQLite database, holding each key's name, metadata and value as the
+    server stores it (encrypted values stay encrypted), and the id of the last commit log entry applied to it.
+
+    The replica is brought up to date by applying the entries returned by the server's sync verb, so each sync only
+    transfers the changes made since the previous one.
+    """
+
+    def __init__(self, path:str, atsign:str):
+        """
+        Initialize the LocalReplica object, creating the database if it does not exist.
+
+        Parameters
+        ----------
+        path : str
+            The SQLite database file, or ":memory:".
+        atsign : str
+            The atSign whose keystore is replicated. A database holding another atSign's keystore is cleared.
+        """
+        self.path = path
+        self.atsign = atsign
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS keys (name TEXT PRIMARY KEY, value TEXT, metadata TEXT, "
+                             "expires_at REAL, commit_id INTEGER, deleted INTEGER NOT NULL DEFAULT 0)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS state (name TEXT PRIMARY KEY, value TEXT)")
+        if self._get_state("atsign") != atsign:
+            self.clear()
+            self._set_state("atsign", atsign)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _get_state(self, name):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM state WHERE name = ?", (name,)).fetchone()
+        return row[0] if row is not None else None
+
+    def _set_state(self, name, value):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO state (name, value) VALUES (?, ?)", (name, value))
+
+    @property
+    def last_commit_id(self) -> int:
+        """
+        The id of the last commit log entry applied, or -1 if the replica has never been synced.
+        """
+        value = self._get_state("lastCommitId")
+        return int(value) if value is not None else -1
+
+    def clear(self):
+        """
+        Remove every key and forget the last commit id, so that the next sync starts from the beginning.
+        """
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.execute("DELETE FROM keys")
+            self._db.execute("DELETE FROM state WHERE name = 'lastCommitId'")
+            self._db.execute("COMMIT")
+
+    @staticmethod
+    def _normalize_metadata(metadata:dict) -> dict:
+        # The commit log may carry metadata values as strings, where lookups return numbers and booleans
+        normalized = {}
+        for name, value in (metadata or {}).items():
+            if isinstance(value, str):
+                if name in ("ttl", "ttb", "ttr", "version"):
+                    try:
+                        value = int(value)
+                    except ValueError:
+                        pass
+                elif value in ("true", "false"):
+                    value = value == "true"
+            normalized[name] = value
+        return normalized
+
+    @staticmethod
+    def _expiry(metadata:dict) -> float:
+        try:
+            expires_at = Metadata.parse_datetime(metadata.get("expiresAt"))
+            return expires_at.timestamp() if expires_at is not None else None
+        except (ValueError, OverflowError, TypeError):
+            return None
+
+    def apply(self, entries:list):
+        """
+        Apply commit log entries, as returned by the sync verb, in one transaction.
+
+        Parameters
+        ----------
+        entries : list of dict
+            Entries with "atKey", "operation" ("-" for a delete, else an update), "commitId", and for updates "value"
+            and "metadata". The last commit id is advanced to the highest commitId applied.
+        """
+        if not entries:
+            return
+        last_commit_id = self.last_commit_id
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                for entry in entries:
+                    name = entry["atKey"].lower()
+                    commit_id = int(entry["commitId"])
+                    # Entries never overwrite a later change already recorded by mark_stale or remove
+                    if entry.get("operation") == "-":
+                        self._db.execute("DELETE FROM keys WHERE name = ? AND commit_id <= ?", (name, commit_id))
+                    else:
+                        metadata = self._normalize_metadata(entry.get("metadata"))
+                        self._db.execute("INSERT INTO keys (name, value, metadata, expires_at, commit_id) VALUES (?, ?, ?, ?, ?) "
+                                         "ON CONFLICT (name) DO UPDATE SET value = excluded.value, metadata = excluded.metadata, "
+                                         "expires_at = excluded.expires_at, commit_id = excluded.commit_id, deleted = 0 "
+                                         "WHERE commit_id <= excluded.commit_id",
+                                         (name, entry.get("value"), json.dumps(metadata), self._expiry(metadata), commit_id))
+                    last_commit_id = max(last_commit_id, commit_id)
+                self._db.execute("INSERT OR REPLACE INTO state (name, value) VALUES ('lastCommitId', ?)", (str(last_commit_id),))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def mark_stale(self, name:str, commit_id:int=None):
+        """
+        Record that name has been updated on the server by the commit with id commit_id, so that get() reports its
+        value as unknown until a sync applies that commit, while scan() already lists it.
+        """
+        self._record_change(name, commit_id, deleted=False)
+
+    def remove(self, name:str, commit_id:int=None):
+        """
+        Record that name has been deleted on the server by the commit with id commit_id, so that neither get() nor
+        scan() return it, even if a sync applies an earlier update to it first.
+        """
+        self._record_change(name, commit_id, deleted=True)
+
+    def _record_change(self, name:str, commit_id:int, deleted:bool):
+        with self._lock:
+            if commit_id is None:
+                # Without a commit id there is no telling which change is later, so trust this one until the next
+                # sync of the key
+                self._db.execute("DELETE FROM keys WHERE name = ?", (name.lower(),))
+                commit_id = -1
+            self._db.execute("INSERT INTO keys (name, value, metadata, expires_at, commit_id, deleted) VALUES (?, NULL, NULL, NULL, ?, ?) "
+                             "ON CONFLICT (name) DO UPDATE SET value = NULL, metadata = NULL, expires_at = NULL, "
+                             "commit_id = excluded.commit_id, deleted = excluded.deleted WHERE commit_id < excluded.commit_id",
+                             (name.lower(), commit_id, int(deleted)))
+
+    def get(self, name:str):
+        """
+        Return the value and metadata of name as the server stores them.
+
+        Returns
+        -------
+        tuple or None
+            (value, metadata dict) if name is in the replica and has not expired, (None, None) if its current value
+            is not known yet (see mark_stale), or None if it is not in the replica, has been deleted or has expired.
+        """
+        with self._lock:
+            row = self._db.execute("SELECT value, metadata, expires_at, deleted FROM keys WHERE name = ?", (name.lower(),)).fetchone()
+        if row is None or row[3] or (row[2] is not None and row[2] <= time.time()):
+            return None
+        if row[1] is None:
+            return None, None
+        return row[0], json.loads(row[1])
+
+    def scan(self, regex:str=None) -> list:
+        """
+        Return the names of the keys which have not expired and match regex (default is all of them), like scan.
+        """
+        pattern = re.compile(regex) if regex else None
+        with self._lock:
+            rows = self._db.execute("SELECT name FROM keys WHERE deleted = 0 AND (expires_at IS NULL OR expires_at > ?) ORDER BY name",
+                                    (time.time(),)).fetchall()
+        return [row[0] for row in rows if pattern is None or pattern.search(row[0])]
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM keys WHERE deleted = 0").fetchone()[0]
@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe least recently used cache with a bounded number of entries, an optional bound on their total size,
+    optional expiry, and hit, miss, eviction and expiration counters.
+    """
+
+    def __init__(self, max_size:int=1024, ttl:float=None, max_bytes:int=None, sizeof=None):
+        """
+        Initialize the LRUCache object.
+
+        Parameters
+        ----------
+        max_size : int, optional
+            The maximum number of entries; the least recently used entry is evicted to make room (default is 1024).
+        ttl : float, optional
+            The number of seconds after which entries expire, unless put with a ttl of their own (default is never).
+        max_bytes : int, optional
+            The maximum total size of the entries, as measured by sizeof (default is no limit).
+        sizeof : callable, optional
+            Returns the size of a value in bytes; required with max_bytes.
+        """
+        if max_bytes is not None and sizeof is None:
+            raise ValueError("sizeof is required with max_bytes")
+        if max_size < 1:
+            raise ValueError(f"Invalid cache size: {max_size}")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        entry = self._entries.get(key)
+        return entry is not None and (entry[1] is None or entry[1] > time.monotonic())
+
+    def get(self, key, default=None):
+        """
+        Return the value cached for key, or default if there is none or it has expired.
+        """
+        with self._lock:
+            try:
+                value, expires_at, _ = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, ttl:float=None):
+        """
+        Cache value for key, replacing any value already cached for it. The entry expires after ttl seconds, or the
+        cache's own ttl if none is given.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        size = self._sizeof(value) if self._sizeof is not None else 0
+        with self._lock:
+            self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._entries[key] = (value, expires_at, size)
+            self.bytes += size
+            while len(self._entries) > self.max_size or (self.max_bytes is not None and self.bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+
+    def invalidate(self, key):
+        """
+        Remove the value cached for key, if any.
+        """
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        """
+        Remove all cached values. The counters are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        """
+        Return the counters and the current size.
+        """
+        return {"size": len(self._entries), "max_size": self.max_size, "bytes": self.bytes, "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "expirations": self.expirations}
@@ -2,27 +2,180 @@ from ssl import SSLSocket
 
 LF = b"\x0a"
 CRLF = b"\x0d\x0a"
+PROMPT = b"@"
+
+# Longest prompt we expect to see ("@" + atSign + "@"); anything longer is treated as data
+MAX_PROMPT_LENGTH = 256
 
 
 class SocketUtil:
+    """
+    Buffered reader over an SSLSocket.
+
+    Data is pulled from the socket in large ``recv_into`` reads into a reusable receive buffer and accumulated in a
+    bytearray. Lines are located by scanning only the bytes that have not been scanned yet, so reading a line costs
+    one scan and one copy regardless of how many reads it took to receive it.
+    """
 
-    def __init__(self, sock: SSLSocket):
+    def __init__(self, sock: SSLSocket, buffer_size: int = 65536):
         self._socket = sock
+        self._buffer = bytearray()
+        self._start = 0
+        self._scanned = 0
+        self._recv_buffer = bytearray(buffer_size)
+        self._recv_view = memoryview(self._recv_buffer)
+        self.recv_calls = 0
+        self.bytes_received = 0
+
+    def _fill(self) -> int:
+        """
+        Receive one chunk from the socket and append it to the buffer.
+
+        :return: number of bytes received, 0 if the connection was closed
+        """
+        n = self._socket.recv_into(self._recv_view)
+        self.recv_calls += 1
+        if n:
+            self.bytes_received += n
+            if self._start and self._start >= len(self._buffer) // 2:
+                # Compact the consumed prefix away before it grows; amortised this moves each byte at most once
+                del self._buffer[:self._start]
+                self._scanned -= self._start
+                self._start = 0
+            self._buffer += self._recv_view[:n]
+        return n
+
+    def _take(self, end: int) -> bytes:
+        data = bytes(self._buffer[self._start:end])
+        self._start = end
+        if self._scanned < end:
+            self._scanned = end
+        if self._start == len(self._buffer):
+            self._buffer.clear()
+            self._start = self._scanned = 0
+        return data
+
+    def _find_line_end(self) -> int:
+        index = self._buffer.find(LF, self._scanned)
+        if index == -1:
+            self._scanned = len(self._buffer)
+            return -1
+        return index + 1
+
+    def _prompt_end(self, position: int, bare_prompt_at_end: bool = False) -> int:
+        """
+        Return the end of a complete prompt (either "@" or "@<atsign>@") starting at position, or position if there
+        is no complete prompt buffered there. A lone "@" at the end of the buffer could be the start of an atSign
+        prompt, so it only counts as complete when bare_prompt_at_end is set.
+        """
+        buffer = self._buffer
+        end = len(buffer)
+        if position >= end or buffer[position] != PROMPT[0]:
+            return position
+        if position + 1 == end:
+            return end if bare_prompt_at_end else position
+        closing = buffer.find(PROMPT, position + 1, min(end, position + MAX_PROMPT_LENGTH))
+        if closing > position + 1:
+            segment = buffer[position + 1:closing]
+            if b":" not in segment and LF not in segment and b" " not in segment:
+                return closing + 1
+        if closing != -1 or LF in buffer[position + 1:min(end, position + MAX_PROMPT_LENGTH)]:
+            # Not an atSign prompt, so this is the bare unauthenticated "@" prompt followed by the next response
+            return position + 1
+        return position
 
     def readline(self) -> bytes:
         """
         Read a line from the SSLSocket until a newline character is encountered.
 
-        :param socket: SSLSocket object
-        :return: bytes read until newline character
+        :return: bytes read until newline character (inclusive), or whatever was left if the connection was closed
+        """
+        while True:
+            end = self._find_line_end()
+            if end != -1:
+                return self._take(end)
+            if self._fill() == 0:
+                return self._take(len(self._buffer))  # No more data to read, connection closed
+
+    def read_response(self) -> bytes:
+        """
+        Read one response line from an atServer.
+
+        Prompts ("@" or "@<atsign>@") sent by the server between responses are skipped, including one that is already
+        buffered directly after the line, so that they never prefix the next response.
+
+        :return: the response bytes up to and including the newline, without any prompt
+        """
+        while True:
+            prompt_end = self._prompt_end(self._start)
+            if prompt_end != self._start:
+                self._take(prompt_end)
+                continue
+            end = self._find_line_end()
+            if end != -1:
+                line = self._take(end)
+                prompt_end = self._prompt_end(self._start)
+                if prompt_end != self._start:
+                    self._take(prompt_end)
+                return line
+            if self._fill() == 0:
+                return self._take(len(self._buffer))  # Connection closed
+
+    def iter_response(self):
         """
+        Read one response line from an atServer like read_response, but yield it in pieces as they are received, so
+        that a large response never needs to be held in memory as a whole.
 
-        line = b""
+        :return: generator of the bytes of the response, up to and including the newline, without any prompt
+        """
         while True:
-            data = self._socket.recv(1)
-            if data == b"":
-                break  # No more data to read, connection closed
-            line += data
-            if data == LF:
-                break  # Newline character encountered, stop reading
-        return line
+            prompt_end = self._prompt_end(self._start)
+            if prompt_end != self._start:
+                self._take(prompt_end)
+                continue
+            if self._start < len(self._buffer) and self._buffer[self._start] != PROMPT[0]:
+                break
+            # Nothing buffered, or what could be the start of a prompt which has not been received in full yet
+            end = self._find_line_end()
+            if end != -1:
+                yield self._take(end)
+                return
+            if self._fill() == 0:
+                if self._start < len(self._buffer):
+                    yield self._take(len(self._buffer))
+                return
+        while True:
+            end = self._find_line_end()
+            if end != -1:
+                yield self._take(end)
+                prompt_end = self._prompt_end(self._start)
+                if prompt_end != self._start:
+                    self._take(prompt_end)
+                return
+            if self._start < len(self._buffer):
+                yield self._take(len(self._buffer))
+            if self._fill() == 0:
+                return  # Connection closed
+
+    def read_prompt(self) -> bytes:
+        """
+        Read the prompt sent by an atServer when a connection is opened, or the first line if no prompt arrives first.
+
+        :return: the prompt (or line) bytes
+        """
+        while True:
+            prompt_end = self._prompt_end(self._start, bare_prompt_at_end=True)
+            if prompt_end != self._start:
+                return self._take(prompt_end)
+            end = self._find_line_end()
+            if end != -1:
+                return self._take(end)
+            if self._fill() == 0:
+                return self._take(len(self._buffer))
+
+    def clear(self):
+        """
+        Discard any buffered data, e.g. after the underlying socket has been reconnected.
+        """
+        self._buffer.clear()
+        self._start = self._scanned = 0
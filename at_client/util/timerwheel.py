@@ -0,0 +1,116 @@
+import math
+import time
+
+
+class Timer:
+    """
+    A callback scheduled on a TimerWheel.
+    """
+
+    __slots__ = ("callback", "slot", "rounds", "cancelled")
+
+    def __init__(self, callback, slot:int, rounds:int):
+        self.callback = callback
+        self.slot = slot
+        self.rounds = rounds
+        self.cancelled = False
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel: timers are kept in a ring of slots, one per tick, so scheduling, cancelling and expiring a
+    timer cost O(1) however many timers are pending. Timers fire on the first tick at or after their deadline.
+
+    The wheel is not thread-safe; it is meant to be driven by the event loop which owns it, which calls timeout() to
+    know how long it may wait and advance() to run the timers which are due.
+    """
+
+    def __init__(self, tick:float=0.5, slots:int=512):
+        """
+        Initialize the TimerWheel object.
+
+        Parameters
+        ----------
+        tick : float, optional
+            The resolution of the wheel in seconds (default is 0.5).
+        slots : int, optional
+            The number of slots in the ring; timers further away than slots ticks go round more than once (default is 512).
+        """
+        self.tick = tick
+        self._slots = [set() for _ in range(slots)]
+        self._position = 0
+        self._next_tick = time.monotonic() + tick
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def schedule(self, delay:float, callback) -> Timer:
+        """
+        Call callback() after delay seconds, rounded up to a whole number of ticks.
+
+        Returns
+        -------
+        Timer
+            The timer, which can be passed to cancel().
+        """
+        if self._count == 0:
+            # The wheel may not have been advanced while it was idle, so start counting ticks from now; otherwise the
+            # ticks missed meanwhile would be counted towards the delay and the timer would fire early
+            self._next_tick = time.monotonic() + self.tick
+        ticks = max(1, math.ceil(delay / self.tick))
+        slot = (self._position + ticks) % len(self._slots)
+        timer = Timer(callback, slot, (ticks - 1) // len(self._slots))
+        self._slots[slot].add(timer)
+        self._count += 1
+        return timer
+
+    def cancel(self, timer:Timer):
+        """
+        Cancel timer if it has not fired yet.
+        """
+        if not timer.cancelled and timer in self._slots[timer.slot]:
+            self._slots[timer.slot].discard(timer)
+            self._count -= 1
+        timer.cancelled = True
+
+    def timeout(self) -> float:
+        """
+        Return the number of seconds until the next tick, or None if no timers are pending.
+        """
+        if self._count == 0:
+            return None
+        return max(0.0, self._next_tick - time.monotonic())
+
+    def advance(self) -> int:
+        """
+        Move the wheel forward to the current time, calling the callbacks of the timers which are due.
+
+        Returns
+        -------
+        int
+            The number of timers fired.
+        """
+        now = time.monotonic()
+        if self._count == 0:
+            # Nothing can be due, so just catch up without visiting the slots
+            if self._next_tick <= now:
+                self._next_tick = now + self.tick
+            return 0
+        due = []
+        while self._next_tick <= now:
+            self._position = (self._position + 1) % len(self._slots)
+            self._next_tick += self.tick
+            slot = self._slots[self._position]
+            for timer in list(slot):
+                if timer.rounds > 0:
+                    timer.rounds -= 1
+                else:
+                    slot.discard(timer)
+                    self._count -= 1
+                    due.append(timer)
+        for timer in due:
+            if not timer.cancelled:
+                timer.cancelled = True
+                timer.callback()
+        return len(due)
@@ -460,3 +460,38 @@ class DeleteVerbBuilder:
         s += self.key
         s += AtSign.format_atsign(self.shared_by)
         return s 
+
+class SyncVerbBuilder(VerbBuilder):
+    def __init__(self):
+        self.from_commit_id = -1
+        self.limit = None
+
+    def set_from_commit_id(self, from_commit_id):
+        self.from_commit_id = from_commit_id
+        return self
+
+    def set_limit(self, limit):
+        self.limit = limit
+        return self
+
+    def build(self):
+        command = f"sync:from:{self.from_commit_id}"
+        if self.limit is not None:
+            command += f":limit:{self.limit}"
+        return command
+
+class StatsVerbBuilder(VerbBuilder):
+    LAST_COMMIT_ID = 3
+
+    def __init__(self):
+        self.stat_ids = []
+
+    def add_stat_id(self, stat_id):
+        self.stat_ids.append(stat_id)
+        return self
+
+    def build(self):
+        command = "stats"
+        if self.stat_ids:
+            command += ":" + ",".join(str(stat_id) for stat_id in self.stat_ids)
+        return command
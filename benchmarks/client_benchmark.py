@@ -0,0 +1,249 @@
+"""
+Drive AtClient through realistic workloads against a local StubSecondary, over TLS, and report the throughput and the
+p50 and p99 latency of each: bulk put and get, one key at a time and pipelined with put_many and get_many, gets
+answered by a synced local replica, scan with metadata, shared key fan-out and notification bursts.
+
+The results can be saved as JSON, and compared with those of an earlier run to spot regressions:
+    python -m benchmarks.client_benchmark --output before.json
+    python -m benchmarks.client_benchmark --compare before.json
+
+Run from the repository root with:
+    python -m benchmarks.client_benchmark
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import queue
+import shutil
+import tempfile
+import threading
+import time
+
+from at_client import AtClient
+from at_client.common import AtSign
+from at_client.common.keys import SelfKey, SharedKey
+from at_client.connections import MonitorEngine
+from at_client.util import KeysUtil, OnboardingUtil
+from test.stubsecondary import StubSecondary
+
+# Operations per workload at --scale 1
+PUTS = 1000
+# Keys per put_many and get_many call
+BATCH = 100
+SCANS = 20
+RECIPIENTS = 20
+NOTIFICATIONS = 500
+VALUE = "benchmark value " * 8
+
+
+def percentile(samples:list, fraction:float) -> float:
+    """The nearest-rank percentile of samples."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def summarize(items:int, seconds:float, latencies:list) -> dict:
+    return {"items": items, "requests": len(latencies), "seconds": round(seconds, 4),
+            "throughput": round(items / seconds, 1), "p50_ms": round(percentile(latencies, 0.50) * 1e3, 3),
+            "p99_ms": round(percentile(latencies, 0.99) * 1e3, 3)}
+
+
+def timed(operation, arguments) -> tuple:
+    """Call operation with each argument in turn, returning the total time and the latency of each call."""
+    latencies = []
+    started = time.perf_counter()
+    for argument in arguments:
+        called = time.perf_counter()
+        operation(argument)
+        latencies.append(time.perf_counter() - called)
+    return time.perf_counter() - started, latencies
+
+
+def bulk_put(alice:AtClient, count:int) -> dict:
+    keys = [SelfKey(f"bulk{index}.benchmark", alice.atsign) for index in range(count)]
+    seconds, latencies = timed(lambda key: alice.put(key, VALUE), keys)
+    return summarize(count, seconds, latencies)
+
+
+def bulk_get(alice:AtClient, count:int) -> dict:
+    keys = [SelfKey(f"bulk{index}.benchmark", alice.atsign) for index in range(count)]
+    seconds, latencies = timed(alice.get, keys)
+    return summarize(count, seconds, latencies)
+
+
+def bulk_put_many(alice:AtClient, count:int) -> dict:
+    keys = [SelfKey(f"many{index}.benchmark", alice.atsign) for index in range(count)]
+    batches = [keys[start:start + BATCH] for start in range(0, count, BATCH)]
+    seconds, latencies = timed(lambda batch: alice.put_many([(key, VALUE) for key in batch]), batches)
+    return summarize(count, seconds, latencies)
+
+
+def bulk_get_many(alice:AtClient, count:int) -> dict:
+    keys = [SelfKey(f"many{index}.benchmark", alice.atsign) for index in range(count)]
+    batches = [keys[start:start + BATCH] for start in range(0, count, BATCH)]
+    seconds, latencies = timed(alice.get_many, batches)
+    return summarize(count, seconds, latencies)
+
+
+def replica_get(stub:StubSecondary, directory:str, count:int) -> dict:
+    # A second client of the same atSign, whose gets are answered by a local replica synced from the stub on creation
+    replica_client = AtClient(AtSign("@alice"), secondary_address=stub.address, context=stub.client_context(),
+                              replica_path=os.path.join(directory, "replica.db"))
+    try:
+        keys = [SelfKey(f"bulk{index}.benchmark", replica_client.atsign) for index in range(count)]
+        seconds, latencies = timed(replica_client.get, keys)
+    finally:
+        replica_client.replica.close()
+    return summarize(count, seconds, latencies)
+
+
+def scan_with_metadata(alice:AtClient, count:int) -> dict:
+    found = []
+    seconds, latencies = timed(lambda _: found.append(len(alice.get_at_keys(r"\.benchmark@", fetch_metadata=True))),
+                               range(count))
+    return summarize(sum(found), seconds, latencies)
+
+
+def shared_key_fanout(alice:AtClient, stub:StubSecondary, count:int) -> dict:
+    # Each recipient needs a public key of its own, as their parsed keys are cached
+    recipients = []
+    for index in range(count):
+        keys = {}
+        OnboardingUtil.generate_encryption_keypair(keys)
+        recipient = AtSign(f"@recipient{index:03d}")
+        stub.publish_public_key(recipient.to_string(), keys[KeysUtil.encryption_public_key_name])
+        recipients.append(recipient)
+    # Each put looks up the recipient's public key and creates, encrypts and saves a shared key before the value
+    seconds, latencies = timed(lambda recipient: alice.put(SharedKey("message.benchmark", alice.atsign, recipient), VALUE),
+                               recipients)
+    return summarize(count, seconds, latencies)
+
+
+def notification_burst(alice:AtClient, bob:AtClient, stub:StubSecondary, count:int) -> dict:
+    engine = MonitorEngine(context=stub.client_context())
+    engine.start()
+    sent = {}
+    received = {}
+    done = threading.Event()
+
+    def receive():
+        while len(received) < count:
+            try:
+                at_event = bob.queue.get(timeout=30)
+            except queue.Empty:
+                break
+            key = at_event.event_data.get("key") if isinstance(at_event.event_data, dict) else None
+            if key in sent and key not in received:
+                received[key] = time.perf_counter()
+            elif key == "@bob:ready.benchmark@alice":
+                done.set()
+        done.set()
+
+    try:
+        bob.start_monitor(engine=engine)
+        receiver = threading.Thread(target=receive, daemon=True)
+        receiver.start()
+        # Wait until notifications are being received, creating the shared key with bob on the way
+        while not done.is_set():
+            alice.put(SharedKey("ready.benchmark", alice.atsign, bob.atsign), VALUE)
+            done.wait(0.1)
+        done.clear()
+        for index in range(count):
+            key = SharedKey(f"burst{index}.benchmark", alice.atsign, bob.atsign)
+            sent[str(key)] = time.perf_counter()
+            alice.put(key, VALUE)
+        receiver.join(60)
+    finally:
+        bob.stop_monitor()
+        engine.stop(5)
+    if not received:
+        raise RuntimeError("No notifications were received")
+    latencies = [received[key] - sent[key] for key in received]
+    return summarize(len(received), max(received.values()) - min(sent.values()), latencies)
+
+
+def run(scale:float=1.0, latency:float=0.0) -> dict:
+    """
+    Run every workload against a new StubSecondary.
+
+    Parameters
+    ----------
+    scale : float, optional
+        The number of operations of each workload, relative to the default (default is 1).
+    latency : float, optional
+        The number of seconds the stub waits before answering each command (default is 0).
+
+    Returns
+    -------
+    dict
+        The results, as saved by --output.
+    """
+    def scaled(count):
+        return max(1, int(count * scale))
+
+    stub = StubSecondary(latency)
+    keys_directory = tempfile.mkdtemp(prefix="client_benchmark.")
+    location = KeysUtil.expected_keys_files_location
+    KeysUtil.expected_keys_files_location = os.path.join(keys_directory, "")
+    try:
+        stub.onboard("@alice")
+        stub.onboard("@bob")
+        alice = AtClient(AtSign("@alice"), secondary_address=stub.address, context=stub.client_context())
+        bob = AtClient(AtSign("@bob"), secondary_address=stub.address, context=stub.client_context(),
+                       queue=queue.Queue())
+        workloads = {
+            "bulk_put": lambda: bulk_put(alice, scaled(PUTS)),
+            "bulk_get": lambda: bulk_get(alice, scaled(PUTS)),
+            "bulk_put_many": lambda: bulk_put_many(alice, scaled(PUTS)),
+            "bulk_get_many": lambda: bulk_get_many(alice, scaled(PUTS)),
+            "replica_get": lambda: replica_get(stub, keys_directory, scaled(PUTS)),
+            "scan_with_metadata": lambda: scan_with_metadata(alice, scaled(SCANS)),
+            "shared_key_fanout": lambda: shared_key_fanout(alice, stub, scaled(RECIPIENTS)),
+            "notification_burst": lambda: notification_burst(alice, bob, stub, scaled(NOTIFICATIONS)),
+        }
+        results = {name: workload() for name, workload in workloads.items()}
+    finally:
+        KeysUtil.expected_keys_files_location = location
+        shutil.rmtree(keys_directory, ignore_errors=True)
+        stub.stop()
+    return {"timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(), "python": platform.python_version(),
+            "platform": platform.platform(), "scale": scale, "latency": latency, "workloads": results}
+
+
+def print_results(results:dict, baseline:dict=None):
+    if baseline and (baseline.get("scale"), baseline.get("latency")) != (results["scale"], results["latency"]):
+        print(f"Warning: the baseline was run with --scale {baseline.get('scale')} --latency {baseline.get('latency')}")
+    print(f"{'workload':<22}{'items':>8}{'items/s':>12}{'p50 ms':>10}{'p99 ms':>10}"
+          + (f"{'items/s vs base':>18}{'p99 vs base':>14}" if baseline else ""))
+    for name, result in results["workloads"].items():
+        line = f"{name:<22}{result['items']:>8}{result['throughput']:>12.1f}{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+        base = (baseline or {}).get("workloads", {}).get(name)
+        if base:
+            line += f"{result['throughput'] / base['throughput'] - 1:>+18.1%}{result['p99_ms'] / base['p99_ms'] - 1:>+14.1%}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AtClient against a local stand-in secondary")
+    parser.add_argument("--scale", type=float, default=1.0, help="operations per workload, relative to the default")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the stub waits before each response")
+    parser.add_argument("--output", help="save the results to this JSON file")
+    parser.add_argument("--compare", help="compare the results with those saved in this JSON file")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    results = run(args.scale, args.latency)
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
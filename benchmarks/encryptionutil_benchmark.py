@@ -0,0 +1,58 @@
+"""
+Measure the per-operation cost of the RSA operations in EncryptionUtil with and without the parsed key cache, and of
+the DER key parsing that the cache saves.
+
+Run from the repository root with:
+    python -m benchmarks.encryptionutil_benchmark
+"""
+import base64
+import time
+
+from cryptography.hazmat.primitives.serialization import load_der_private_key, load_der_public_key
+
+from at_client.util.encryptionutil import EncryptionUtil
+
+ITERATIONS = 50
+
+
+def uncached(operation):
+    """Run operation with an empty key cache every time, as every call used to parse its key."""
+    def run():
+        EncryptionUtil.clear_key_cache()
+        operation()
+    return run
+
+
+def measure(name, operation, iterations=ITERATIONS):
+    operation()  # warm up
+    started = time.perf_counter()
+    for _ in range(iterations):
+        operation()
+    elapsed = time.perf_counter() - started
+    print(f"{name:<48}{elapsed / iterations * 1e6:>14.1f}")
+
+
+def main():
+    private_key_bytes, public_key_bytes = EncryptionUtil.generate_rsa_key_pair()
+    private_key = base64.b64encode(private_key_bytes).decode("utf-8")
+    public_key = base64.b64encode(public_key_bytes).decode("utf-8")
+    aes_key = EncryptionUtil.generate_aes_key_base64()
+    encrypted_aes_key = EncryptionUtil.rsa_encrypt_to_base64(aes_key, public_key)
+    challenge = "_" + "a1b2c3d4" * 8
+
+    operations = [
+        ("sign_sha256_rsa (PKAM, put)", lambda: EncryptionUtil.sign_sha256_rsa(challenge, private_key)),
+        ("rsa_decrypt_from_base64 (shared key)", lambda: EncryptionUtil.rsa_decrypt_from_base64(encrypted_aes_key, private_key)),
+        ("rsa_encrypt_to_base64 (new shared key)", lambda: EncryptionUtil.rsa_encrypt_to_base64(aes_key, public_key)),
+    ]
+
+    print(f"{'operation':<48}{'us/op':>14}")
+    measure("parse private key (load_der_private_key)", lambda: load_der_private_key(private_key_bytes, password=None))
+    measure("parse public key (load_der_public_key)", lambda: load_der_public_key(public_key_bytes))
+    for name, operation in operations:
+        measure(name + " uncached", uncached(operation))
+        measure(name + " cached", operation)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Compare the cost of parsing scan results into AtKeys with the KeyStringUtil based parser Keys.from_string used to
+use, and with the single-pass parser, both the first time a scan's keys are seen and when the same keys are scanned
+again.
+
+Run from the repository root with:
+    python -m benchmarks.keys_benchmark
+"""
+import json
+import random
+import time
+
+from at_client.common.atsign import AtSign
+from at_client.common.keys import Keys, PrivateHiddenKey, PublicKey, SelfKey, SharedKey
+from at_client.util.keystringutil import KeyStringUtil, KeyType
+
+SCAN_SIZES = [1000, 50000]
+NAMESPACES = ["wavi", "buzz", "atmosphere", "sshnp", "mospherepro", "iot.sensors"]
+
+
+def scan_output(size, atsign="@alice", seed=1):
+    """A scan response's keys, in the proportions seen on busy atSigns: mostly keys shared with a few hundred
+    atSigns and cached keys shared by them, some self and public keys, and a handful of hidden and system keys."""
+    rng = random.Random(seed)
+    others = [f"@contact{index:03d}" for index in range(300)]
+    keys = [f"public:publickey{atsign}", f"public:signing_publickey{atsign}", f"{atsign}:signing_privatekey{atsign}",
+            f"_latestnotificationid.wavi{atsign}"]
+    while len(keys) < size:
+        namespace = rng.choice(NAMESPACES)
+        other = rng.choice(others)
+        name = f"{rng.choice(['location', 'profile', 'message', 'status', 'device'])}_{rng.randrange(10000)}.{namespace}"
+        kind = rng.random()
+        if kind < 0.45:
+            keys.append(f"{other}:{name}{atsign}")
+        elif kind < 0.75:
+            keys.append(f"cached:{atsign}:{name}{other}")
+        elif kind < 0.85:
+            keys.append(f"{name}{atsign}")
+        elif kind < 0.92:
+            keys.append(f"public:{name}{atsign}")
+        elif kind < 0.97:
+            keys.append(f"cached:public:{name}{other}")
+        else:
+            keys.append(f"{other}:shared_key{atsign}")
+    return json.loads(json.dumps(keys))  # fresh strings, as a parsed response would have
+
+
+def legacy_from_string(full_at_key_name):
+    """Keys.from_string as it used to be: a KeyStringUtil, and new AtSigns, for every key."""
+    key_string_util = KeyStringUtil(full_at_key_name)
+    key_type = key_string_util.get_key_type()
+    key_name = key_string_util.get_key_name()
+    shared_by = AtSign(key_string_util.get_shared_by())
+    shared_with = AtSign(key_string_util.get_shared_with()) if key_string_util.get_shared_with() else None
+    if key_type == KeyType.PUBLIC_KEY:
+        at_key = PublicKey(key_name, shared_by)
+    elif key_type == KeyType.SHARED_KEY:
+        at_key = SharedKey(key_name, shared_by, shared_with)
+    elif key_type == KeyType.SELF_KEY:
+        at_key = SelfKey(key_name, shared_by, shared_with)
+    else:
+        at_key = PrivateHiddenKey(key_name, shared_by)
+    at_key.set_namespace(key_string_util.get_namespace())
+    at_key.metadata.is_cached = key_string_util.is_cached()
+    if not at_key.metadata.is_hidden:
+        at_key.metadata.is_hidden = key_string_util.is_hidden()
+    return at_key
+
+
+def cold(from_string):
+    def parse(keys):
+        Keys._parsed.clear()
+        Keys._atsigns.clear()
+        return [from_string(key) for key in keys]
+    return parse
+
+
+def measure(name, size, parse, keys, repeats=3):
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        parse(keys)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{name:<34}{size:>8}{best / size * 1e6:>12.2f}{size / best:>14.0f}")
+
+
+def main():
+    print(f"{'parser':<34}{'keys':>8}{'us/key':>12}{'keys/s':>14}")
+    for size in SCAN_SIZES:
+        keys = scan_output(size)
+        measure("legacy Keys.from_string", size, lambda keys: [legacy_from_string(key) for key in keys], keys)
+        measure("KeyStringUtil.parse only", size, lambda keys: [KeyStringUtil.parse(key) for key in keys], keys)
+        measure("Keys.from_string, first scan", size, cold(Keys.from_string), keys)
+        Keys.from_string(keys[0])
+        measure("Keys.from_string, scanned again", size, lambda keys: [Keys.from_string(key) for key in keys], keys)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Measure the memory taken per key by scan results held as AtKeys, laid out as they used to be (a __dict__ per key and
+an eagerly created, __dict__ based Metadata) and as they are now (__slots__, and Metadata created when first used),
+and as an AtKeyList.
+
+Run from the repository root with:
+    python -m benchmarks.keys_memory_benchmark
+"""
+import gc
+import tracemalloc
+from dataclasses import field, fields, make_dataclass
+
+from at_client.common.keys import AtKeyList, Keys
+from at_client.common.metadata import Metadata
+from benchmarks.keys_benchmark import scan_output
+
+SCAN_SIZES = [10000, 100000]
+
+# Metadata as it used to be: the same fields in a plain dataclass, with a __dict__ per instance
+LegacyMetadata = make_dataclass("LegacyMetadata", [(f.name, f.type, field(default=f.default)) for f in fields(Metadata)])
+
+
+class LegacyAtKey:
+    """AtKey as it used to be: a __dict__ per key, and its metadata created with it."""
+
+    def __init__(self, at_key):
+        self.name = at_key.name
+        self.shared_with = at_key.shared_with
+        self.shared_by = at_key.shared_by
+        self.namespace = at_key.namespace
+        self.metadata = LegacyMetadata(is_public=at_key._peek_metadata("is_public"),
+                                       is_encrypted=at_key._peek_metadata("is_encrypted"),
+                                       is_hidden=at_key._peek_metadata("is_hidden"),
+                                       is_cached=at_key._peek_metadata("is_cached"))
+
+
+def measure(name, keys, build):
+    Keys._parsed.clear()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build(keys)
+    # The parse memo is a bounded cache rather than part of the result
+    Keys._parsed.clear()
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f"{name:<40}{len(keys):>8}{used / len(keys):>14.0f}{used / len(keys) * 1e6 / 2 ** 20:>16.0f}")
+    return result
+
+
+def with_metadata(keys):
+    at_keys = [Keys.from_string(key) for key in keys]
+    for at_key in at_keys:
+        at_key.metadata
+    return at_keys
+
+
+def main():
+    print(f"{'representation':<40}{'keys':>8}{'bytes/key':>14}{'MB/1M keys':>16}")
+    for size in SCAN_SIZES:
+        # The key strings are made before measuring, as they would have been received before being parsed
+        keys = scan_output(size)
+        measure("list of str", keys, lambda keys: [key.encode().decode() for key in keys])
+        measure("legacy AtKeys, eager metadata", keys, lambda keys: [LegacyAtKey(Keys.from_string(key)) for key in keys])
+        measure("AtKeys, metadata not used", keys, lambda keys: [Keys.from_string(key) for key in keys])
+        measure("AtKeys, metadata used", keys, with_metadata)
+        measure("AtKeyList", keys, AtKeyList)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Compare the cost of decoding the metadata returned by llookup:meta with dateutil, as Metadata.from_json used to, with
+the fromisoformat fast path, and lazily, when the timestamps are not used and when one of them is.
+
+Run from the repository root with:
+    python -m benchmarks.metadata_benchmark
+"""
+import json
+import time
+
+from dateutil.parser import parse
+
+from at_client.common.metadata import Metadata
+
+ROUNDS = 20000
+LLOOKUP_META = json.dumps({"createdBy": "@alice", "updatedBy": "@alice", "createdAt": "2023-08-16 12:34:56.789Z",
+                           "updatedAt": "2023-09-01 08:00:01.234Z", "availableAt": "2023-08-16 12:34:56.789Z",
+                           "expiresAt": "2023-12-16 12:34:56.789Z", "refreshAt": "2023-08-17 12:34:56.789Z",
+                           "status": "active", "version": 3, "ttl": 10368000000, "ttb": 0, "ttr": 86400, "ccd": False,
+                           "isBinary": False, "isEncrypted": True, "dataSignature": None, "sharedKeyEnc": None,
+                           "pubKeyCS": None, "encoding": None})
+
+
+def legacy_from_json(json_str):
+    """Metadata.from_json as it used to be, parsing every timestamp with dateutil."""
+    metadata = Metadata.from_json(json_str, lazy=True)
+    for name in ("available_at", "expires_at", "refresh_at", "created_at", "updated_at"):
+        value = metadata._peek(name)[1]
+        setattr(metadata, name, parse(value) if value is not None else None)
+    return metadata
+
+
+def measure(name, decode):
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        decode(LLOOKUP_META)
+    elapsed = time.perf_counter() - started
+    print(f"{name:<40}{elapsed / ROUNDS * 1e6:>12.2f}{ROUNDS / elapsed:>14.0f}")
+
+
+def main():
+    print(f"{'decoding':<40}{'us/key':>12}{'keys/s':>14}")
+    measure("dateutil", legacy_from_json)
+    measure("fromisoformat", Metadata.from_json)
+    measure("lazy, timestamps not used", lambda json_str: Metadata.from_json(json_str, lazy=True))
+    measure("lazy, expires_at used", lambda json_str: Metadata.from_json(json_str, lazy=True).expires_at)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Compare parsing large responses the way AtSecondaryConnection.parse_raw_response used to, decoding the whole response
+and then stripping, searching and splitting it, with parsing the bytes received by their prefix.
+
+Run from the repository root with:
+    python -m benchmarks.response_benchmark
+"""
+import json
+import time
+import tracemalloc
+
+from at_client.connections import AtSecondaryConnection, Response
+
+PAYLOAD_SIZES = [1024, 1024 * 1024, 8 * 1024 * 1024]
+
+
+def legacy_parse(raw_bytes):
+    """AtConnection.read and AtSecondaryConnection.parse_raw_response as they used to be."""
+    raw_response = raw_bytes.decode()
+    if raw_response.endswith("@"):
+        raw_response = raw_response[:-1]
+    raw_response = raw_response.strip()
+    data_index = raw_response.find("data:")
+    error_index = raw_response.find("error:")
+    notification_index = raw_response.find("notification")
+    if data_index > -1:
+        return Response().set_raw_data_response(raw_response[data_index+len("data:"):].split("\n")[0])
+    elif error_index > -1:
+        return Response().set_raw_error_response(raw_response[error_index+len("error:"):])
+    elif notification_index > -1:
+        return Response().set_raw_data_response(raw_response[notification_index+len("notification"):])
+    raise ValueError(f"Invalid response from server: {raw_response}")
+
+
+def scan_response(size):
+    keys = []
+    length = 2
+    while length < size:
+        key = f"@contact{len(keys) % 300:03d}:location_{len(keys)}.wavi@alice"
+        keys.append(key)
+        length += len(key) + 3
+    return f"data:{json.dumps(keys)}\n".encode()
+
+
+def measure(name, parse, raw_bytes, repeats=5):
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        parse(raw_bytes)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    parse(raw_bytes)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    size = len(raw_bytes)
+    print(f"{name:<24}{size:>10}{best * 1e3:>12.3f}{size / best / 2 ** 20:>12.0f}{peak / size:>16.2f}")
+
+
+def main():
+    print(f"{'parser':<24}{'bytes':>10}{'ms':>12}{'MB/s':>12}{'peak / bytes':>16}")
+    for size in PAYLOAD_SIZES:
+        raw_bytes = scan_response(size)
+        assert legacy_parse(raw_bytes).get_raw_data_response() == \
+            AtSecondaryConnection.parse_raw_response(raw_bytes).get_raw_data_response()
+        measure("legacy", legacy_parse, raw_bytes)
+        measure("bytes-level", AtSecondaryConnection.parse_raw_response, raw_bytes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Compare the byte-at-a-time socket reads that AtConnection.read and AtMonitorConnection._run used to do with the
+buffered SocketUtil reader.
+
+Run from the repository root with:
+    python -m benchmarks.socketutil_benchmark
+"""
+import time
+
+from at_client.util.socketutil import SocketUtil
+
+LINE_SIZES = [64, 1024, 4096, 65536]
+TLS_RECORD_SIZE = 16384
+LEGACY_READ_SIZE = 1024
+
+
+class CountingSocket:
+    """In-memory socket that serves data in TLS record sized pieces and counts receive calls."""
+
+    def __init__(self):
+        self._data = memoryview(b"")
+        self._position = 0
+        self.calls = 0
+
+    def feed(self, data: bytes):
+        """Make data the next thing the peer sends, as it would after receiving a command."""
+        self._data = memoryview(data)
+        self._position = 0
+
+    def _next(self, limit):
+        self.calls += 1
+        size = min(limit, TLS_RECORD_SIZE, len(self._data) - self._position)
+        chunk = self._data[self._position:self._position + size]
+        self._position += size
+        return chunk
+
+    def recv(self, bufsize):
+        return bytes(self._next(bufsize))
+
+    def read(self, length=LEGACY_READ_SIZE):
+        return bytes(self._next(length))
+
+    def recv_into(self, buffer, nbytes=0):
+        chunk = self._next(nbytes or len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+
+class CountingSocketUtil(SocketUtil):
+    """SocketUtil that also counts the bytes it copies."""
+
+    def __init__(self, sock):
+        super().__init__(sock)
+        self.bytes_copied = 0
+
+    def _fill(self):
+        start, length = self._start, len(self._buffer)
+        n = super()._fill()
+        if start and self._start == 0:
+            self.bytes_copied += length - start  # compaction
+        self.bytes_copied += 2 * n  # into the receive buffer, then onto the line buffer
+        return n
+
+    def _take(self, end):
+        self.bytes_copied += end - self._start
+        return super()._take(end)
+
+
+def legacy_readline(sock):
+    """The old SocketUtil.readline: one recv(1) per byte, growing an immutable bytes object."""
+    line = b""
+    copied = 0
+    while True:
+        data = sock.recv(1)
+        if data == b"":
+            break
+        line += data
+        copied += len(data) + len(line)
+        if data == b"\n":
+            break
+    return line, copied
+
+
+def legacy_read(sock):
+    """The old AtConnection.read: read() in 1 KB chunks, growing an immutable bytes object."""
+    response = b""
+    copied = 0
+    while True:
+        chunk = sock.read()
+        response += chunk
+        copied += len(chunk) + len(response)
+        if chunk == b"@" or b"\n" in chunk:
+            break
+    return response, copied
+
+
+def run(name, size, lines, read_one):
+    line = b"notification: " + b"x" * (size - len("notification: ") - 1) + b"\n"
+    sock = CountingSocket()
+    copied = 0
+    elapsed = 0.0
+    for _ in range(lines):
+        sock.feed(line)
+        started = time.perf_counter()
+        copied += read_one(sock)
+        elapsed += time.perf_counter() - started
+    print(f"{name:<22}{size:>8}{sock.calls / lines:>14.1f}{copied / lines:>18.0f}{elapsed / lines * 1e6:>14.1f}")
+
+
+def main():
+    print(f"{'reader':<22}{'line':>8}{'recv/line':>14}{'copied B/line':>18}{'us/line':>14}")
+    for size in LINE_SIZES:
+        lines = max(10, 200000 // size)
+        run("legacy readline", size, lines, lambda sock: legacy_readline(sock)[1])
+        run("legacy read", size, lines, lambda sock: legacy_read(sock)[1])
+
+        readers = {}
+
+        def buffered_readline(sock):
+            if sock not in readers:
+                readers[sock] = CountingSocketUtil(sock)
+            reader = readers[sock]
+            before = reader.bytes_copied
+            reader.readline()
+            return reader.bytes_copied - before
+
+        run("SocketUtil.readline", size, lines, buffered_readline)
+
+
+if __name__ == '__main__':
+    main()
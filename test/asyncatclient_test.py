@@ -0,0 +1,47 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+
+from at_client import AsyncAtClient, AtClient
+from at_client.common import AtSign
+from at_client.common.keys import SharedKey
+from at_client.util import KeysUtil
+from stubsecondary import StubSecondary
+
+
+class AsyncAtClientTest(unittest.TestCase):
+    """Tests against a local StubSecondary, which need no network."""
+
+    def setUp(self):
+        self.stub = StubSecondary()
+        self.keys_directory = tempfile.mkdtemp(prefix="asyncatclient_test.")
+        self.location = KeysUtil.expected_keys_files_location
+        KeysUtil.expected_keys_files_location = os.path.join(self.keys_directory, "")
+        self.stub.onboard("@alice")
+        self.stub.onboard("@bob")
+
+    def tearDown(self):
+        KeysUtil.expected_keys_files_location = self.location
+        shutil.rmtree(self.keys_directory, ignore_errors=True)
+        self.stub.stop()
+
+    def test_shared_key_looked_up_once(self):
+        """Test concurrent uses of a sender's shared key look it up once"""
+        bob = AtClient(AtSign("@bob"), secondary_address=self.stub.address, context=self.stub.client_context())
+        bob.put(SharedKey("test.app", bob.atsign, AtSign("@alice")), "hello")
+
+        async def run():
+            async with AsyncAtClient(AtSign("@alice"), secondary_address=self.stub.address,
+                                     context=self.stub.client_context()) as alice:
+                key = SharedKey("test.app", bob.atsign, alice.atsign)
+                return await asyncio.gather(*(alice.get_encryption_key_shared_by_other(key) for _ in range(5)))
+
+        shared_keys = asyncio.run(run())
+        self.assertEqual(len(set(shared_keys)), 1)
+        self.assertEqual(self.stub.commands["lookup"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import unittest
+
+from at_client.connections import Address, AsyncAtSecondaryConnection
+from at_client.exception import AtKeyNotFoundException, AtSecondaryConnectException
+
+
+class ScriptedWriter:
+    """Answers each command line written to it with 'data:<command>' on the paired StreamReader."""
+
+    def __init__(self, reader: asyncio.StreamReader):
+        self._reader = reader
+        self.commands = []
+
+    def write(self, data: bytes):
+        for command in data.decode().splitlines():
+            self.commands.append(command)
+            if command == "llookup:missing":
+                self._reader.feed_data(b"error:AT0015-key not found : missing does not exist\n@alice@")
+            elif command == "scan":
+                self._reader.feed_data(b"data:[" + b",".join(b'"key%d@alice"' % i for i in range(1000)) + b"]\n@alice@")
+            elif command.startswith("monitor"):
+                self._reader.feed_data(b'notification: {"id":"1"}\n')
+            elif command != "hang":
+                self._reader.feed_data(f"data:{command}\n@alice@".encode())
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self._reader.feed_eof()
+
+    async def wait_closed(self):
+        pass
+
+
+class AsyncAtConnectionTest(unittest.TestCase):
+
+    async def _connection(self, limit:int=2 ** 16):
+        connection = AsyncAtSecondaryConnection(Address("localhost", 6464))
+        connection._reader = asyncio.StreamReader(limit=limit)
+        connection._writer = ScriptedWriter(connection._reader)
+        connection._connected = True
+        connection._unsolicited = asyncio.Queue()
+        connection._reader_task = asyncio.get_running_loop().create_task(connection._read_responses())
+        return connection
+
+    def test_strip_prompts(self):
+        """Test prompts are removed from the start of a line but atSigns in the data are not."""
+        self.assertEqual(AsyncAtSecondaryConnection.strip_prompts(b"@alice@data:ok\n"), b"data:ok\n")
+        self.assertEqual(AsyncAtSecondaryConnection.strip_prompts(b"@data:ok\n"), b"data:ok\n")
+        self.assertEqual(AsyncAtSecondaryConnection.strip_prompts(b"@@alice@data:@bob@x\n"), b"data:@bob@x\n")
+
+    def test_concurrent_commands(self):
+        """Test concurrent commands on one connection each get their own response."""
+        async def run():
+            connection = await self._connection()
+            commands = [f"llookup:key{i}@alice" for i in range(20)] + ["llookup:missing"]
+            responses = await asyncio.gather(*(connection.execute_command(c, False) for c in commands))
+            await connection.disconnect()
+            return commands, responses
+        commands, responses = asyncio.run(run())
+        self.assertEqual([r.get_raw_data_response() for r in responses[:-1]], commands[:-1])
+        self.assertIsInstance(responses[-1].get_exception(), AtKeyNotFoundException)
+
+    def test_unsolicited_lines(self):
+        """Test lines which answer no command are delivered by read_line."""
+        async def run():
+            connection = await self._connection()
+            connection.send("monitor:0")
+            line = await asyncio.wait_for(connection.read_line(), 1)
+            await connection.disconnect()
+            return line, await connection.read_line()
+        line, after_close = asyncio.run(run())
+        self.assertEqual(line, b'notification: {"id":"1"}\n')
+        self.assertIsNone(after_close)
+
+    def test_unawaited_commands(self):
+        """Test responses to commands whose response is not awaited are not taken for those of later commands."""
+        async def run():
+            connection = await self._connection()
+            await connection.execute_command("update:a@alice 1", read_the_response=False)
+            connection.send("noop:0")
+            response = await connection.execute_command("llookup:b@alice")
+            line = await asyncio.wait_for(connection.read_line(), 1)
+            await connection.disconnect()
+            return response, line
+        response, line = asyncio.run(run())
+        self.assertEqual(response.get_raw_data_response(), "llookup:b@alice")
+        self.assertEqual(line, b"data:noop:0\n")
+
+    def test_long_response(self):
+        """Test a response longer than the reader's limit is read in full."""
+        async def run():
+            connection = await self._connection(limit=1024)
+            response = await connection.execute_command("scan")
+            following = await connection.execute_command("llookup:b@alice")
+            await connection.disconnect()
+            return response, following
+        response, following = asyncio.run(run())
+        self.assertEqual(len(json.loads(response.get_raw_data_response())), 1000)
+        self.assertEqual(following.get_raw_data_response(), "llookup:b@alice")
+
+    def test_pending_commands_fail_on_close(self):
+        """Test commands waiting for a response fail when the connection closes."""
+        async def run():
+            connection = await self._connection()
+            task = asyncio.ensure_future(connection.execute_command("hang"))
+            await asyncio.sleep(0)
+            connection._reader.feed_eof()
+            return await task
+        with self.assertRaises(AtSecondaryConnectException):
+            asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
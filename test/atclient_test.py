@@ -1,10 +1,13 @@
-import unittest, random, string
+import os, queue, shutil, tempfile, threading, time, unittest, random, string
 from configparser import ConfigParser
 
 from at_client import AtClient
 from at_client.common import AtSign
 from at_client.common.keys import PublicKey, SelfKey, SharedKey
+from at_client.connections.notification.atevents import AtEvent, AtEventType
 from at_client.exception import *
+from at_client.util import KeysUtil
+from stubsecondary import StubSecondary
 from test_wrapper import skip_if_dependabot_pr
 
 class AtClientTest(unittest.TestCase):
@@ -44,6 +47,16 @@ class AtClientTest(unittest.TestCase):
         my_keys = atclient.get_at_keys("no_key", fetch_metadata=True)
         self.assertEqual(len(my_keys), 0)
 
+    @skip_if_dependabot_pr
+    def test_iter_keys_metadata(self):
+        """Test bulk metadata lookups return the same keys and metadata as get_at_keys"""
+        atsign = AtSign(self.atsign2)
+        atclient = AtClient(atsign, verbose=self.verbose, max_connections=2)
+        expected = atclient.get_at_keys("", fetch_metadata=True)
+        keys = list(atclient.iter_keys_metadata([str(key) for key in expected], chunk_size=3))
+        self.assertEqual([str(key) for key in keys], [str(key) for key in expected])
+        self.assertEqual([key.metadata.created_at for key in keys], [key.metadata.created_at for key in expected])
+
     @skip_if_dependabot_pr
     def test_put_public_key(self):
         """Test Put Function with Public Key"""
@@ -87,6 +100,22 @@ class AtClientTest(unittest.TestCase):
             sk = SharedKey("test_shared_key3", shared_with, shared_by)
             response = atclient.put(sk, "test2")
 
+    @skip_if_dependabot_pr
+    def test_put_many(self):
+        """Test Put Many Function with a mix of key types and a failing item"""
+        atsign = AtSign(self.atsign1)
+        atclient = AtClient(atsign, verbose=self.verbose)
+        items = [(SelfKey("test_put_many_self", atsign), "test1"),
+                 (PublicKey("test_put_many_public", atsign), "test2"),
+                 (SharedKey("test_put_many_shared", atsign, AtSign(self.atsign2)), "test3"),
+                 (SharedKey("test_put_many_shared", AtSign(self.atsign2), atsign), "test4")]
+        results = atclient.put_many(items)
+        self.assertEqual(len(results), 4)
+        for result in results[:3]:
+            self.assertNotIsInstance(result, Exception)
+        self.assertIsInstance(results[3], AtIllegalArgumentException)
+        self.assertEqual(atclient.get(SelfKey("test_put_many_self", atsign)), "test1")
+
     @skip_if_dependabot_pr
     def test_get_public_encryption_key(self):
         atsign1 = AtSign(self.atsign1)
@@ -129,6 +158,11 @@ class AtClientTest(unittest.TestCase):
         key = atclient.get_encryption_key_shared_by_me(sk)
         self.assertIsNotNone(key)
 
+        # Second lookup is served from the cache
+        hits = atclient.shared_key_cache.hits
+        self.assertEqual(atclient.get_encryption_key_shared_by_me(sk), key)
+        self.assertEqual(atclient.shared_key_cache.hits, hits + 1)
+
         # Key not found Exception
         with self.assertRaises(AtKeyNotFoundException):
             armadilo_atsign = AtSign("6armadillo")
@@ -179,6 +213,49 @@ class AtClientTest(unittest.TestCase):
             unknown = SelfKey("unknown", atsign)
             response = atclient.get(unknown)
 
+    @skip_if_dependabot_pr
+    def test_get_many(self):
+        """Test Get Many Function returns values and errors in key order"""
+        atsign = AtSign(self.atsign1)
+        atclient = AtClient(atsign, verbose=self.verbose)
+        atclient.put_many([(SelfKey("test_get_many_1", atsign), "test1"), (SelfKey("test_get_many_2", atsign), "test2")])
+        results = atclient.get_many([SelfKey("test_get_many_1", atsign), SelfKey("unknown", atsign), SelfKey("test_get_many_2", atsign)])
+        self.assertEqual(results[0], "test1")
+        self.assertIsInstance(results[1], AtKeyNotFoundException)
+        self.assertEqual(results[2], "test2")
+
+    @skip_if_dependabot_pr
+    def test_value_cache(self):
+        """Test Get Function serves cached values until the key is updated or deleted"""
+        atsign = AtSign(self.atsign1)
+        atclient = AtClient(atsign, verbose=self.verbose, value_cache_size=16)
+        sk = SelfKey("test_value_cache", atsign)
+        atclient.put(sk, "test1")
+        self.assertEqual(atclient.get(sk), "test1")
+        self.assertEqual(atclient.get(SelfKey("test_value_cache", atsign)), "test1")
+        self.assertEqual(atclient.value_cache.hits, 1)
+        atclient.put(sk, "test2")
+        self.assertEqual(atclient.get(sk), "test2")
+        atclient.delete(sk)
+        with self.assertRaises(AtKeyNotFoundException):
+            atclient.get(sk)
+
+    @skip_if_dependabot_pr
+    def test_replica(self):
+        """Test a client with a local replica answers scans and lookups after syncing"""
+        atsign = AtSign(self.atsign1)
+        atclient = AtClient(atsign, verbose=self.verbose)
+        sk = SelfKey("test_replica", atsign)
+        atclient.put(sk, "test1")
+        with tempfile.TemporaryDirectory() as directory:
+            replica_client = AtClient(atsign, verbose=self.verbose, replica_path=os.path.join(directory, "replica.db"))
+            self.assertIn("test_replica" + atsign.to_string(), [str(key) for key in replica_client.get_at_keys("test_replica", False)])
+            self.assertEqual(replica_client.get(sk), "test1")
+            atclient.put(sk, "test2")
+            replica_client.sync()
+            self.assertEqual(replica_client.get(sk), "test2")
+            replica_client.replica.close()
+
     @skip_if_dependabot_pr
     def test_get_public_key(self):
         """Test Get Function with Public Key"""
@@ -259,8 +336,138 @@ class AtClientTest(unittest.TestCase):
         response = atclient.delete(sk)
         self.assertIsNotNone(response)
 
-    
-    
+
+class AtClientStubTest(unittest.TestCase):
+    """Tests against a local StubSecondary, which need no network."""
+
+    def setUp(self):
+        self.stub = StubSecondary()
+        self.keys_directory = tempfile.mkdtemp(prefix="atclient_test.")
+        self.location = KeysUtil.expected_keys_files_location
+        KeysUtil.expected_keys_files_location = os.path.join(self.keys_directory, "")
+        self.stub.onboard("@alice")
+        self.stub.onboard("@bob")
+
+    def tearDown(self):
+        KeysUtil.expected_keys_files_location = self.location
+        shutil.rmtree(self.keys_directory, ignore_errors=True)
+        self.stub.stop()
+
+    def client(self, atsign, **kwargs):
+        return AtClient(AtSign(atsign), secondary_address=self.stub.address, context=self.stub.client_context(),
+                        queue=queue.Queue(), value_cache_size=16, **kwargs)
+
+    def before_command(self, matches, action):
+        """Call action once, before the stub handles the first command for which matches returns True."""
+        def hook(command):
+            if matches(command):
+                self.stub.before_command = None
+                action()
+        self.stub.before_command = hook
+
+    def test_invalidated_during_get(self):
+        """Test a value read before its key was invalidated by a notification is not cached"""
+        alice, other_alice = self.client("@alice"), self.client("@alice")
+        key = SelfKey("test.app", alice.atsign)
+        alice.put(key, "old")
+        notification = AtEvent(AtEventType.DELETE_NOTIFICATION, {"id": "1", "key": str(key)})
+        self.before_command(lambda command: command.startswith("llookup") and str(key) in command,
+                            lambda: alice.handle_event(alice.queue, notification))
+        self.assertEqual(alice.get(key), "old")
+        other_alice.put(key, "new")
+        self.assertEqual(alice.get(key), "new")
+
+    def test_get_during_put(self):
+        """Test a value read while a put of the key is being sent is not cached"""
+        alice = self.client("@alice", max_connections=2)
+        key = SelfKey("test.app", alice.atsign)
+        alice.put(key, "old")
+        read = []
+        self.before_command(lambda command: command.startswith("update") and str(key) in command,
+                            lambda: read.append(alice.get(SelfKey("test.app", alice.atsign))))
+        alice.put(key, "new")
+        self.assertEqual(read, ["old"])
+        self.assertEqual(alice.get(key), "new")
+
+        self.before_command(lambda command: command.startswith("update") and str(key) in command,
+                            lambda: read.append(alice.get(SelfKey("test.app", alice.atsign))))
+        alice.put_many([(key, "newer")])
+        self.assertEqual(read, ["old", "new"])
+        self.assertEqual(alice.get(key), "newer")
+
+        self.before_command(lambda command: command.startswith("delete") and str(key) in command,
+                            lambda: read.append(alice.get(SelfKey("test.app", alice.atsign))))
+        alice.delete(key)
+        self.assertEqual(read, ["old", "new", "newer"])
+        with self.assertRaises(AtKeyNotFoundException):
+            alice.get(key)
+
+    def test_notifications_out_of_order(self):
+        """Test notifications only invalidate cached values, so one handled after a newer one can't replace it"""
+        alice, bob = self.client("@alice"), self.client("@bob")
+        key = SharedKey("test.app", bob.atsign, alice.atsign)
+
+        def notification(value):
+            bob.put(key, value)
+            return AtEvent(AtEventType.UPDATE_NOTIFICATION, {"id": value, "key": str(key), "value": self.stub.store[str(key)][0],
+                                                              "operation": "update", "epochMillis": int(time.time() * 1000),
+                                                              "metadata": {"ivNonce": None}})
+
+        older, newer = notification("older"), notification("newer")
+        self.assertEqual(alice.get(SharedKey("test.app", bob.atsign, alice.atsign)), "newer")
+        for at_event in (newer, older):
+            self.assertTrue(alice.handle_event(alice.queue, at_event))
+        self.assertEqual([alice.queue.get_nowait().event_data["decryptedValue"] for _ in range(2)], ["newer", "older"])
+        self.assertEqual(alice.get(SharedKey("test.app", bob.atsign, alice.atsign)), "newer")
+
+    def test_shared_key_per_recipient(self):
+        """Test shared keys with different atSigns are created concurrently, and one is created per atSign"""
+        alice = self.client("@alice", max_connections=4)
+        self.stub.onboard("@carol")
+        created = []
+        carol_created = threading.Event()
+        waited = []
+
+        def create(recipient):
+            created.append(alice.get_encryption_key_shared_by_me(SharedKey("test.app", alice.atsign, AtSign(recipient))))
+
+        # The lookup of bob's shared key waits until carol's has been created
+        self.before_command(lambda command: "shared_key.bob" in command, lambda: waited.append(carol_created.wait(5)))
+        threads = [threading.Thread(target=create, args=("@bob",)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        create("@carol")
+        carol_created.set()
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual(waited, [True])
+        self.assertEqual(len(created), 5)
+        self.assertEqual(len(set(created[1:])), 1)
+        self.assertEqual(self.stub.commands["update"], 4)
+
+
+    def test_replica(self):
+        """Test a replica synced from the stub answers gets and scans, and catches up with later updates and deletes"""
+        alice = self.client("@alice")
+        kept, deleted, added = (SelfKey(name, alice.atsign) for name in ("kept.app", "deleted.app", "added.app"))
+        alice.put(kept, "kept")
+        alice.put(deleted, "deleted")
+        replica_path = os.path.join(self.keys_directory, "replica.db")
+        other_alice = self.client("@alice", replica_path=replica_path)
+        self.addCleanup(other_alice.replica.close)
+        lookups = self.stub.commands.get("llookup", 0)
+        self.assertEqual(other_alice.get(kept), "kept")
+        self.assertEqual(self.stub.commands.get("llookup", 0), lookups)
+        alice.delete(deleted)
+        alice.put(added, "added")
+        other_alice.sync()
+        scanned = other_alice.get_at_keys(r"\.app@", fetch_metadata=False)
+        self.assertEqual(sorted(str(key) for key in scanned), sorted([str(kept), str(added)]))
+        self.assertEqual(other_alice.get(added), "added")
+        self.assertEqual(self.stub.commands.get("llookup", 0), lookups)
+
+
 if __name__ == '__main__':
     unittest.main()
     
\ No newline at end of file
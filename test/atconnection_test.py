@@ -0,0 +1,96 @@
+import unittest
+
+from at_client.connections import Address, AtSecondaryConnection
+from at_client.exception import AtKeyNotFoundException, AtSecondaryConnectException
+from at_client.util.socketutil import SocketUtil
+
+
+class ScriptedSocket:
+    """Answers each command line written to it with 'data:<command>', or a key not found error for 'llookup:missing'."""
+
+    def __init__(self, close_after: int = None):
+        self._pending = bytearray()
+        self._close_after = close_after
+        self.writes = 0
+        self.commands = []
+
+    def write(self, data: bytes):
+        self.writes += 1
+        for command in data.decode().splitlines():
+            self.commands.append(command)
+            if self._close_after is not None and len(self.commands) > self._close_after:
+                continue
+            if command == "llookup:missing":
+                self._pending += b"error:AT0015-key not found : missing does not exist\n@alice@"
+            else:
+                self._pending += f"data:{command}\n@alice@".encode()
+        return len(data)
+
+    def recv_into(self, buffer, nbytes: int = 0):
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        del self._pending[:size]
+        return size
+
+
+class AtConnectionTest(unittest.TestCase):
+
+    def _connection(self, sock):
+        connection = AtSecondaryConnection(Address("localhost", 6464))
+        connection._secure_root_socket = sock
+        connection._stream_reader = SocketUtil(sock)
+        connection._connected = True
+        return connection
+
+    def test_execute_commands_in_order(self):
+        """Test pipelined commands are written in batches and answered in order."""
+        sock = ScriptedSocket()
+        connection = self._connection(sock)
+        commands = [f"llookup:key{i}@alice" for i in range(10)]
+        responses = connection.execute_commands(commands, max_in_flight=4)
+        self.assertEqual([r.get_raw_data_response() for r in responses], commands)
+        self.assertEqual(sock.writes, 5)
+
+    def test_execute_commands_per_command_errors(self):
+        """Test an error response is returned for its own command without affecting the others."""
+        connection = self._connection(ScriptedSocket())
+        responses = connection.execute_commands(["llookup:a@alice", "llookup:missing", "llookup:b@alice"])
+        self.assertFalse(responses[0].is_error())
+        self.assertIsInstance(responses[1].get_exception(), AtKeyNotFoundException)
+        self.assertEqual(responses[2].get_raw_data_response(), "llookup:b@alice")
+
+        with self.assertRaises(AtKeyNotFoundException):
+            connection.execute_commands(["llookup:missing"], raise_exception=True)
+
+    def test_abandoned_pipeline_keeps_connection_in_step(self):
+        """Test responses already requested are drained when iteration stops early."""
+        connection = self._connection(ScriptedSocket())
+        responses = connection.iter_execute_commands([f"llookup:key{i}@alice" for i in range(10)], max_in_flight=4)
+        next(responses)
+        responses.close()
+        self.assertEqual(connection.execute_command("noop:0").get_raw_data_response(), "noop:0")
+
+    def test_execute_commands_connection_closed(self):
+        """Test a connection closed part way through raises AtSecondaryConnectException."""
+        connection = self._connection(ScriptedSocket(close_after=2))
+        with self.assertRaises(AtSecondaryConnectException):
+            connection.execute_commands([f"llookup:key{i}@alice" for i in range(5)])
+        self.assertFalse(connection.is_connected())
+
+    def test_parse_raw_response_bytes(self):
+        """Test responses are parsed the same from bytes, memoryviews and str, by their prefix."""
+        data = '["kéy@alice"]'
+        for raw_response in [f"data:{data}\n@alice@".encode(), f"data:{data}\n@alice@",
+                             memoryview(f" data:{data}\nignored\n".encode()), f"data:{data}\r\n"]:
+            self.assertEqual(AtSecondaryConnection.parse_raw_response(raw_response).get_raw_data_response(), data)
+        response = AtSecondaryConnection.parse_raw_response(b"error:AT0015-key not found : data:x@alice does not exist\n")
+        self.assertIsInstance(response.get_exception(), AtKeyNotFoundException)
+        response = AtSecondaryConnection.parse_raw_response(b'notification: {"value":"data:x"}\n')
+        self.assertEqual(response.get_raw_data_response(), ': {"value":"data:x"}')
+        self.assertEqual(AtSecondaryConnection.parse_raw_response(b"@alice@data:ok\n").get_raw_data_response(), "ok")
+        with self.assertRaises(ValueError):
+            AtSecondaryConnection.parse_raw_response(b"invalid_response\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
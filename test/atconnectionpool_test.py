@@ -0,0 +1,81 @@
+import threading, unittest
+
+from at_client.common import AtSign
+from at_client.connections import Address, AtConnectionPool, Response
+from at_client.exception import AtSecondaryConnectException, AtTimeoutException
+
+
+class FakeConnection:
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    def execute_command(self, command, raise_exception=True, read_the_response=True):
+        if not self.healthy:
+            raise AtSecondaryConnectException("connection reset")
+        return Response().set_raw_data_response("ok")
+
+    def disconnect(self):
+        self.connected = False
+
+
+class FakeConnectionPool(AtConnectionPool):
+    def _create(self):
+        self.created += 1
+        return FakeConnection()
+
+
+class AtConnectionPoolTest(unittest.TestCase):
+
+    def _pool(self, **kwargs):
+        return FakeConnectionPool(AtSign("@alice"), {}, Address("localhost", 6464), **kwargs)
+
+    def test_checkout_reuses_connections(self):
+        """Test a checked in connection is handed out again rather than opening another."""
+        pool = self._pool(max_size=2)
+        connection = pool.checkout()
+        pool.checkin(connection)
+        self.assertIs(pool.checkout(), connection)
+        self.assertEqual(pool.created, 1)
+
+    def test_eager_pool_opens_min_size(self):
+        """Test an eager pool opens min_size connections up front."""
+        pool = self._pool(min_size=2, max_size=3, eager=True)
+        self.assertEqual(pool.size, 2)
+        self.assertEqual(pool.idle, 2)
+
+    def test_full_pool_waits_for_checkin(self):
+        """Test checkout blocks while the pool is full and times out if nothing is checked in."""
+        pool = self._pool(max_size=1)
+        connection = pool.checkout()
+        with self.assertRaises(AtTimeoutException):
+            pool.checkout(timeout=0.05)
+
+        threading.Timer(0.05, pool.checkin, args=(connection,)).start()
+        self.assertIs(pool.checkout(timeout=5), connection)
+
+    def test_broken_connections_are_evicted(self):
+        """Test a connection that fails inside connection() is closed and replaced."""
+        pool = self._pool(max_size=1)
+        with self.assertRaises(AtSecondaryConnectException):
+            with pool.connection() as connection:
+                raise AtSecondaryConnectException("connection reset")
+        self.assertFalse(connection.is_connected())
+        self.assertEqual(pool.size, 0)
+        self.assertIsNot(pool.checkout(), connection)
+
+    def test_stale_connections_are_health_checked(self):
+        """Test an idle connection that fails its noop is evicted at checkout."""
+        unhealthy = FakeConnection(healthy=False)
+        pool = self._pool(max_size=2, health_check_interval=0, connections=[unhealthy])
+        connection = pool.checkout()
+        self.assertIsNot(connection, unhealthy)
+        self.assertEqual(pool.evicted, 1)
+        self.assertEqual(pool.size, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
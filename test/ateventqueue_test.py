@@ -0,0 +1,99 @@
+import queue
+import unittest
+
+from at_client.connections import AtEventQueue, AtEventType, MemoryCheckpointStore, MonitorCheckpoint, OverflowPolicy
+from at_client.connections.notification.atevents import AtEvent
+
+
+def update(key, value):
+    return AtEvent(AtEventType.UPDATE_NOTIFICATION, {"key": key, "value": value})
+
+
+def heartbeat():
+    return AtEvent(AtEventType.MONITOR_HEARTBEAT_ACK, {"key": "__heartbeat__", "value": "ok"})
+
+
+class AtEventQueueTest(unittest.TestCase):
+    def drain(self, events):
+        items = []
+        while not events.empty():
+            items.append(events.get_nowait())
+            events.task_done()
+        return items
+
+    def test_drop_oldest(self):
+        """Test the oldest event is dropped to make room"""
+        events = AtEventQueue(maxsize=2, policy=OverflowPolicy.DROP_OLDEST)
+        for value in range(3):
+            events.put(update("a", value))
+        self.assertEqual([item.event_data["value"] for item in self.drain(events)], [1, 2])
+        self.assertEqual(events.dropped, 1)
+        events.join()
+
+    def test_drop_heartbeats(self):
+        """Test heartbeat acknowledgements are dropped before other events"""
+        events = AtEventQueue(maxsize=3, policy=OverflowPolicy.DROP_HEARTBEATS)
+        events.put(update("a", 1))
+        events.put(heartbeat())
+        events.put(update("b", 2))
+        events.put(update("c", 3))
+        events.put(update("d", 4))
+        self.assertEqual([item.event_data["key"] for item in self.drain(events)], ["b", "c", "d"])
+        self.assertEqual(events.stats()["dropped"], 2)
+
+    def test_coalesce(self):
+        """Test notifications for a queued key replace it in place"""
+        events = AtEventQueue(maxsize=10, policy=OverflowPolicy.COALESCE)
+        events.put(update("a", 1))
+        events.put(heartbeat())
+        events.put(update("b", 2))
+        events.put(update("a", 3))
+        events.put(heartbeat())
+        events.put(AtEvent(AtEventType.DELETE_NOTIFICATION, {"key": "b"}))
+        items = self.drain(events)
+        self.assertEqual([(item.event_type, item.event_data.get("value")) for item in items],
+                         [(AtEventType.UPDATE_NOTIFICATION, 3), (AtEventType.MONITOR_HEARTBEAT_ACK, "ok"), (AtEventType.DELETE_NOTIFICATION, None)])
+        self.assertEqual(events.coalesced, 3)
+        events.put(update("a", 4))
+        self.assertEqual(events.qsize(), 1)
+
+    def test_on_discard(self):
+        """Test on_discard is called with each event dropped, and with the contents of each coalesced event"""
+        discarded = []
+        events = AtEventQueue(maxsize=2, policy=OverflowPolicy.COALESCE, on_discard=discarded.append)
+        events.put(update("a", 1))
+        events.put(update("a", 2))
+        events.put(heartbeat())
+        events.put(update("b", 3))
+        events.put(update("c", 4))
+        self.assertEqual([(item.event_type, item.event_data["value"]) for item in discarded],
+                         [(AtEventType.UPDATE_NOTIFICATION, 1), (AtEventType.MONITOR_HEARTBEAT_ACK, "ok"),
+                          (AtEventType.UPDATE_NOTIFICATION, 2)])
+        self.assertEqual([item.event_data["value"] for item in self.drain(events)], [3, 4])
+
+    def test_checkpoint_advances_past_discarded(self):
+        """Test a monitor checkpoint advances past events the queue coalesced or dropped"""
+        for policy in (OverflowPolicy.COALESCE, OverflowPolicy.DROP_OLDEST):
+            store = MemoryCheckpointStore()
+            checkpoint = MonitorCheckpoint(store, "@alice")
+            events = AtEventQueue(maxsize=1, policy=policy, on_discard=checkpoint.ack)
+            for index in range(1, 4):
+                at_event = AtEvent(AtEventType.UPDATE_NOTIFICATION,
+                                   {"id": str(index), "key": "@alice:test@bob", "value": index, "epochMillis": index * 100})
+                checkpoint.delivered(at_event)
+                events.put(at_event)
+            for at_event in self.drain(events):
+                checkpoint.ack(at_event)
+            self.assertEqual(store.load("@alice")["lastReceivedTime"], 300)
+
+    def test_block(self):
+        """Test a full queue with the block policy refuses events rather than dropping them"""
+        events = AtEventQueue(maxsize=1)
+        events.put(update("a", 1))
+        with self.assertRaises(queue.Full):
+            events.put(update("b", 2), block=False)
+        self.assertEqual(events.dropped, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
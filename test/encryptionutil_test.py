@@ -20,6 +20,23 @@ class EncryptionUtilTest(unittest.TestCase):
         decrypted_text = EncryptionUtil.rsa_decrypt_from_base64(encrypted_text, base64.b64encode(private_key).decode("utf-8"))
         self.assertEqual(plain_text, decrypted_text)
 
+    def test_rsa_encryption_with_key_objects(self):
+        """Test RSA encryption/decryption with already parsed keys."""
+        private_key, public_key = EncryptionUtil.generate_rsa_key_pair()
+        private_key = EncryptionUtil.private_key_from_base64(base64.b64encode(private_key).decode("utf-8"))
+        public_key = EncryptionUtil.public_key_from_base64(base64.b64encode(public_key).decode("utf-8"))
+        encrypted_text = EncryptionUtil.rsa_encrypt_to_base64("RSA", public_key)
+        self.assertEqual(EncryptionUtil.rsa_decrypt_from_base64(encrypted_text, private_key), "RSA")
+
+    def test_parsed_keys_are_cached(self):
+        """Test a key is parsed once however many times it is used."""
+        private_key, _ = EncryptionUtil.generate_rsa_key_pair()
+        private_key = base64.b64encode(private_key).decode("utf-8")
+        EncryptionUtil.clear_key_cache()
+        self.assertIs(EncryptionUtil.private_key_from_base64(private_key), EncryptionUtil.private_key_from_base64(private_key))
+        EncryptionUtil.sign_sha256_rsa("data", private_key)
+        self.assertEqual(EncryptionUtil._load_private_key.cache_info().misses, 1)
+
 if __name__ == '__main__':
     unittest.main()
     
\ No newline at end of file
@@ -0,0 +1,45 @@
+import json
+import unittest
+from unittest import mock
+
+from at_client.util import JsonArrayParser
+
+
+class JsonArrayParserTest(unittest.TestCase):
+    def test_feed(self):
+        """Test elements are returned as soon as they are complete, however the array is split"""
+        elements = ["@bob:location.app@alice", "public:café@alice", 12, 3.5, True, None, {"a": [1, "]"]}, '\\",]']
+        data = json.dumps(elements, ensure_ascii=False).encode()
+        for piece_size in (1, 3, 64, len(data)):
+            parser = JsonArrayParser()
+            parsed = []
+            for index in range(0, len(data), piece_size):
+                parsed.extend(parser.feed(data[index:index + piece_size]))
+            parser.close()
+            self.assertEqual(parsed, elements)
+            self.assertTrue(parser.finished)
+
+    def test_commas_in_strings(self):
+        """Test a piece ending inside a string containing commas is parsed with one attempt at the fast path"""
+        keys = [f"@bob:key{index},with,commas.app@alice" for index in range(5000)]
+        data = json.dumps(keys).encode()
+        parser = JsonArrayParser()
+        parsed = []
+        with mock.patch("at_client.util.jsonstream.json.loads", wraps=json.loads) as loads:
+            for index in range(0, len(data), 65536):
+                parsed.extend(parser.feed(data[index:index + 65536]))
+        parser.close()
+        self.assertEqual(parsed, keys)
+        self.assertLessEqual(loads.call_count, len(range(0, len(data), 65536)))
+
+    def test_incomplete(self):
+        """Test truncated and malformed arrays are reported"""
+        parser = JsonArrayParser()
+        self.assertEqual(parser.feed(b'["a", "b'), ["a"])
+        self.assertRaises(ValueError, parser.close)
+        self.assertRaises(ValueError, JsonArrayParser().feed, b'{"a": 1}')
+        self.assertRaises(ValueError, JsonArrayParser().feed, b'["a" "b"]')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from at_client.util import AsyncKeyedLocks, KeyedLocks
+
+
+class KeyedLocksTest(unittest.TestCase):
+    def test_lock(self):
+        """Test threads using the same key take turns, while those using other keys go ahead"""
+        locks = KeyedLocks()
+        inside = []
+        overlaps = []
+
+        def hold(key):
+            with locks.lock(key):
+                overlaps.append(key in inside)
+                inside.append(key)
+                time.sleep(0.01)
+                inside.remove(key)
+
+        with locks.lock("@bob"):
+            thread = threading.Thread(target=hold, args=("@carol",))
+            thread.start()
+            thread.join(5)
+            self.assertFalse(thread.is_alive())
+        threads = [threading.Thread(target=hold, args=("@bob",)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(overlaps, [False] * 5)
+
+    def test_bounded(self):
+        """Test locks are only kept while they are held or waited for"""
+        locks = KeyedLocks()
+        for index in range(1000):
+            with locks.lock(f"@sender{index}"):
+                self.assertEqual(len(locks), 1)
+        self.assertEqual(len(locks), 0)
+        with self.assertRaises(ValueError):
+            with locks.lock("@bob"):
+                raise ValueError()
+        self.assertEqual(len(locks), 0)
+
+
+    def test_async_lock(self):
+        """Test tasks using the same key take turns, and locks are only kept while they are held or waited for"""
+        locks = AsyncKeyedLocks()
+        inside = []
+        overlaps = []
+
+        async def hold(key):
+            async with locks.lock(key):
+                overlaps.append(key in inside)
+                inside.append(key)
+                await asyncio.sleep(0.01)
+                inside.remove(key)
+
+        async def run():
+            await asyncio.gather(*(hold(key) for key in ["@bob"] * 4 + ["@carol"]))
+            return len(locks)
+
+        self.assertEqual(asyncio.run(run()), 0)
+        self.assertEqual(overlaps, [False] * 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+from at_client.common.keys import AtKeyList, Keys, PublicKey, SharedKey
+from at_client.exception import AtException
+from at_client.util.keystringutil import KeyStringUtil, KeyType
+
+
+class KeyStringUtilTest(unittest.TestCase):
+    KEYS = ["@bob:location.wavi@alice", "public:publickey@alice", "cached:public:publickey@bob", "cached:@alice:message@bob",
+            "private:secret@alice", "privatekey:at_pkam_publickey@alice", "_latestnotificationid.wavi@alice", "profile@alice",
+            "@alice:signing_privatekey@alice", "@bob:_hidden@alice", "foo:bar@alice", "a@b@c", "@bob:x:y@alice",
+            "cached:private:x@alice", "cached:x@alice", "@:x@alice"]
+
+    def test_parse(self):
+        """Test the single-pass parser gives the same results as evaluating the key string with a KeyStringUtil"""
+        for key in self.KEYS:
+            util = KeyStringUtil(key)
+            self.assertEqual(KeyStringUtil.parse(key), (util.get_key_type(), util.get_key_name(), util.get_shared_by(),
+                                                        util.get_shared_with(), util.is_cached(), util.is_hidden()), key)
+        self.assertRaises(AtException, KeyStringUtil.parse, "@bob:nosharedby")
+
+    def test_from_string(self):
+        """Test keys parsed again are new AtKeys sharing the same AtSigns"""
+        first = Keys.from_string("cached:@alice:message.buzz@bob")
+        second = Keys.from_string("cached:@alice:message.buzz@bob")
+        self.assertIsInstance(first, SharedKey)
+        self.assertIsNot(first, second)
+        self.assertIs(first.shared_by, second.shared_by)
+        self.assertIs(first.shared_with, Keys.from_string("@alice:other@bob").shared_with)
+        self.assertEqual((str(first), first.metadata.is_cached), (str(second), True))
+        second.metadata.ttl = 10
+        self.assertEqual(first.metadata.ttl, 0)
+        self.assertEqual(KeyStringUtil.parse("profile@alice")[0], KeyType.SELF_KEY)
+
+    def test_lazy_metadata(self):
+        """Test an AtKey's metadata is only created when used, and then belongs to that key alone"""
+        first = Keys.from_string("cached:public:publickey@bob")
+        second = Keys.from_string("cached:public:publickey@bob")
+        self.assertIsInstance(first._metadata, dict)
+        self.assertEqual(str(first), "public:publickey@bob")
+        self.assertIsInstance(first._metadata, dict)
+        self.assertTrue(first.metadata.is_public and first.metadata.is_cached)
+        first.set_time_to_live(10)
+        self.assertEqual((first.metadata.ttl, second.metadata.ttl), (10, 0))
+        self.assertFalse(PublicKey("other", first.shared_by).metadata.is_cached)
+        self.assertFalse(hasattr(first, "__dict__") or hasattr(first.metadata, "__dict__"))
+
+    def test_at_key_list(self):
+        """Test an AtKeyList gives the same keys as a list of the parsed key strings"""
+        keys = AtKeyList(self.KEYS[:10])
+        keys.append("@bob:émoji.wavi@alice")
+        self.assertEqual(len(keys), 11)
+        self.assertEqual(list(keys.key_strings()), self.KEYS[:10] + ["@bob:émoji.wavi@alice"])
+        self.assertEqual([str(key) for key in keys], [str(Keys.from_string(key)) for key in keys.key_strings()])
+        self.assertEqual(str(keys[-1]), "@bob:émoji.wavi@alice")
+        self.assertEqual(keys.key_string(1), "public:publickey@alice")
+        self.assertEqual(list(keys[2:4].key_strings()), self.KEYS[2:4])
+        self.assertIn("profile@alice", keys)
+        self.assertIn(Keys.from_string("profile@alice"), keys)
+        self.assertNotIn("profile@bob", keys)
+        self.assertRaises(IndexError, keys.key_string, 11)
+
+
+if __name__ == '__main__':
+    unittest.main()
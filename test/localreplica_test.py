@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+from at_client.util import LocalReplica
+
+
+class LocalReplicaTest(unittest.TestCase):
+    def test_apply(self):
+        """Test commit log entries are applied in order and the last commit id is advanced"""
+        replica = LocalReplica(":memory:", "@alice")
+        self.assertEqual(replica.last_commit_id, -1)
+        replica.apply([
+            {"atKey": "test@alice", "value": "value1", "metadata": {"ttl": "0", "isEncrypted": "true"}, "commitId": 0, "operation": "+"},
+            {"atKey": "public:test@alice", "value": "value2", "metadata": {}, "commitId": 1, "operation": "*"},
+            {"atKey": "test@alice", "value": "value3", "metadata": {}, "commitId": 2, "operation": "+"},
+            {"atKey": "public:test@alice", "value": None, "metadata": None, "commitId": 3, "operation": "-"},
+        ])
+        self.assertEqual(replica.last_commit_id, 3)
+        self.assertEqual(replica.get("test@alice"), ("value3", {}))
+        self.assertIsNone(replica.get("public:test@alice"))
+        self.assertEqual(replica.scan(), ["test@alice"])
+
+    def test_metadata(self):
+        """Test metadata from the commit log is normalized and expired keys are ignored"""
+        replica = LocalReplica(":memory:", "@alice")
+        replica.apply([
+            {"atKey": "test@alice", "value": "value", "metadata": {"ttl": "1000", "isBinary": "false"}, "commitId": 0, "operation": "+"},
+            {"atKey": "expired@alice", "value": "value", "metadata": {"expiresAt": "2020-01-01 00:00:00.000Z"}, "commitId": 1, "operation": "+"},
+        ])
+        self.assertEqual(replica.get("TEST@alice")[1], {"ttl": 1000, "isBinary": False})
+        self.assertIsNone(replica.get("expired@alice"))
+        self.assertEqual(replica.scan("@alice$"), ["test@alice"])
+
+    def test_local_changes(self):
+        """Test keys changed since the last sync are not returned until a sync applies the change"""
+        replica = LocalReplica(":memory:", "@alice")
+        replica.apply([{"atKey": "a@alice", "value": "1", "metadata": {}, "commitId": 0, "operation": "+"},
+                       {"atKey": "b@alice", "value": "2", "metadata": {}, "commitId": 1, "operation": "+"}])
+        replica.mark_stale("a@alice", 4)
+        replica.mark_stale("c@alice", 5)
+        replica.remove("b@alice", 6)
+        self.assertEqual(replica.get("a@alice"), (None, None))
+        self.assertIsNone(replica.get("b@alice"))
+        self.assertEqual(replica.scan(), ["a@alice", "c@alice"])
+
+        # Earlier entries do not overwrite the local changes, later ones do
+        replica.apply([{"atKey": "a@alice", "value": "old", "metadata": {}, "commitId": 2, "operation": "+"},
+                       {"atKey": "b@alice", "value": "old", "metadata": {}, "commitId": 3, "operation": "+"},
+                       {"atKey": "a@alice", "value": "3", "metadata": {}, "commitId": 4, "operation": "+"}])
+        self.assertEqual(replica.get("a@alice"), ("3", {}))
+        self.assertIsNone(replica.get("b@alice"))
+        self.assertEqual(len(replica), 2)
+
+    def test_other_atsign(self):
+        """Test a replica of another atSign's keystore is cleared when opened"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "replica.db")
+            replica = LocalReplica(path, "@alice")
+            replica.apply([{"atKey": "a@alice", "value": "1", "metadata": {}, "commitId": 0, "operation": "+"}])
+            replica.close()
+            replica = LocalReplica(path, "@alice")
+            self.assertEqual((len(replica), replica.last_commit_id), (1, 0))
+            replica.close()
+            replica = LocalReplica(path, "@bob")
+            self.assertEqual((len(replica), replica.last_commit_id), (0, -1))
+            replica.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import time
+import unittest
+
+from at_client.util import LRUCache
+
+
+class LRUCacheTest(unittest.TestCase):
+    def test_get_put(self):
+        """Test cached values are returned and hits and misses are counted"""
+        cache = LRUCache(max_size=2)
+        self.assertIsNone(cache.get("@bob"))
+        cache.put("@bob", "key1")
+        self.assertEqual(cache.get("@bob"), "key1")
+        cache.put("@bob", "key2")
+        self.assertEqual(cache.get("@bob"), "key2")
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_eviction(self):
+        """Test the least recently used entry is evicted when the cache is full"""
+        cache = LRUCache(max_size=2)
+        cache.put("@alice", 1)
+        cache.put("@bob", 2)
+        cache.get("@alice")
+        cache.put("@carol", 3)
+        self.assertNotIn("@bob", cache)
+        self.assertIn("@alice", cache)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_invalidate(self):
+        """Test invalidated entries are no longer returned"""
+        cache = LRUCache()
+        cache.put("@bob", "key")
+        cache.invalidate("@bob")
+        cache.invalidate("@carol")
+        self.assertIsNone(cache.get("@bob"))
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_ttl(self):
+        """Test entries expire after the cache's ttl or their own"""
+        cache = LRUCache(ttl=60)
+        cache.put("@bob", "key")
+        cache.put("@unknown", None, ttl=0.01)
+        self.assertEqual(cache.get("@unknown", "missing"), None)
+        time.sleep(0.02)
+        self.assertEqual(cache.get("@unknown", "missing"), "missing")
+        self.assertEqual(cache.get("@bob"), "key")
+        self.assertEqual(cache.expirations, 1)
+
+    def test_max_bytes(self):
+        """Test entries are evicted to keep the total size within max_bytes"""
+        cache = LRUCache(max_bytes=10, sizeof=len)
+        cache.put("a", "12345")
+        cache.put("b", "1234")
+        cache.put("c", "123")
+        self.assertNotIn("a", cache)
+        self.assertEqual(cache.stats()["bytes"], 7)
+        cache.put("d", "12345678901")
+        self.assertNotIn("d", cache)
+        cache.put("b", "1")
+        self.assertEqual(cache.bytes, 4)
+        with self.assertRaises(ValueError):
+            LRUCache(max_bytes=10)
+
+
+if __name__ == '__main__':
+    unittest.main()
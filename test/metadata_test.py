@@ -0,0 +1,51 @@
+import json
+import unittest
+
+from dateutil.parser import parse
+
+from at_client.common.metadata import Metadata
+
+
+class MetadataTest(unittest.TestCase):
+    META = {"createdBy": "@alice", "createdAt": "2023-08-16T12:34:56.789Z", "updatedAt": "2023-08-17 01:02:03.123456Z",
+            "availableAt": "2023-08-16T12:34:56Z", "expiresAt": "2023-08-18T12:00:00.000+05:30", "refreshAt": None,
+            "ttl": 60000, "version": 2, "isPublic": False, "isEncrypted": True, "sharedKeyEnc": "abc"}
+
+    def test_parse_datetime(self):
+        """Test timestamps parsed by fromisoformat are the same as those dateutil parses, which parses the others"""
+        for timestamp in ["2023-08-16T12:34:56.789Z", "2023-08-16T12:34:56.7Z", "2023-08-16 12:34:56", "2023-08-16",
+                          "2023-08-18T12:00:00.000+05:30", "Aug 16 2023 12:34:56 UTC"]:
+            self.assertEqual(Metadata.parse_datetime(timestamp), parse(timestamp), timestamp)
+        self.assertIsNone(Metadata.parse_datetime(None))
+        self.assertRaises(ValueError, Metadata.parse_datetime, "not a timestamp")
+
+    def test_lazy(self):
+        """Test lazily decoded metadata equals decoded metadata, and only decodes the fields used"""
+        metadata = Metadata.from_json(json.dumps(self.META), lazy=True)
+        self.assertEqual(metadata._peek("created_at"), (False, "2023-08-16T12:34:56.789Z"))
+        self.assertEqual(metadata.created_at, parse("2023-08-16T12:34:56.789Z"))
+        self.assertEqual(metadata._peek("created_at"), (True, parse("2023-08-16T12:34:56.789Z")))
+        metadata.ttl = 10
+        self.assertEqual(metadata.ttl, 10)
+        metadata.ttl = 60000
+        self.assertEqual(metadata, Metadata.from_json(json.dumps(self.META)))
+        self.assertEqual(Metadata.from_dict(self.META, lazy=True), Metadata.from_dict(self.META))
+        self.assertIsNone(Metadata.from_json("{}", lazy=True).ttl)
+        self.assertEqual(Metadata.from_dict({}, lazy=True).ttl, 0)
+        self.assertRaises(AttributeError, getattr, metadata, "missing")
+
+    def test_squash(self):
+        """Test squashing lazily decoded metadata gives the same metadata, leaving the fields not used undecoded"""
+        key_metadata = Metadata(is_public=False, is_cached=True)
+        eager = Metadata.squash(key_metadata, Metadata.from_json(json.dumps(self.META)))
+        lazy = Metadata.squash(key_metadata, Metadata.from_json(json.dumps(self.META), lazy=True))
+        self.assertFalse(lazy._peek("updated_at")[0])
+        self.assertEqual(lazy, eager)
+        self.assertEqual((eager.created_by, eager.version, eager.shared_key_enc), (None, 0, "abc"))
+        first = Metadata.squash(Metadata.from_dict(self.META, lazy=True), key_metadata)
+        self.assertEqual(first, Metadata.squash(Metadata.from_dict(self.META), key_metadata))
+        self.assertEqual(Metadata.squash(Metadata(), Metadata()), Metadata())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+from at_client.common import AtSign
+from at_client.connections import Address, FileCheckpointStore, MemoryCheckpointStore, MonitorCheckpoint, MonitorSession
+from at_client.connections.notification.atevents import AtEvent, AtEventType
+
+
+def notification(notification_id, epoch_millis):
+    return AtEvent(AtEventType.UPDATE_NOTIFICATION, {"id": notification_id, "key": "@alice:test@bob", "epochMillis": epoch_millis})
+
+
+class MonitorCheckpointTest(unittest.TestCase):
+    def test_ack(self):
+        """Test the checkpoint only advances past notifications once every earlier one has been acknowledged"""
+        store = MemoryCheckpointStore()
+        checkpoint = MonitorCheckpoint(store, "@alice")
+        first, second, third = notification("1", 100), notification("2", 200), notification("3", 300)
+        for at_event in (first, second, third):
+            checkpoint.delivered(at_event)
+        self.assertIsNone(store.load("@alice"))
+
+        checkpoint.ack(second)
+        self.assertEqual(store.load("@alice"), {"lastReceivedTime": 99, "recentIds": ["2"]})
+        checkpoint.ack(AtEvent(AtEventType.DECRYPTED_UPDATE_NOTIFICATION, dict(first.event_data)))
+        self.assertEqual(store.load("@alice"), {"lastReceivedTime": 200, "recentIds": ["2", "1"]})
+        checkpoint.ack(AtEvent(AtEventType.MONITOR_HEARTBEAT_ACK, {}))
+        checkpoint.ack(third)
+        checkpoint.ack(third)
+        self.assertEqual(store.load("@alice"), {"lastReceivedTime": 300, "recentIds": ["2", "1", "3"]})
+
+    def test_commit_interval(self):
+        """Test acknowledgements made within the commit interval are saved by commit()"""
+        store = MemoryCheckpointStore()
+        checkpoint = MonitorCheckpoint(store, "@alice", recent_ids_size=2, commit_interval=60)
+        for index in range(1, 4):
+            at_event = notification(str(index), index * 100)
+            checkpoint.delivered(at_event)
+            checkpoint.ack(at_event)
+        self.assertEqual(store.load("@alice")["lastReceivedTime"], 100)
+        checkpoint.commit()
+        self.assertEqual(store.load("@alice"), {"lastReceivedTime": 300, "recentIds": ["2", "3"]})
+
+    def test_resume(self):
+        """Test a monitor session resumes from the checkpoint saved in a file by a previous one"""
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = MonitorCheckpoint(FileCheckpointStore(directory), "@alice")
+            at_event = notification("1", 1234)
+            checkpoint.delivered(at_event)
+            checkpoint.ack(at_event)
+            self.assertEqual(os.listdir(directory), ["@alice_monitor.json"])
+
+            checkpoint = MonitorCheckpoint(FileCheckpointStore(directory), "@alice")
+            session = MonitorSession(AtSign("@alice"), {}, Address("localhost", 6464), None, checkpoint=checkpoint)
+            self.assertEqual(session.last_received_time, 1234)
+            self.assertIn("1", session.recent_ids)
+            self.assertIsNone(FileCheckpointStore(directory).load("@bob"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import queue
+import selectors
+import socket
+import time
+import unittest
+
+from at_client.common import AtSign
+from at_client.connections import Address, AtEventQueue, AtEventType, MonitorEngine, MonitorSession
+
+
+class MonitorEngineTest(unittest.TestCase):
+    def engine(self, **kwargs):
+        engine = MonitorEngine(**kwargs)
+        self.addCleanup(engine.close)
+        return engine
+
+    def socketpair(self):
+        ends = socket.socketpair()
+        for end in ends:
+            self.addCleanup(end.close)
+        return ends
+
+    def test_handle_line(self):
+        """Test lines received while monitoring are parsed into events for the session's queue"""
+        engine = self.engine()
+        events = queue.Queue()
+        session = MonitorSession(AtSign("@alice"), {}, Address("localhost", 6464), events)
+        session.state = MonitorSession.MONITORING
+
+        engine._handle_line(session, b'notification: {"id":"1","operation":"update","key":"@alice:test@bob","epochMillis":1234}')
+        engine._handle_line(session, b"data:ok")
+        self.assertEqual(events.get_nowait().event_type, AtEventType.UPDATE_NOTIFICATION)
+        self.assertEqual(events.get_nowait().event_type, AtEventType.MONITOR_HEARTBEAT_ACK)
+        self.assertEqual(session.last_received_time, 1234)
+        self.assertGreater(session._last_heartbeat_ack_time, 0)
+
+    def test_duplicates(self):
+        """Test a notification received again with the same id is only delivered once"""
+        engine = self.engine()
+        events = queue.Queue()
+        session = MonitorSession(AtSign("@alice"), {}, Address("localhost", 6464), events)
+        session.state = MonitorSession.MONITORING
+
+        line = b'notification: {"id":"1","operation":"update","key":"@alice:test@bob","epochMillis":1234}'
+        engine._handle_line(session, line)
+        engine._handle_line(session, line)
+        engine._handle_line(session, b"data:ok")
+        engine._handle_line(session, b"data:ok")
+        self.assertEqual(events.qsize(), 3)
+        self.assertEqual(session.duplicates, 1)
+
+    def test_session_not_monitoring(self):
+        """Test lines received before monitoring has started are not delivered"""
+        engine = self.engine()
+        events = queue.Queue()
+        session = MonitorSession(AtSign("@alice"), {}, Address("localhost", 6464), events)
+        session.state = MonitorSession.HANDSHAKING
+        engine._handle_line(session, b'notification: {"id":"1","operation":"delete","key":"@alice:test@bob"}')
+        self.assertTrue(events.empty())
+
+    def test_backpressure(self):
+        """Test a session whose queue is full stops being read until its events have been delivered"""
+        engine = self.engine()
+        events = AtEventQueue(maxsize=1)
+        session = MonitorSession(AtSign("@alice"), {}, Address("localhost", 6464), events)
+        session.state = MonitorSession.MONITORING
+        session._socket, other = self.socketpair()
+        engine._selector.register(session._socket, selectors.EVENT_READ, session)
+
+        session._in_buffer += b"data:ok\ndata:ok\ndata:ok\n"
+        engine._process_lines(session)
+        self.assertTrue(session._paused)
+        self.assertNotIn(session._socket, engine._selector.get_map())
+        self.assertEqual((events.qsize(), len(session._pending), len(session._in_buffer)), (1, 1, len(b"data:ok\n")))
+
+        events.get_nowait()
+        engine._resume(session)
+        self.assertTrue(session._paused)
+        events.get_nowait()
+        engine._resume(session)
+        self.assertFalse(session._paused)
+        self.assertIn(session._socket, engine._selector.get_map())
+        self.assertEqual((events.qsize(), len(session._pending), len(session._in_buffer)), (1, 0, 0))
+
+    def test_reconnect_with_pending_events(self):
+        """Test events still waiting for room in the queue when the connection was lost are delivered after reconnecting"""
+        engine = self.engine(heartbeat_interval=0.04)
+        events = AtEventQueue(maxsize=1)
+        session = MonitorSession(AtSign("@alice"), {}, Address("localhost", 6464), events)
+        session.state = MonitorSession.MONITORING
+        session._socket, other = self.socketpair()
+        engine._selector.register(session._socket, selectors.EVENT_READ, session)
+        session._in_buffer += b"data:ok\ndata:ok\n"
+        engine._process_lines(session)
+        self.assertEqual((events.qsize(), len(session._pending)), (1, 1))
+        other.close()
+        engine._close(session)
+
+        listener = socket.create_server(("localhost", 0))
+        self.addCleanup(listener.close)
+        session.address = Address("localhost", listener.getsockname()[1])
+        engine._connect(session)
+        self.assertFalse(session._paused)
+        events.get_nowait()
+        time.sleep(0.03)
+        engine._timers.advance()
+        self.assertEqual((events.qsize(), len(session._pending)), (1, 0))
+        self.assertIn(session._socket, engine._selector.get_map())
+        engine._close(session)
+
+
+if __name__ == '__main__':
+    unittest.main()
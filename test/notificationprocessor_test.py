@@ -0,0 +1,100 @@
+import queue
+import threading
+import time
+import unittest
+
+from at_client import NotificationProcessor
+from at_client.connections import SubscriptionRouter
+from at_client.connections.notification.atevents import AtEvent, AtEventType
+
+
+class RecordingClient:
+    """Stands in for AtClient, recording the events handled and failing those for keys starting with 'bad'."""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.handled = []
+        self.acked = []
+        self._lock = threading.Lock()
+
+    def handle_event(self, queue, at_event):
+        time.sleep(0.001)
+        with self._lock:
+            self.handled.append((at_event.event_data["key"], at_event.event_data.get("id")))
+        return not at_event.event_data["key"].startswith("bad")
+
+    def ack(self, at_event):
+        with self._lock:
+            self.acked.append((at_event.event_data["key"], at_event.event_data.get("id")))
+
+
+class NotificationProcessorTest(unittest.TestCase):
+    def test_ordering(self):
+        """Test events for the same key are handled in the order they were submitted"""
+        client = RecordingClient()
+        processor = NotificationProcessor(client, workers=4)
+        for index in range(50):
+            for key in ("a", "b", "c"):
+                processor.submit(AtEvent(AtEventType.UPDATE_NOTIFICATION, {"key": key, "id": index, "value": "v"}))
+        processor.join()
+        for key in ("a", "b", "c"):
+            self.assertEqual([index for handled_key, index in client.handled if handled_key == key], list(range(50)))
+        processor.stop()
+
+    def test_coalesce_window(self):
+        """Test notifications for a key received within the coalescing window are handled once, as the latest"""
+        client = RecordingClient()
+        processor = NotificationProcessor(client, workers=2, coalesce_window=0.2)
+        for index in range(10):
+            processor.submit(AtEvent(AtEventType.UPDATE_NOTIFICATION, {"key": "a", "id": index, "value": "v"}))
+        processor.submit(AtEvent(AtEventType.DELETE_NOTIFICATION, {"key": "b", "id": 0}))
+        self.assertEqual(client.handled, [])
+        processor.join()
+        self.assertEqual(sorted(client.handled), [("a", 9), ("b", 0)])
+        self.assertEqual(sorted(client.acked), [("a", index) for index in range(9)] + [("b", 0)])
+        processor.submit(AtEvent(AtEventType.UPDATE_NOTIFICATION, {"key": "a", "id": 10, "value": "v"}))
+        processor.stop()
+        self.assertEqual(client.handled[-1], ("a", 10))
+        stats = processor.stats()
+        self.assertEqual((stats["submitted"], stats["coalesced"], stats["processed"], stats["backlog"]), (12, 9, 3, 0))
+
+    def test_stats(self):
+        """Test events are counted and events the workers have nothing to do for are not queued"""
+        client = RecordingClient()
+        processor = NotificationProcessor(client, workers=2, ordering=None)
+        self.assertFalse(processor.submit(AtEvent(AtEventType.MONITOR_HEARTBEAT_ACK, {"key": "__heartbeat__"})))
+        self.assertTrue(processor.submit(AtEvent(AtEventType.UPDATE_NOTIFICATION, {"key": "good", "value": "v"})))
+        self.assertTrue(processor.submit(AtEvent(AtEventType.DELETE_NOTIFICATION, {"key": "bad"})))
+        processor.stop()
+        stats = processor.stats()
+        self.assertEqual((stats["submitted"], stats["processed"], stats["failed"], stats["backlog"]), (2, 2, 1, 0))
+        self.assertEqual(processor.output_queue, client.queue)
+        self.assertEqual(client.acked, [("bad", None)])
+
+    def test_update_without_value(self):
+        """Test update notifications without a value, which put nothing on the output queue, are acknowledged"""
+        client = RecordingClient()
+        processor = NotificationProcessor(client, workers=1)
+        processor.submit(AtEvent(AtEventType.UPDATE_NOTIFICATION, {"key": "a", "id": 1, "value": None}))
+        processor.submit(AtEvent(AtEventType.UPDATE_NOTIFICATION, {"key": "a", "id": 2, "value": "v"}))
+        processor.stop()
+        self.assertEqual(client.handled, [("a", 1), ("a", 2)])
+        self.assertEqual(client.acked, [("a", 1)])
+
+
+    def test_router_output(self):
+        """Test notifications dispatched by a SubscriptionRouter output queue are acknowledged after their handlers"""
+        client = RecordingClient()
+        client.handle_event = lambda queue, at_event: queue.put(at_event)
+        router = SubscriptionRouter()
+        acked_when_dispatched = []
+        router.subscribe(lambda at_event: acked_when_dispatched.append(list(client.acked)))
+        processor = NotificationProcessor(client, workers=1, output_queue=router)
+        processor.submit(AtEvent(AtEventType.UPDATE_NOTIFICATION, {"key": "a", "id": 1, "value": "v"}))
+        processor.submit(AtEvent(AtEventType.UPDATE_NOTIFICATION, {"key": "a", "id": 2, "value": "v"}))
+        processor.stop()
+        self.assertEqual(acked_when_dispatched, [[], [("a", 1)]])
+        self.assertEqual(client.acked, [("a", 1), ("a", 2)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import contextlib, io, os, tempfile, time, unittest
+
+from at_client.common import AtSign
+from at_client.connections import Address, SecondaryAddressCache
+
+
+class SecondaryAddressCacheTest(unittest.TestCase):
+    def test_get_put(self):
+        """Test cached addresses are returned until they are invalidated"""
+        cache = SecondaryAddressCache()
+        atsign = AtSign("@alice")
+        self.assertIsNone(cache.get(atsign))
+        cache.put(atsign, Address("alice.example.com", 6464))
+        self.assertEqual(str(cache.get(atsign)), "alice.example.com:6464")
+        cache.invalidate(atsign)
+        self.assertIsNone(cache.get(atsign))
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_ttl(self):
+        """Test cached addresses expire"""
+        cache = SecondaryAddressCache(ttl=0.01)
+        cache.put(AtSign("@alice"), Address("alice.example.com", 6464))
+        time.sleep(0.02)
+        self.assertIsNone(cache.get(AtSign("@alice")))
+
+    def test_persistence(self):
+        """Test cached addresses are saved to and loaded from the cache file"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache", "secondaries.json")
+            SecondaryAddressCache(path=path).put(AtSign("@alice"), Address("alice.example.com", 6464))
+            self.assertEqual(str(SecondaryAddressCache(path=path).get(AtSign("@alice"))), "alice.example.com:6464")
+
+            SecondaryAddressCache(path=path).invalidate(AtSign("@alice"))
+            self.assertIsNone(SecondaryAddressCache(path=path).get(AtSign("@alice")))
+
+            with open(path, "w") as f:
+                f.write("not json")
+            self.assertIsNone(SecondaryAddressCache(path=path).get(AtSign("@alice")))
+
+    def test_unwritable_path(self):
+        """Test addresses are still cached in memory, silently, when the cache file can't be saved"""
+        with tempfile.TemporaryDirectory() as directory:
+            not_a_directory = os.path.join(directory, "file")
+            open(not_a_directory, "w").close()
+            cache = SecondaryAddressCache(path=os.path.join(not_a_directory, "secondaries.json"))
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                cache.put(AtSign("@alice"), Address("alice.example.com", 6464))
+            self.assertEqual(output.getvalue(), "")
+            self.assertEqual(str(cache.get(AtSign("@alice"))), "alice.example.com:6464")
+            self.assertEqual(os.listdir(directory), ["file"])
+
+    def test_get_instance(self):
+        """Test settings given to get_instance are applied to the shared cache, and those not given are kept"""
+        instance = SecondaryAddressCache._SecondaryAddressCache__instance
+        SecondaryAddressCache._SecondaryAddressCache__instance = None
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "secondaries.json")
+                SecondaryAddressCache(path=path).put(AtSign("@bob"), Address("bob.example.com", 6464))
+                cache = SecondaryAddressCache.get_instance()
+                self.assertEqual((cache.ttl, cache.path), (3600.0, None))
+                cache.put(AtSign("@alice"), Address("alice.example.com", 6464))
+
+                self.assertIs(SecondaryAddressCache.get_instance(ttl=60.0, path=path), cache)
+                self.assertEqual((cache.ttl, cache.path), (60.0, path))
+                self.assertEqual(str(cache.get(AtSign("@bob"))), "bob.example.com:6464")
+                self.assertEqual(str(SecondaryAddressCache(path=path).get(AtSign("@alice"))), "alice.example.com:6464")
+
+                SecondaryAddressCache.get_instance()
+                self.assertEqual((cache.ttl, cache.path), (60.0, path))
+        finally:
+            SecondaryAddressCache._SecondaryAddressCache__instance = instance
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+
+from at_client.util.socketutil import SocketUtil
+
+
+class FakeSocket:
+    """Serves a fixed byte string, at most chunk_size bytes per receive call."""
+
+    def __init__(self, data: bytes, chunk_size: int = 16384):
+        self._data = data
+        self._position = 0
+        self._chunk_size = chunk_size
+        self.calls = 0
+
+    def recv_into(self, buffer, nbytes: int = 0):
+        self.calls += 1
+        size = min(nbytes or len(buffer), len(buffer), self._chunk_size, len(self._data) - self._position)
+        buffer[:size] = self._data[self._position:self._position + size]
+        self._position += size
+        return size
+
+
+class SocketUtilTest(unittest.TestCase):
+
+    def test_readline(self):
+        """Test lines are split on newline regardless of how the data is chunked."""
+        data = b"notification: first\nnotification: second\ntail"
+        for chunk_size in (1, 3, 1024):
+            reader = SocketUtil(FakeSocket(data, chunk_size))
+            self.assertEqual(reader.readline(), b"notification: first\n")
+            self.assertEqual(reader.readline(), b"notification: second\n")
+            self.assertEqual(reader.readline(), b"tail")
+            self.assertEqual(reader.readline(), b"")
+
+    def test_readline_large_line_uses_few_reads(self):
+        """Test a large line is received in buffer sized reads rather than byte by byte."""
+        payload = b"notification: " + b"x" * 4096 + b"\n"
+        sock = FakeSocket(payload)
+        reader = SocketUtil(sock)
+        self.assertEqual(reader.readline(), payload)
+        self.assertEqual(sock.calls, 1)
+
+    def test_read_prompt(self):
+        """Test the greeting prompt is read on its own."""
+        reader = SocketUtil(FakeSocket(b"@"))
+        self.assertEqual(reader.read_prompt(), b"@")
+
+    def test_read_response_skips_prompts(self):
+        """Test prompts before and after responses are not returned as part of them."""
+        data = b"data:challenge\n@data:success\n@alice@data:1\n@alice@error:AT0015-key not found : x\n@alice@"
+        for chunk_size in (1, 5, 1024):
+            reader = SocketUtil(FakeSocket(data, chunk_size))
+            self.assertEqual(reader.read_response(), b"data:challenge\n")
+            self.assertEqual(reader.read_response(), b"data:success\n")
+            self.assertEqual(reader.read_response(), b"data:1\n")
+            self.assertEqual(reader.read_response(), b"error:AT0015-key not found : x\n")
+            self.assertEqual(reader.read_response(), b"")
+
+    def test_read_response_keeps_data_containing_at_signs(self):
+        """Test data that merely starts with an atSign is not mistaken for a prompt."""
+        reader = SocketUtil(FakeSocket(b"@alice@data:[\"@bob:key@alice\"]\n@alice@"))
+        self.assertEqual(reader.read_response(), b"data:[\"@bob:key@alice\"]\n")
+
+    def test_iter_response(self):
+        """Test a response read in pieces is the same as when read whole, and the next one is read after it."""
+        data = b"@alice@data:[\"@bob:key@alice\",\"public:publickey@alice\"]\n@alice@data:ok\n@alice@"
+        for chunk_size in (1, 7, 1024):
+            reader = SocketUtil(FakeSocket(data, chunk_size))
+            pieces = list(reader.iter_response())
+            self.assertEqual(b"".join(pieces), b"data:[\"@bob:key@alice\",\"public:publickey@alice\"]\n")
+            self.assertEqual(len(pieces) > 1, chunk_size < 32)
+            self.assertEqual(reader.read_response(), b"data:ok\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,315 @@
+"""
+A local stand-in for an atServer secondary, served over TLS with a self-signed certificate, for testing and
+benchmarking AtClient without a real atSign or network.
+
+It implements the verbs AtClient uses for keys, notifications and its local replica: from, pkam, noop, scan, update,
+delete, llookup, lookup, plookup, monitor, stats and sync. It keeps every atSign's keys in memory and accepts any pkam signature. When a key shared
+with an atSign is updated or deleted, its monitors are sent a notification, as a real atServer would be when the
+sender notifies.
+"""
+import datetime
+import json
+import os
+import re
+import shutil
+import socket
+import ssl
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+
+from at_client.connections import Address
+from at_client.util import KeysUtil, OnboardingUtil
+
+# The metadata update commands may carry before the key, each followed by its value
+UPDATE_METADATA = frozenset(["ttl", "ttb", "ttr", "ccd", "dataSignature", "sharedKeyStatus", "sharedKeyEnc", "pubKeyCS",
+                             "isBinary", "isEncrypted", "encoding", "ivNonce"])
+_LOOKUP = re.compile(r"^(llookup|lookup|plookup):(?:(meta|all):)?(.+)$")
+_SYNC = re.compile(r"^sync:from:(-?\d+)(?::limit:(\d+))?$")
+
+
+def _self_signed_certificate(directory:str):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+                   .serial_number(x509.random_serial_number())
+                   .not_valid_before(now - datetime.timedelta(days=1)).not_valid_after(now + datetime.timedelta(days=1))
+                   .add_extension(x509.SubjectAlternativeName([x509.DNSName("localhost")]), critical=False)
+                   .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+                   .sign(key, hashes.SHA256()))
+    certificate_file = os.path.join(directory, "cert.pem")
+    key_file = os.path.join(directory, "key.pem")
+    with open(certificate_file, "wb") as file:
+        file.write(certificate.public_bytes(serialization.Encoding.PEM))
+    with open(key_file, "wb") as file:
+        file.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                     serialization.NoEncryption()))
+    return certificate_file, key_file
+
+
+def _timestamp(epoch_millis:int) -> str:
+    # The atServer's format, e.g. "2024-01-02 03:04:05.678Z"
+    moment = datetime.datetime.fromtimestamp(epoch_millis / 1000, datetime.timezone.utc)
+    return moment.strftime("%Y-%m-%d %H:%M:%S.") + f"{moment.microsecond // 1000:03d}Z"
+
+
+class _Session:
+    """
+    One client connection, and the atSign it is authenticated as.
+    """
+
+    def __init__(self, connection:ssl.SSLSocket):
+        self.connection = connection
+        self.atsign = None
+        self.authenticated = False
+        self.monitor_regex = None
+        # Notifications are sent from the threads of other sessions
+        self._send_lock = threading.Lock()
+
+    def send(self, data:str):
+        with self._send_lock:
+            self.connection.sendall(data.encode())
+
+    def respond(self, response:str):
+        self.send(response + "\n" + (f"{self.atsign}@" if self.authenticated else "@"))
+
+
+class StubSecondary:
+    """
+    A local TLS server answering atProtocol verbs from memory, for any number of atSigns.
+    """
+
+    def __init__(self, latency:float=0.0):
+        """
+        Initialize the StubSecondary object and start serving on a free port of localhost.
+
+        Parameters
+        ----------
+        latency : float, optional
+            The number of seconds each command waits before it is answered, to stand in for a network round trip
+            (default is 0).
+        """
+        self.latency = latency
+        self.directory = tempfile.mkdtemp(prefix="stubsecondary.")
+        self._certificate_file, key_file = _self_signed_certificate(self.directory)
+        self._server_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        self._server_context.load_cert_chain(self._certificate_file, key_file)
+        # Keys as they would be named in scan results, with (value, metadata, epochMillis of the last update)
+        self.store = OrderedDict()
+        self.commands = {}
+        # Each atSign's commit log, as the entries the sync verb returns; an entry's commitId is its index
+        self.commit_logs = {}
+        # Called with each command before it is handled, e.g. to interleave other operations with it in tests
+        self.before_command = None
+        self._monitors = {}
+        self._lock = threading.Lock()
+        self._listener = socket.create_server(("localhost", 0), backlog=128)
+        self.address = Address("localhost", self._listener.getsockname()[1])
+        self._running = True
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def client_context(self) -> ssl.SSLContext:
+        """
+        Return an SSL context which trusts the server's certificate, to pass to AtClient and MonitorEngine.
+        """
+        context = ssl.create_default_context()
+        context.load_verify_locations(self._certificate_file)
+        return context
+
+    def onboard(self, atsign:str) -> dict:
+        """
+        Create keys for atsign, save them where KeysUtil looks for them, so that AtClient can load them, and publish
+        its public encryption key.
+
+        Returns
+        -------
+        dict
+            The keys, as KeysUtil.load_keys would return them.
+        """
+        keys = OrderedDict()
+        OnboardingUtil.generate_encryption_keypair(keys)
+        OnboardingUtil.generate_pkam_keypair(keys)
+        OnboardingUtil.generate_self_encryption_key(keys)
+        KeysUtil.save_keys(atsign, keys)
+        self.publish_public_key(atsign, keys[KeysUtil.encryption_public_key_name])
+        return keys
+
+    def publish_public_key(self, atsign:str, public_key:str):
+        """
+        Make public_key the public encryption key of atsign, e.g. for an atSign which only receives keys.
+        """
+        with self._lock:
+            self.store[f"public:publickey{atsign}"] = (public_key, {"isEncrypted": "false"}, int(time.time() * 1000))
+
+    def stop(self):
+        """
+        Stop accepting connections and remove the certificate.
+        """
+        self._running = False
+        self._listener.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _accept(self):
+        while self._running:
+            try:
+                connection, _ = self._listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _serve(self, connection:socket.socket):
+        session = None
+        try:
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            session = _Session(self._server_context.wrap_socket(connection, server_side=True))
+            session.send("@")
+            for line in session.connection.makefile("rb"):
+                command = line.decode().rstrip("\r\n")
+                if not command:
+                    continue
+                verb = re.split("[: ]", command, 1)[0]
+                with self._lock:
+                    self.commands[verb] = self.commands.get(verb, 0) + 1
+                if self.latency:
+                    time.sleep(self.latency)
+                if self.before_command is not None:
+                    self.before_command(command)
+                response = self._handle(session, command)
+                if response is not None:
+                    session.respond(response)
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self._lock:
+                for monitors in self._monitors.values():
+                    if session in monitors:
+                        monitors.remove(session)
+            (session.connection if session is not None else connection).close()
+
+    def _handle(self, session:_Session, command:str) -> str:
+        if command.startswith("from:"):
+            session.atsign = command[len("from:"):].strip()
+            return "data:" + str(uuid.uuid4())
+        if command.startswith("pkam:"):
+            session.authenticated = True
+            return "data:success"
+        if command.startswith("noop:"):
+            return "data:ok"
+        if not session.authenticated:
+            return "error:AT0401-Client authentication failed : please authenticate"
+        if command.startswith("monitor"):
+            _, _, regex = command.partition(" ")
+            session.monitor_regex = re.compile(regex) if regex.strip() else None
+            with self._lock:
+                self._monitors.setdefault(session.atsign, []).append(session)
+            return None
+        if command.startswith("scan"):
+            _, _, regex = command.partition(" ")
+            pattern = re.compile(regex) if regex.strip() else None
+            with self._lock:
+                keys = [key for key in self.store
+                        if key.endswith(session.atsign) and (pattern is None or pattern.search(key) is not None)]
+            return "data:" + json.dumps(keys)
+        if command.startswith("update:"):
+            return self._update(session, command)
+        if command.startswith("delete:"):
+            key = command[len("delete:"):]
+            with self._lock:
+                if self.store.pop(key, None) is None:
+                    return f"error:AT0015-key not found : {key} does not exist"
+                commit_id = self._commit(session.atsign, key, "-", None, None)
+            self._notify(key, "delete", None)
+            return f"data:{commit_id}"
+        if command == "stats" or command.startswith("stats:"):
+            with self._lock:
+                last_commit_id = len(self.commit_logs.get(session.atsign, ())) - 1
+            return "data:" + json.dumps([{"id": "3", "name": "lastCommitID", "value": str(last_commit_id)}])
+        match = _SYNC.match(command)
+        if match is not None:
+            from_commit_id, limit = int(match.group(1)), match.group(2)
+            with self._lock:
+                entries = self.commit_logs.get(session.atsign, [])[from_commit_id + 1:]
+            return "data:" + json.dumps(entries[:int(limit)] if limit is not None else entries)
+        match = _LOOKUP.match(command)
+        if match is not None:
+            return self._lookup(session, *match.groups())
+        return f"error:AT0003-Invalid syntax : {command}"
+
+    def _update(self, session:_Session, command:str) -> str:
+        head, _, value = command.partition(" ")
+        parts = head.split(":")[1:]
+        metadata = {}
+        while len(parts) > 2 and parts[0] in UPDATE_METADATA:
+            metadata[parts[0]] = parts[1]
+            parts = parts[2:]
+        key = ":".join(parts)
+        if not key.endswith(session.atsign):
+            key += session.atsign
+        with self._lock:
+            self.store[key] = (value, metadata, int(time.time() * 1000))
+            commit_id = self._commit(session.atsign, key, "*", value, metadata)
+        self._notify(key, "update", value)
+        return f"data:{commit_id}"
+
+    def _commit(self, atsign:str, key:str, operation:str, value:str, metadata:dict) -> int:
+        # Called with the lock held; the commit log carries metadata values as strings, as the atServer's does
+        commit_log = self.commit_logs.setdefault(atsign, [])
+        entry = {"atKey": key, "operation": operation, "commitId": len(commit_log)}
+        if operation != "-":
+            entry["value"] = value
+            entry["metadata"] = dict(metadata)
+        commit_log.append(entry)
+        return entry["commitId"]
+
+    def _lookup(self, session:_Session, verb:str, kind:str, name:str) -> str:
+        if verb == "lookup":
+            # Another atSign's key shared with this one
+            key = f"{session.atsign}:{name}"
+        elif verb == "plookup":
+            key = f"public:{name}"
+        else:
+            key = name
+        with self._lock:
+            entry = self.store.get(key)
+        if entry is None:
+            return f"error:AT0015-key not found : {key} does not exist"
+        value, metadata, updated = entry
+        if kind is None:
+            return "data:" + value
+        owner = "@" + key.rsplit("@", 1)[1]
+        meta_data = {"createdBy": owner, "updatedBy": owner, "createdAt": _timestamp(updated),
+                     "updatedAt": _timestamp(updated), "availableAt": _timestamp(updated), "expiresAt": None,
+                     "refreshAt": None, "status": "active", "version": 0, "ttl": int(metadata.get("ttl", 0)),
+                     "ttb": int(metadata.get("ttb", 0)), "ttr": int(metadata.get("ttr", 0)), "ccd": None,
+                     "isBinary": metadata.get("isBinary") == "true", "isEncrypted": metadata.get("isEncrypted") == "true",
+                     "dataSignature": metadata.get("dataSignature"), "sharedKeyEnc": metadata.get("sharedKeyEnc"),
+                     "pubKeyCS": metadata.get("pubKeyCS"), "encoding": metadata.get("encoding"),
+                     "ivNonce": metadata.get("ivNonce")}
+        if kind == "meta":
+            return "data:" + json.dumps(meta_data)
+        return "data:" + json.dumps({"key": key, "data": value, "metaData": meta_data})
+
+    def _notify(self, key:str, operation:str, value:str):
+        shared_with, separator, _ = key.partition(":")
+        if not separator or not shared_with.startswith("@"):
+            return
+        notification = {"id": str(uuid.uuid4()), "from": "@" + key.rsplit("@", 1)[1], "to": shared_with, "key": key,
+                        "value": value, "operation": operation, "epochMillis": int(time.time() * 1000),
+                        "messageType": "MessageType.key", "isEncrypted": True, "metadata": {"ivNonce": None}}
+        line = "notification: " + json.dumps(notification) + "\n"
+        with self._lock:
+            monitors = list(self._monitors.get(shared_with, ()))
+        for monitor in monitors:
+            if monitor.monitor_regex is None or monitor.monitor_regex.search(key) is not None:
+                try:
+                    monitor.send(line)
+                except OSError:
+                    pass
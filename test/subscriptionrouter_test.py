@@ -0,0 +1,58 @@
+import unittest
+
+from at_client.common import AtSign
+from at_client.connections import AtEventType, SubscriptionRouter
+from at_client.connections.notification.atevents import AtEvent
+
+
+def notification(key, event_type=AtEventType.UPDATE_NOTIFICATION, sender=None):
+    event_data = {"id": "1", "key": key}
+    if sender is not None:
+        event_data["from"] = sender
+    return AtEvent(event_type, event_data)
+
+
+class SubscriptionRouterTest(unittest.TestCase):
+    def test_dispatch(self):
+        """Test events are dispatched to the handlers whose criteria they all match, in subscription order"""
+        router = SubscriptionRouter()
+        received = []
+        router.subscribe(lambda at_event: received.append("prefix"), key="^@bob:location\\.")
+        router.subscribe(lambda at_event: received.append("namespace"), namespace="myapp")
+        router.subscribe(lambda at_event: received.append("sender"), sender=AtSign("@alice"), event_types=AtEventType.UPDATE_NOTIFICATION)
+        router.subscribe(lambda at_event: received.append("type"), event_types=[AtEventType.DELETE_NOTIFICATION])
+        router.subscribe(lambda at_event: received.append("regex"), key="loc.*myapp")
+        router.subscribe(lambda at_event: received.append("all"))
+
+        self.assertEqual(router.dispatch(notification("@bob:location.myapp@alice")), 5)
+        self.assertEqual(received, ["prefix", "namespace", "sender", "regex", "all"])
+        received.clear()
+        router.dispatch(notification("@bob:location.other@carol", AtEventType.DELETE_NOTIFICATION))
+        self.assertEqual(received, ["prefix", "type", "all"])
+        received.clear()
+        router.dispatch(notification("@bob:name.sub.myapp@dave", sender="@alice"))
+        self.assertEqual(received, ["namespace", "sender", "all"])
+
+    def test_unsubscribe(self):
+        """Test handlers are no longer called once unsubscribed, and a failing handler does not stop the others"""
+        router = SubscriptionRouter()
+        received = []
+        failing = router.subscribe(lambda at_event: 1 / 0, namespace="myapp")
+        subscription = router.subscribe(lambda at_event: received.append(at_event), key="^@bob:")
+        router.put(notification("@bob:test.myapp@alice"))
+        self.assertEqual(len(received), 1)
+        router.unsubscribe(subscription)
+        router.unsubscribe(failing)
+        self.assertEqual(router.dispatch(notification("@bob:test.myapp@alice")), 0)
+        self.assertEqual((len(router), router.dispatched, router.unmatched), (0, 2, 1))
+
+    def test_literal_prefix(self):
+        """Test the literal prefix of key patterns is only found for patterns anchored to the start"""
+        self.assertEqual(SubscriptionRouter.literal_prefix("^@bob:location.*"), "@bob:location")
+        self.assertEqual(SubscriptionRouter.literal_prefix("^@bob:x?"), "@bob:")
+        self.assertEqual(SubscriptionRouter.literal_prefix("@bob:location"), "")
+        self.assertEqual(SubscriptionRouter.literal_prefix("^@bob|@alice"), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import time
+import unittest
+
+from at_client.util import TimerWheel
+
+
+class TimerWheelTest(unittest.TestCase):
+    def test_schedule(self):
+        """Test timers fire in deadline order, on the first advance at or after their deadline"""
+        wheel = TimerWheel(tick=0.01, slots=4)
+        fired = []
+        wheel.schedule(0.05, lambda: fired.append("later"))
+        wheel.schedule(0.01, lambda: fired.append("sooner"))
+        self.assertEqual(len(wheel), 2)
+        self.assertEqual(wheel.advance(), 0)
+        time.sleep(0.03)
+        wheel.advance()
+        self.assertEqual(fired, ["sooner"])
+        time.sleep(0.05)
+        wheel.advance()
+        self.assertEqual(fired, ["sooner", "later"])
+        self.assertIsNone(wheel.timeout())
+
+    def test_cancel(self):
+        """Test cancelled timers do not fire"""
+        wheel = TimerWheel(tick=0.01)
+        fired = []
+        timer = wheel.schedule(0.01, lambda: fired.append(1))
+        wheel.cancel(timer)
+        wheel.cancel(timer)
+        time.sleep(0.02)
+        self.assertEqual((wheel.advance(), fired, len(wheel)), (0, [], 0))
+
+    def test_schedule_after_idle(self):
+        """Test a timer scheduled after the wheel has been idle does not fire early"""
+        wheel = TimerWheel(tick=0.01)
+        fired = []
+        time.sleep(0.1)
+        wheel.schedule(0.05, lambda: fired.append(1))
+        self.assertEqual((wheel.advance(), fired), (0, []))
+        self.assertGreater(wheel.timeout(), 0)
+        time.sleep(0.07)
+        wheel.advance()
+        self.assertEqual(fired, [1])
+
+
+if __name__ == '__main__':
+    unittest.main()